@@ -198,6 +198,12 @@ function tokenize(prompt: string): string[] {
     .slice(0, 12);
 }
 
+function hasBeliefsFts(db: Database.Database): boolean {
+  return !!db
+    .prepare("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'beliefs_fts'")
+    .get();
+}
+
 function loadRecalled(
   db: Database.Database,
   prompt: string,
@@ -206,9 +212,33 @@ function loadRecalled(
 ): BeliefRow[] {
   const tokens = tokenize(prompt);
   if (tokens.length === 0) return [];
+  let ranked: BeliefRow[] = [];
+  if (hasBeliefsFts(db)) {
+    try {
+      // Ranked prefix MATCH over beliefs_fts (scripts/migrate_schema.py)
+      const match = tokens.map((t) => `"${t}"*`).join(" OR ");
+      ranked = db
+        .prepare(
+          `SELECT ${COLS} FROM beliefs
+      JOIN (SELECT rowid AS fts_rowid, rank AS fts_rank FROM beliefs_fts WHERE beliefs_fts MATCH ?)
+        ON beliefs.rowid = fts_rowid
+    WHERE status = 'active'
+      AND confidence >= 0.3
+      AND agent_id = ?
+    ORDER BY fts_rank, confidence DESC, activation_score DESC
+    LIMIT ?`,
+        )
+        .all(match, agentId, limit * 4) as BeliefRow[];
+    } catch {
+      /* fall through to LIKE scan */
+    }
+  }
+  if (ranked.length >= limit * 4) return ranked;
+  // Prefix MATCH misses mid-word hits ("auth" in "oauth") that the LIKE scan
+  // finds; top up the ranked hits with those.
   const where = tokens.map(() => "LOWER(content) LIKE ?").join(" OR ");
   const params = tokens.map((t) => `%${t}%`);
-  return db
+  const scanned = db
     .prepare(
       `SELECT ${COLS} FROM beliefs
     WHERE status = 'active'
@@ -219,6 +249,8 @@ function loadRecalled(
     LIMIT ?`,
     )
     .all(agentId, ...params, limit * 4) as BeliefRow[];
+  const seen = new Set(ranked.map((r) => r.id));
+  return ranked.concat(scanned.filter((r) => !seen.has(r.id))).slice(0, limit * 4);
 }
 
 async function loadRecalledSemantic(
@@ -909,6 +941,15 @@ const beePlugin = {
             /* already exists */
           }
 
+          // Cognition block: created_at as Unix seconds, ranked in SQL
+          // (backfill, sync triggers and index: scripts/migrate_schema.py)
+          try {
+            db.exec("ALTER TABLE beliefs ADD COLUMN created_epoch REAL");
+            api.logger.info("bee: migration — created_epoch column added to beliefs");
+          } catch {
+            /* already exists */
+          }
+
           // Phase 2B: knowledge_gaps table
           db.exec(`CREATE TABLE IF NOT EXISTS knowledge_gaps (
             id TEXT PRIMARY KEY,
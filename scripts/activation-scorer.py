@@ -1,12 +1,33 @@
 #!/usr/bin/env python3
+import argparse
 import math
 import random
 import sqlite3
 from datetime import datetime, timezone
 from pathlib import Path
 
+try:
+    import numpy as np
+except ImportError:  # scalar fallback in score_table
+    np = None
+
 DB_PATH = Path("/Users/acevashisth/.openclaw/workspace/state/vector.db")
 
+# Rows per executemany() batch; the write lock is released between batches.
+WRITE_CHUNK = 5000
+NOISE_SD = 0.1
+
+# Base-level approximation: accesses summed exactly before the analytic tail.
+K_RECENT = 3
+MIN_AGE_H = 1.0 / 3600.0
+
+# --incremental: largest base-level drift (log units) tolerated before a row
+# whose access stats are unchanged gets rescored anyway.
+MAX_DRIFT = 0.05
+
+# SQLite parses ISO-8601 (with or without T/Z/offset) far faster than Python does.
+EPOCH_SQL = "(julianday({col}) - 2440587.5) * 86400.0"
+
 
 def parse_dt(value):
     if not value:
@@ -17,14 +38,20 @@ def parse_dt(value):
             return datetime.strptime(s, fmt).replace(tzinfo=timezone.utc)
         except ValueError:
             continue
-    return None
+    try:
+        dt = datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
 
 
 def safe_hours_since(now, dt):
     if not dt:
         return 1.0
     h = (now - dt).total_seconds() / 3600.0
-    return max(h, 1.0 / 3600.0)
+    return max(h, MIN_AGE_H)
 
 
 def access_times(now, created_at, last_accessed, access_count):
@@ -45,52 +72,280 @@ def access_times(now, created_at, last_accessed, access_count):
     return [created + (last - created) * (i / (n - 1)) for i in range(n)]
 
 
-def compute_activation(now, created_at, last_accessed, access_count, decay_rate, importance, confidence):
-    d = float(decay_rate if decay_rate is not None else 0.5)
-    d = min(max(d, 0.01), 2.0)
+def _collapse(now, created_at, last_accessed, access_count):
+    """
+    The access history access_times() would synthesize, as (recent_h, oldest_h, n):
+    n accesses spaced evenly between ages recent_h and oldest_h (hours ago).
+    """
+    created = parse_dt(created_at) or now
+    last = parse_dt(last_accessed) or created
+    n = int(access_count or 0)
+    if n <= 0:
+        age = safe_hours_since(now, created)
+        return age, age, 1
+    age_last = safe_hours_since(now, last)
+    if n == 1 or last <= created:
+        return age_last, age_last, n
+    return age_last, safe_hours_since(now, created), n
 
-    times = access_times(now, created_at, last_accessed, access_count)
+
+def exact_base_level(now, created_at, last_accessed, access_count, d):
+    """Reference sum of h^-d over every synthetic access — O(access_count)."""
     total = 0.0
-    for t in times:
+    for t in access_times(now, created_at, last_accessed, access_count):
         h = safe_hours_since(now, t)
         total += h ** (-d)
+    return math.log(max(total, 1e-12))
+
+
+def hybrid_base_level(now, created_at, last_accessed, access_count, d, k=None):
+    """
+    Petrov (2006) hybrid approximation of exact_base_level — O(k).
+
+    The k most recent accesses are summed exactly; the older n-k are evenly
+    spaced, so their sum is replaced by the integral of t^-d over the cells
+    they occupy (midpoint rule), which has a closed form.
+    """
+    k = K_RECENT if k is None else k
+    recent, oldest, n = _collapse(now, created_at, last_accessed, access_count)
+    if n == 1 or oldest <= recent:
+        return math.log(max(n * recent ** (-d), 1e-12))
 
-    base_level = math.log(max(total, 1e-12))
+    step = (oldest - recent) / (n - 1)
+    k = min(k, n)
+    total = sum(max(recent + j * step, MIN_AGE_H) ** (-d) for j in range(k))
+    if n > k:
+        lo = max(recent + (k - 0.5) * step, MIN_AGE_H)
+        hi = max(oldest + 0.5 * step, lo)
+        if abs(1.0 - d) < 1e-9:
+            total += math.log(hi / lo) / step
+        else:
+            total += (hi ** (1.0 - d) - lo ** (1.0 - d)) / ((1.0 - d) * step)
+    return math.log(max(total, 1e-12))
+
+
+def compute_activation(now, created_at, last_accessed, access_count, decay_rate, importance, confidence,
+                       exact=False):
+    d = float(decay_rate if decay_rate is not None else 0.5)
+    d = min(max(d, 0.01), 2.0)
+
+    base = exact_base_level if exact else hybrid_base_level
+    base_level = base(now, created_at, last_accessed, access_count, d)
     importance_bonus = float(importance if importance is not None else 0.5) * 2.0
     confidence_weight = (float(confidence if confidence is not None else 0.5) - 0.5) * 0.5
-    noise = random.gauss(0, 0.1)
+    noise = random.gauss(0, NOISE_SD)
     return base_level + importance_bonus + confidence_weight + noise
 
 
-def score_table(conn, table, id_col):
-    now = datetime.now(timezone.utc)
-    now_str = now.strftime("%Y-%m-%d %H:%M:%S")
-    cur = conn.cursor()
+def _column(values, default):
+    """Python column (None = missing) → float64 array with `default` filled in."""
+    return np.fromiter(
+        (default if v is None else v for v in values), dtype=np.float64, count=len(values)
+    )
+
+
+def _exact_total(now_ts, created, last, n, d):
+    """
+    Vectorized exact sum. Every row's accesses are spread evenly between
+    created and last (as access_times() does), expanded with np.repeat and
+    summed back per row with np.bincount — cost grows with access_count.
+    """
+    n_rows = len(created)
+    spread = (n > 1) & (last > created)
+    m = np.maximum(n, 1)
+    start = np.where(spread, created, np.where(n <= 0, created, last))
+    width = np.where(spread, last - created, 0.0)
+    denom = np.maximum(m - 1, 1).astype(np.float64)
+
+    row = np.repeat(np.arange(n_rows), m)
+    offsets = np.cumsum(m) - m
+    j = np.arange(row.size) - offsets[row]
+    t = start[row] + width[row] * (j / denom[row])
+    h = np.maximum((now_ts - t) / 3600.0, MIN_AGE_H)
+    return np.bincount(row, weights=h ** (-d[row]), minlength=n_rows)
+
+
+def _hybrid_total(now_ts, created, last, n, d, k):
+    """Vectorized hybrid_base_level: k exact terms plus a closed-form tail per row."""
+    age_created = np.maximum((now_ts - created) / 3600.0, MIN_AGE_H)
+    age_last = np.maximum((now_ts - last) / 3600.0, MIN_AGE_H)
+    spread = (n > 1) & (last > created)
+    recent = np.where(n <= 0, age_created, age_last)
+    count = np.maximum(n, 1).astype(np.float64)
+
+    # Single access, or n accesses at the same instant.
+    total = np.where(spread, 0.0, count * recent ** (-d))
+
+    idx = np.nonzero(spread)[0]
+    if idx.size:
+        r, o, c, dd = recent[idx], age_created[idx], count[idx], d[idx]
+        step = (o - r) / (c - 1)
+        kk = np.minimum(k, c)
+        part = np.zeros(idx.size)
+        for j in range(k):
+            part += np.where(j < kk, np.maximum(r + j * step, MIN_AGE_H) ** (-dd), 0.0)
+        lo = np.maximum(r + (kk - 0.5) * step, MIN_AGE_H)
+        hi = np.maximum(o + 0.5 * step, lo)
+        one = np.abs(1.0 - dd) < 1e-9
+        with np.errstate(divide="ignore", invalid="ignore"):
+            tail = np.where(
+                one,
+                np.log(hi / lo) / step,
+                (hi ** (1.0 - dd) - lo ** (1.0 - dd)) / ((1.0 - dd) * step),
+            )
+        part += np.where(c > kk, tail, 0.0)
+        total[idx] = part
+    return total
 
-    cur.execute(
+
+def score_arrays(now_ts, created, last, access_count, decay_rate, importance, confidence,
+                 rng=None, noise_sd=NOISE_SD, exact=False, k=None):
+    """
+    Vectorized compute_activation over whole columns.
+
+    created/last are epoch seconds (NaN = missing); the other inputs are float
+    arrays with NULLs already defaulted. The base level uses the O(1)-per-row
+    hybrid approximation unless exact=True.
+    """
+    n_rows = len(created)
+    if n_rows == 0:
+        return np.zeros(0)
+
+    created = np.where(np.isnan(created), now_ts, created)
+    last = np.where(np.isnan(last), created, last)
+    n = np.floor(access_count).astype(np.int64)
+    d = np.clip(decay_rate, 0.01, 2.0)
+
+    if exact:
+        total = _exact_total(now_ts, created, last, n, d)
+    else:
+        total = _hybrid_total(now_ts, created, last, n, d, K_RECENT if k is None else k)
+
+    base_level = np.log(np.maximum(total, 1e-12))
+    importance_bonus = importance * 2.0
+    confidence_weight = (confidence - 0.5) * 0.5
+    if noise_sd:
+        rng = rng if rng is not None else np.random.default_rng()
+        noise = rng.normal(0.0, noise_sd, n_rows)
+    else:
+        noise = 0.0
+    return base_level + importance_bonus + confidence_weight + noise
+
+
+def drift_bound(decay_rate, elapsed_h, recent_age_h):
+    """
+    Upper bound on how far the base level can have fallen since the last
+    calculation, with no new accesses in between.
+
+    Every term h^-d of the sum decays to (h+Δ)^-d, and the most recent access
+    decays fastest in log terms, so the log of the sum drops by at most
+    d·ln(1 + Δ/h_min), where h_min is that access's age at the last calc.
+    """
+    if elapsed_h is None or recent_age_h is None:
+        return float("inf")
+    d = float(decay_rate if decay_rate is not None else 0.5)
+    d = min(max(d, 0.01), 2.0)
+    return d * math.log1p(max(elapsed_h, 0.0) / max(recent_age_h, MIN_AGE_H))
+
+
+def load_active(conn, table, id_col, incremental=False, max_drift=MAX_DRIFT):
+    """
+    One pass over the active rows; timestamps come back as epoch seconds.
+
+    With incremental=True only dirty rows are returned: never scored, accessed
+    (or created) since last_activation_calc, or old enough that drift_bound()
+    exceeds max_drift.
+    """
+    dirty = ""
+    params = ()
+    if incremental:
+        conn.create_function("drift_bound", 3, drift_bound, deterministic=True)
+        calc = "julianday(last_activation_calc)"
+        recent = "COALESCE(MAX(julianday(last_accessed), julianday(created_at)), julianday(created_at))"
+        dirty = f"""
+          AND (activation_score IS NULL
+               OR {calc} IS NULL
+               OR julianday(last_accessed) > {calc}
+               OR julianday(created_at) > {calc}
+               OR drift_bound(decay_rate,
+                              (julianday('now') - {calc}) * 24.0,
+                              ({calc} - {recent}) * 24.0) > ?)"""
+        params = (float(max_drift),)
+    return conn.execute(
         f"""
-        SELECT {id_col}, content, created_at, last_accessed, access_count, decay_rate, importance, confidence
+        SELECT {id_col}, content, created_at, last_accessed,
+               {EPOCH_SQL.format(col="created_at")},
+               {EPOCH_SQL.format(col="last_accessed")},
+               access_count, decay_rate, importance, confidence
         FROM {table}
-        WHERE status='active'
-        """
-    )
-    rows = cur.fetchall()
-
-    scored = []
-    for row in rows:
-        rid, content, created_at, last_accessed, access_count, decay_rate, importance, confidence = row
-        act = compute_activation(now, created_at, last_accessed, access_count, decay_rate, importance, confidence)
-        cur.execute(
-            f"UPDATE {table} SET activation_score=?, last_activation_calc=? WHERE {id_col}=?",
-            (act, now_str, rid),
+        WHERE status='active'{dirty}
+        """,
+        params,
+    ).fetchall()
+
+
+def write_scores(conn, table, id_col, ids, scores, now_str, chunk=None):
+    """executemany() in chunks, committing each so readers are never starved."""
+    chunk = chunk or WRITE_CHUNK
+    sql = f"UPDATE {table} SET activation_score=?, last_activation_calc=? WHERE {id_col}=?"
+    for i in range(0, len(ids), chunk):
+        conn.executemany(
+            sql,
+            [(float(s), now_str, rid) for rid, s in zip(ids[i:i + chunk], scores[i:i + chunk])],
         )
-        scored.append((rid, content or "", act))
+        conn.commit()
+
+
+def score_table(conn, table, id_col, exact=False, incremental=False, max_drift=MAX_DRIFT):
+    now = datetime.now(timezone.utc)
+    now_str = now.strftime("%Y-%m-%d %H:%M:%S")
+
+    rows = load_active(conn, table, id_col, incremental=incremental, max_drift=max_drift)
+    if not rows:
+        return []
 
-    conn.commit()
+    (ids, contents, created_raw, last_raw, created, last,
+     access_count, decay_rate, importance, confidence) = zip(*rows)
+
+    if np is not None:
+        scores = score_arrays(
+            now.timestamp(),
+            _column(created, np.nan),
+            _column(last, np.nan),
+            _column(access_count, 0.0),
+            _column(decay_rate, 0.5),
+            _column(importance, 0.5),
+            _column(confidence, 0.5),
+            exact=exact,
+        ).tolist()
+    else:
+        scores = [
+            compute_activation(now, c_raw, l_raw, n, d, imp, conf, exact=exact)
+            for c_raw, l_raw, n, d, imp, conf in zip(
+                created_raw, last_raw, access_count, decay_rate, importance, confidence
+            )
+        ]
+
+    write_scores(conn, table, id_col, ids, scores, now_str)
+
+    scored = [(rid, content or "", act) for rid, content, act in zip(ids, contents, scores)]
     scored.sort(key=lambda x: x[2], reverse=True)
     return scored
 
 
+def stored_ranking(conn, table, id_col, n=10):
+    """
+    Top and bottom n active rows by their stored activation_score, best first.
+    --incremental only rescores dirty rows, so its report reads the table.
+    """
+    sql = (f"SELECT {id_col}, COALESCE(content, ''), activation_score FROM {table} "
+           f"WHERE status='active' AND activation_score IS NOT NULL ORDER BY activation_score {{}} LIMIT ?")
+    top = conn.execute(sql.format("DESC"), (n,)).fetchall()
+    seen = {r[0] for r in top}
+    bottom = [r for r in conn.execute(sql.format("ASC"), (n,)).fetchall() if r[0] not in seen]
+    return top + bottom[::-1]
+
+
 def print_ranked(title, rows, n=10, reverse=False):
     print(f"\n{title}")
     if not rows:
@@ -105,12 +360,31 @@ def print_ranked(title, rows, n=10, reverse=False):
 
 
 def main():
-    conn = sqlite3.connect(DB_PATH)
-    mem = score_table(conn, "memory_entries", "id")
-    bel = score_table(conn, "beliefs", "id")
+    parser = argparse.ArgumentParser(description="Rescore ACT-R activation for memory_entries and beliefs.")
+    parser.add_argument("--db", default=str(DB_PATH), help="Path to vector.db")
+    parser.add_argument("--exact", action="store_true",
+                        help="Sum every synthetic access instead of the hybrid base-level approximation")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only rescore rows accessed since last_activation_calc or past --max-drift")
+    parser.add_argument("--max-drift", type=float, default=MAX_DRIFT,
+                        help=f"Base-level drift bound for --incremental (default {MAX_DRIFT})")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    opts = dict(exact=args.exact, incremental=args.incremental, max_drift=args.max_drift)
+    mem = score_table(conn, "memory_entries", "id", **opts)
+    bel = score_table(conn, "beliefs", "id", **opts)
+
+    for table, scored in (("memory_entries", mem), ("beliefs", bel)):
+        if args.incremental:
+            active = conn.execute(f"SELECT COUNT(*) FROM {table} WHERE status='active'").fetchone()[0]
+            print(f"{table} scored: {len(scored)} of {active} active (incremental)")
+        else:
+            print(f"{table} scored: {len(scored)}")
 
-    print(f"memory_entries scored: {len(mem)}")
-    print(f"beliefs scored: {len(bel)}")
+    if args.incremental:  # the full ranking, not just the rows rescored this pass
+        mem = stored_ranking(conn, "memory_entries", "id")
+        bel = stored_ranking(conn, "beliefs", "id")
 
     print_ranked("Top 10 memory_entries by activation", mem, n=10)
     print_ranked("Bottom 10 memory_entries by activation", mem, n=10, reverse=True)
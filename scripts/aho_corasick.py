@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+aho_corasick.py — Multi-pattern substring matching in one pass.
+
+Automaton(keys) compiles the keys once into an Aho–Corasick automaton whose
+failure links are folded into a full transition table (one dict per state),
+so matching is a single left-to-right walk: one dict lookup per character,
+no backtracking, whatever the number of keys.
+
+Used by validate_agent_message.py for Tier 1.
+"""
+
+from collections import deque
+
+
+class Automaton:
+    """Aho–Corasick DFA over a fixed list of non-empty string keys."""
+
+    def __init__(self, keys: list[str]):
+        self.keys = list(keys)
+        goto: list[dict[str, int]] = [{}]
+        out: list[set[int]] = [set()]
+        for index, key in enumerate(self.keys):
+            if not key:
+                raise ValueError(f"empty key at index {index}")
+            state = 0
+            for ch in key:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    goto.append({})
+                    out.append(set())
+                    nxt = goto[state][ch] = len(goto) - 1
+                state = nxt
+            out[state].add(index)
+
+        # Breadth-first, so a state's failure target is complete before it is used.
+        fail = [0] * len(goto)
+        delta: list[dict[str, int]] = [dict(goto[0])] + [{} for _ in goto[1:]]
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            delta[state] = {**delta[fail[state]], **goto[state]}
+            out[state] |= out[fail[state]]
+            for ch, nxt in goto[state].items():
+                fail[nxt] = delta[fail[state]].get(ch, 0)
+                queue.append(nxt)
+
+        self._delta = delta
+        self._out = [frozenset(o) for o in out]
+        self._accepting = frozenset(s for s, o in enumerate(out) if o)
+
+    def matches(self, text: str) -> set[int]:
+        """Indices of the keys that occur in `text`."""
+        delta, accepting, out = self._delta, self._accepting, self._out
+        found: set[int] = set()
+        state = 0
+        for ch in text:
+            state = delta[state].get(ch, 0)
+            if state in accepting:
+                found |= out[state]
+        return found
+
+    def first_match(self, text: str) -> frozenset[int]:
+        """Indices of the keys ending where the first match ends; empty if none. Stops there."""
+        delta, accepting, out = self._delta, self._accepting, self._out
+        state = 0
+        for ch in text:
+            state = delta[state].get(ch, 0)
+            if state in accepting:
+                return out[state]
+        return frozenset()
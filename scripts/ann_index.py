@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+ann_index.py — IVF-flat approximate nearest-neighbour index over beliefs.embedding.
+
+One index per agent, persisted next to the database it indexes, under
+<db dir>/ann/<agent>/:
+  centroids.f32  nlist × dim spherical k-means centroids
+  offsets.i64    nlist+1 row offsets — rows [0, built) are grouped by list
+  vectors.f32    count × dim L2-normalized rows; rows [built, count) are the
+                 unclustered tail appended since the last build
+  ids.txt        belief id of each row
+  crc.u32        CRC-32 of the embedding BLOB each row was built from
+  alive.u8       0 once the belief is archived or re-embedded (tombstone)
+  meta.json      dim, nlist, built, count, source signature (written last)
+
+A query scores the centroids, scans the `nprobe` closest lists plus the
+tail, and masks tombstones. nprobe is the recall-vs-latency knob:
+nprobe >= nlist is an exact search. sync_agent() keeps the index in step
+with the beliefs table (new embeddings are appended, archived or deleted
+beliefs are tombstoned, a changed embedding is both) and rebuilds once the
+tail or the tombstones grow past a fraction of the clustered rows. The
+source signature includes the agent's change_counters stamp, so any write
+to its beliefs triggers that check; per-row CRCs find the edited rows.
+
+Usage:
+    python3 ann_index.py --agent forge --rebuild
+    python3 ann_index.py --agent forge --like <belief_id> --k 5 --nprobe 16
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import zlib
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+import retrieval_cache
+
+try:
+    import numpy as np
+except ImportError:  # callers fall back to brute-force cosine
+    np = None
+
+DB_PATH = Path("/Users/acevashisth/.openclaw/workspace/state/vector.db")
+
+DEFAULT_NPROBE = 8
+KMEANS_ITERS = 10
+TRAIN_PER_LIST = 64       # k-means trains on at most nlist * TRAIN_PER_LIST rows
+MIN_CLUSTER_ROWS = 1_000  # below this everything stays in one list (exact scan)
+REBUILD_FRACTION = 0.2    # rebuild when tail or tombstones exceed this share of built rows
+ASSIGN_CHUNK = 20_000
+
+_LIVE = "FROM beliefs WHERE agent_id=? AND status='active' AND embedding IS NOT NULL"
+
+
+def _normalize(mat):
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (mat / norms).astype(np.float32, copy=False)
+
+
+def _crc(blob) -> int:
+    return zlib.crc32(blob) if blob else 0
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def default_nlist(n: int) -> int:
+    return 1 if n < MIN_CLUSTER_ROWS else int(round(n ** 0.5))
+
+
+def kmeans(vectors, nlist: int, iters: int = KMEANS_ITERS, seed: int = 0):
+    """Spherical k-means on a sample; returns normalized centroids."""
+    rng = np.random.default_rng(seed)
+    n = vectors.shape[0]
+    sample = vectors[rng.choice(n, min(n, nlist * TRAIN_PER_LIST), replace=False)]
+    centroids = sample[rng.choice(sample.shape[0], nlist, replace=False)].copy()
+    for _ in range(iters):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, sample)
+        empty = np.bincount(assign, minlength=nlist) == 0
+        sums[empty] = sample[rng.choice(sample.shape[0], int(empty.sum()))]
+        centroids = _normalize(sums)
+    return centroids
+
+
+def _assign(vectors, centroids):
+    out = np.empty(vectors.shape[0], dtype=np.int64)
+    for i in range(0, vectors.shape[0], ASSIGN_CHUNK):
+        out[i:i + ASSIGN_CHUNK] = np.argmax(vectors[i:i + ASSIGN_CHUNK] @ centroids.T, axis=1)
+    return out
+
+
+class AnnIndex:
+    """One agent's persisted IVF-flat index."""
+
+    def __init__(self, root: Path, agent: str):
+        self.dir = Path(root) / "".join(c if c.isalnum() or c in "_-." else "_" for c in agent)
+        try:
+            self.meta = json.loads((self.dir / "meta.json").read_text())
+        except (OSError, ValueError):
+            self.meta = {}
+        self._cache = {}
+
+    @property
+    def count(self) -> int:
+        return int(self.meta.get("count", 0))
+
+    @property
+    def live(self) -> int:
+        return self.count - int(self.meta.get("dead", 0))
+
+    def _file(self, name):
+        return self.dir / name
+
+    def ids(self) -> list[str]:
+        if "ids" not in self._cache:
+            self._cache["ids"] = self._file("ids.txt").read_text().split("\n")[: self.count]
+        return self._cache["ids"]
+
+    def crcs(self):
+        return np.fromfile(self._file("crc.u32"), dtype=np.uint32)[: self.count]
+
+    def _loaded(self):
+        """Query-side arrays, read once per instance and dropped on every write."""
+        if "vectors" not in self._cache:
+            dim, nlist = self.meta["dim"], self.meta["nlist"]
+            self._cache.update(
+                vectors=np.memmap(self._file("vectors.f32"), dtype=np.float32, mode="r",
+                                  shape=(self.count, dim)),
+                centroids=np.fromfile(self._file("centroids.f32"), dtype=np.float32).reshape(nlist, dim),
+                offsets=np.fromfile(self._file("offsets.i64"), dtype=np.int64),
+                alive=np.fromfile(self._file("alive.u8"), dtype=np.uint8)[: self.count].astype(bool),
+            )
+        return self._cache
+
+    def _alive(self, mode="r"):
+        return np.memmap(self._file("alive.u8"), dtype=np.uint8, mode=mode, shape=(self.count,))
+
+    def _write_meta(self, **changes) -> None:
+        self._cache = {}
+        self.meta.update(changes)
+        _write_atomic(self._file("meta.json"), json.dumps(self.meta).encode("utf-8"))
+
+    # ── writes ───────────────────────────────────────────────────────────────
+
+    def build(self, ids: list[str], vectors, signature=None, nlist: int | None = None, crcs=None) -> None:
+        self.dir.mkdir(parents=True, exist_ok=True)
+        vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+        n, dim = vectors.shape if vectors.ndim == 2 else (0, 0)
+        nlist = max(1, min(nlist or default_nlist(n), n or 1))
+        if n and nlist > 1:
+            centroids = kmeans(vectors, nlist)
+            assign = _assign(vectors, centroids)
+        else:
+            centroids = np.zeros((1, dim), dtype=np.float32)
+            assign = np.zeros(n, dtype=np.int64)
+        order = np.argsort(assign, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=nlist))]).astype(np.int64)
+
+        _write_atomic(self._file("centroids.f32"), centroids.tobytes())
+        _write_atomic(self._file("offsets.i64"), offsets.tobytes())
+        _write_atomic(self._file("vectors.f32"), np.ascontiguousarray(vectors[order]).tobytes())
+        _write_atomic(self._file("ids.txt"), "\n".join(ids[i] for i in order).encode("utf-8"))
+        crcs = np.zeros(n, dtype=np.uint32) if crcs is None else np.asarray(crcs, dtype=np.uint32)
+        _write_atomic(self._file("crc.u32"), np.ascontiguousarray(crcs[order]).tobytes())
+        _write_atomic(self._file("alive.u8"), np.ones(n, dtype=np.uint8).tobytes())
+        self.meta = {}
+        self._write_meta(dim=int(dim), nlist=int(nlist), built=int(n), count=int(n), dead=0,
+                         signature=signature)
+
+    def append(self, ids: list[str], vectors, signature=None, crcs=None) -> None:
+        """Add rows to the unclustered tail."""
+        if not ids:
+            return
+        vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+        count = self.count
+        with open(self._file("vectors.f32"), "r+b") as f:
+            f.truncate(count * self.meta["dim"] * 4)
+            f.seek(0, os.SEEK_END)
+            f.write(np.ascontiguousarray(vectors).tobytes())
+        with open(self._file("alive.u8"), "r+b") as f:
+            f.truncate(count)
+            f.seek(0, os.SEEK_END)
+            f.write(np.ones(len(ids), dtype=np.uint8).tobytes())
+        with open(self._file("crc.u32"), "r+b") as f:
+            f.truncate(count * 4)
+            f.seek(0, os.SEEK_END)
+            f.write(np.asarray(crcs if crcs is not None else [0] * len(ids), dtype=np.uint32).tobytes())
+        _write_atomic(self._file("ids.txt"), "\n".join(self.ids() + list(ids)).encode("utf-8"))
+        self._write_meta(count=count + len(ids), signature=signature)
+
+    def remove(self, ids, signature=None) -> int:
+        """Tombstone rows for `ids`; returns how many were live."""
+        targets = set(ids)
+        if not self.count or not targets:
+            return 0
+        alive = self._alive("r+")
+        hit = 0
+        for row, rid in enumerate(self.ids()):
+            if rid in targets and alive[row]:
+                alive[row] = 0
+                hit += 1
+        alive.flush()
+        del alive
+        self._write_meta(dead=int(self.meta.get("dead", 0)) + hit,
+                         signature=signature if signature is not None else self.meta.get("signature"))
+        return hit
+
+    def needs_rebuild(self) -> bool:
+        built = max(int(self.meta.get("built", 0)), MIN_CLUSTER_ROWS)
+        tail = self.count - int(self.meta.get("built", 0))
+        return tail > REBUILD_FRACTION * built or int(self.meta.get("dead", 0)) > REBUILD_FRACTION * built
+
+    # ── query ────────────────────────────────────────────────────────────────
+
+    def search(self, vector, k: int = 10, nprobe: int | None = None) -> list[tuple[str, float]]:
+        """(belief id, cosine) for the k best live rows, best first."""
+        if not self.live or k <= 0:
+            return []
+        dim, nlist, built = self.meta["dim"], self.meta["nlist"], self.meta["built"]
+        q = np.asarray(vector, dtype=np.float32).reshape(-1)
+        if q.shape[0] != dim or not q.any():
+            return []
+        q = q / np.linalg.norm(q)
+
+        arrays = self._loaded()
+        vectors = arrays["vectors"]
+        nprobe = min(nprobe or DEFAULT_NPROBE, nlist)
+        if nprobe >= nlist:
+            rows = np.arange(self.count)
+        else:
+            offsets = arrays["offsets"]
+            probe = np.argpartition(-(arrays["centroids"] @ q), nprobe - 1)[:nprobe]
+            ranges = [np.arange(offsets[c], offsets[c + 1]) for c in probe]
+            ranges.append(np.arange(built, self.count))
+            rows = np.concatenate(ranges)
+
+        rows = rows[arrays["alive"][rows]]
+        if rows.size == 0:
+            return []
+        scores = vectors[rows] @ q
+        k = min(k, rows.size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        ids = self.ids()
+        return [(ids[rows[i]], float(scores[i])) for i in top]
+
+
+# ── beliefs table sync ───────────────────────────────────────────────────────
+
+def _decode(blob, dim=None):
+    vec = np.frombuffer(blob, dtype="<f4") if blob else None
+    if vec is None or (dim and vec.shape[0] != dim):
+        return None
+    return vec
+
+
+def _fetch(conn, ids):
+    out = {}
+    ids = list(ids)
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i + 500]
+        marks = ",".join("?" * len(chunk))
+        out.update(conn.execute(f"SELECT id, embedding FROM beliefs WHERE id IN ({marks})", chunk).fetchall())
+    return out
+
+
+def _signature(conn, agent):
+    counts = list(conn.execute(f"SELECT COUNT(*), TOTAL(rowid) {_LIVE}", (agent,)).fetchone())
+    return counts + [retrieval_cache.data_version(conn, [f"beliefs:{agent}"])]
+
+
+def sync_agent(conn: sqlite3.Connection, agent: str, root: Path, rebuild: bool = False) -> AnnIndex:
+    """
+    Bring the agent's index in line with its active, embedded beliefs. Only
+    ids and embedding CRCs are scanned; BLOBs are decoded just for rows being
+    added or re-embedded (or for everything on rebuild).
+    """
+    index = AnnIndex(root, agent)
+    sig = _signature(conn, agent)
+    if not rebuild and index.meta and index.meta.get("signature") == sig:
+        return index
+
+    conn.create_function("ann_crc", 1, _crc, deterministic=True)
+    live = dict(conn.execute(f"SELECT id, ann_crc(embedding) {_LIVE} ORDER BY rowid", (agent,)).fetchall())
+    live_ids = list(live)
+    if not rebuild and index.meta.get("dim") and index._file("crc.u32").exists():
+        alive = index._alive() if index.count else []
+        indexed = {rid: int(crc) for rid, crc, a in zip(index.ids(), index.crcs(), alive) if a}
+        gone = set(indexed) - set(live)
+        new = [rid for rid in live_ids if indexed.get(rid) != live[rid]]
+        changed = [rid for rid in new if rid in indexed]
+        if gone or changed:
+            index.remove(gone | set(changed))
+        if new:
+            blobs = _fetch(conn, new)
+            pairs = [(rid, _decode(blobs.get(rid), index.meta["dim"])) for rid in new]
+            pairs = [(rid, v) for rid, v in pairs if v is not None]
+            index.append([p[0] for p in pairs], np.stack([p[1] for p in pairs]) if pairs else [],
+                         crcs=[live[p[0]] for p in pairs])
+        index._write_meta(signature=sig)
+        if not index.needs_rebuild():
+            return index
+
+    blobs = _fetch(conn, live_ids)
+    vecs = {rid: _decode(blobs.get(rid)) for rid in live_ids}
+    dims = [v.shape[0] for v in vecs.values() if v is not None]
+    dim = max(set(dims), key=dims.count) if dims else 0
+    keep = [rid for rid in live_ids if vecs[rid] is not None and vecs[rid].shape[0] == dim]
+    index.build(keep, np.stack([vecs[r] for r in keep]) if keep else np.zeros((0, dim), np.float32), sig,
+                crcs=[live[r] for r in keep])
+    return index
+
+
+def ann_root(db_path: Path) -> Path:
+    return Path(db_path).parent / "ann"
+
+
+def search_beliefs(conn: sqlite3.Connection, agent: str, vector, k: int = 10, nprobe: int | None = None,
+                   root: Path | None = None) -> list[tuple[str, float]]:
+    """
+    Sync the agent's index, then return its k approximate nearest beliefs.
+    The index lives next to conn's database unless `root` is given; an
+    in-memory database needs an explicit root.
+    """
+    if np is None:
+        return []
+    if root is None:
+        db_file = retrieval_cache._db_file(conn)
+        if not db_file:
+            raise ValueError("search_beliefs: pass root for an in-memory database")
+        root = ann_root(db_file)
+    return sync_agent(conn, agent, root).search(vector, k, nprobe)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="IVF-flat ANN index over beliefs.embedding")
+    parser.add_argument("--agent", required=True)
+    parser.add_argument("--db", default=str(DB_PATH))
+    parser.add_argument("--rebuild", action="store_true")
+    parser.add_argument("--like", default="", help="Belief id whose embedding is the query")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--nprobe", type=int, default=DEFAULT_NPROBE)
+    args = parser.parse_args()
+
+    if np is None:
+        print("[ann_index] ERROR: numpy not installed", file=sys.stderr)
+        return 1
+    conn = sqlite3.connect(args.db)
+    try:
+        index = sync_agent(conn, args.agent, ann_root(args.db), rebuild=args.rebuild)
+        print(f"{args.agent}: {index.live} live rows, nlist={index.meta.get('nlist')}, "
+              f"tail={index.count - index.meta.get('built', 0)}")
+        if args.like:
+            row = conn.execute("SELECT embedding FROM beliefs WHERE id=?", (args.like,)).fetchone()
+            vec = _decode(row[0]) if row else None
+            if vec is None:
+                print(f"[ann_index] ERROR: no embedding for {args.like}", file=sys.stderr)
+                return 1
+            for rid, score in index.search(vec, args.k, args.nprobe):
+                print(f"[{score:.3f}] {rid}")
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+bench_activation.py — Rows-scored-per-second benchmark for activation-scorer.py.
+
+Compares the vectorized engine (score_arrays, hybrid and exact base level)
+against the legacy per-row compute_activation loop on synthetic rows, and optionally runs the full
+load → score → executemany write-back cycle against a throwaway SQLite DB.
+
+Usage:
+    python3 bench_activation.py                       # 10k, 100k, 1M rows
+    python3 bench_activation.py --sizes 10000 100000 --e2e
+    python3 bench_activation.py --max-access 500      # hot rows: exact cost grows, hybrid doesn't
+"""
+
+import argparse
+import importlib.util
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+
+SCRIPTS_DIR = Path(__file__).parent
+_spec = importlib.util.spec_from_file_location("activation_scorer", SCRIPTS_DIR / "activation-scorer.py")
+scorer = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(scorer)
+
+LEGACY_MAX_ROWS = 20_000  # the per-row loop is timed on a sample, then extrapolated
+
+
+def synth_columns(n: int, seed: int = 7, max_access: int = 9) -> dict:
+    rng = np.random.default_rng(seed)
+    now_ts = datetime.now(timezone.utc).timestamp()
+    created = now_ts - rng.uniform(3600, 180 * 86400, n)
+    last = created + (now_ts - created) * rng.uniform(0, 1, n)
+    return {
+        "now_ts": now_ts,
+        "created": created,
+        "last": last,
+        "access_count": rng.integers(0, max_access, n).astype(np.float64),
+        "decay_rate": rng.choice([0.1, 0.2, 0.3, 0.5, 0.7], n),
+        "importance": rng.uniform(0.15, 0.95, n),
+        "confidence": rng.uniform(0.5, 1.0, n),
+    }
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def bench_vectorized(cols: dict, exact: bool = False) -> float:
+    t0 = time.perf_counter()
+    scorer.score_arrays(
+        cols["now_ts"], cols["created"], cols["last"], cols["access_count"],
+        cols["decay_rate"], cols["importance"], cols["confidence"], exact=exact,
+    )
+    return time.perf_counter() - t0
+
+
+def bench_legacy(cols: dict) -> tuple[float, int]:
+    n = min(len(cols["created"]), LEGACY_MAX_ROWS)
+    now = datetime.fromtimestamp(cols["now_ts"], timezone.utc)
+    rows = [
+        (_iso(cols["created"][i]), _iso(cols["last"][i]), int(cols["access_count"][i]),
+         float(cols["decay_rate"][i]), float(cols["importance"][i]), float(cols["confidence"][i]))
+        for i in range(n)
+    ]
+    t0 = time.perf_counter()
+    for r in rows:
+        scorer.compute_activation(now, *r, exact=True)
+    return time.perf_counter() - t0, n
+
+
+def bench_e2e(cols: dict) -> float:
+    n = len(cols["created"])
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(str(Path(tmp) / "bench.db"))
+        conn.execute(
+            """CREATE TABLE beliefs (
+                 id TEXT PRIMARY KEY, content TEXT, status TEXT, created_at TEXT,
+                 last_accessed TEXT, access_count INTEGER, decay_rate REAL, importance REAL,
+                 confidence REAL, activation_score REAL, last_activation_calc TEXT)"""
+        )
+        conn.executemany(
+            "INSERT INTO beliefs VALUES (?,?,?,?,?,?,?,?,?,NULL,NULL)",
+            (
+                (f"b{i}", f"belief {i}", "active", _iso(cols["created"][i]), _iso(cols["last"][i]),
+                 int(cols["access_count"][i]), float(cols["decay_rate"][i]),
+                 float(cols["importance"][i]), float(cols["confidence"][i]))
+                for i in range(n)
+            ),
+        )
+        conn.commit()
+        t0 = time.perf_counter()
+        scorer.score_table(conn, "beliefs", "id")
+        elapsed = time.perf_counter() - t0
+        conn.close()
+    return elapsed
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Benchmark ACT-R activation scoring throughput")
+    ap.add_argument("--sizes", nargs="*", type=int, default=[10_000, 100_000, 1_000_000])
+    ap.add_argument("--e2e", action="store_true", help="Also time load + score + write-back on a temp DB")
+    ap.add_argument("--max-access", type=int, default=9, help="access_count drawn from [0, max-access)")
+    args = ap.parse_args()
+
+    print(f"{'rows':>10} | {'hybrid rows/s':>14} | {'exact rows/s':>13} | {'legacy rows/s':>14} | {'speedup':>8}"
+          + (f" | {'e2e rows/s':>11}" if args.e2e else ""))
+    print("-" * (78 + (14 if args.e2e else 0)))
+    for n in args.sizes:
+        cols = synth_columns(n, max_access=args.max_access)
+        vec_s = bench_vectorized(cols)
+        exact_s = bench_vectorized(cols, exact=True)
+        leg_s, leg_n = bench_legacy(cols)
+        vec_rate = n / vec_s
+        leg_rate = leg_n / leg_s
+        line = (f"{n:>10,} | {vec_rate:>14,.0f} | {n / exact_s:>13,.0f} | {leg_rate:>14,.0f}"
+                f" | {vec_rate / leg_rate:>7.1f}x")
+        if args.e2e:
+            line += f" | {n / bench_e2e(cols):>11,.0f}"
+        print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
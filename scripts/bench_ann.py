@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+bench_ann.py — Recall/latency benchmark for the IVF-flat index in ann_index.py.
+
+Builds an index over synthetic clustered embeddings (a Gaussian mixture,
+so there is neighbourhood structure for IVF to exploit) and compares
+brute-force cosine — what scheduleEmbedding/loadRecalledSemantic do today —
+against ann_index.search at several nprobe settings.
+
+Production embeddings are 1536-d (text-embedding-3-small); the default
+--dim 256 keeps 500k rows inside a small machine's RAM. Latency scales
+roughly linearly with dim for both paths.
+
+Usage:
+    python3 bench_ann.py                         # 50k and 500k, dim 256
+    python3 bench_ann.py --sizes 50000 --dim 1536 --nprobe 4 8 16 32
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+SCRIPTS_DIR = Path(__file__).parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+import ann_index
+
+
+def synth(n: int, dim: int, seed: int = 5, topics: int = 400):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((topics, dim)).astype(np.float32)
+    vecs = centers[rng.integers(0, topics, n)] + 0.35 * rng.standard_normal((n, dim)).astype(np.float32)
+    return ann_index._normalize(vecs)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Benchmark IVF-flat ANN vs brute-force cosine")
+    ap.add_argument("--sizes", nargs="*", type=int, default=[50_000, 500_000])
+    ap.add_argument("--dim", type=int, default=256)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--queries", type=int, default=50)
+    ap.add_argument("--nprobe", nargs="*", type=int, default=[1, 4, 8, 16, 32])
+    args = ap.parse_args()
+
+    for n in args.sizes:
+        vecs = synth(n, args.dim)
+        ids = [f"b{i}" for i in range(n)]
+        rng = np.random.default_rng(1)
+        queries = ann_index._normalize(
+            vecs[rng.choice(n, args.queries, replace=False)]
+            + 0.3 * rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+        )
+
+        with tempfile.TemporaryDirectory() as tmp:
+            index = ann_index.AnnIndex(Path(tmp), "bench")
+            t0 = time.perf_counter()
+            index.build(ids, vecs)
+            build_s = time.perf_counter() - t0
+
+            truth, brute_ms = [], []
+            for q in queries:
+                t0 = time.perf_counter()
+                scores = vecs @ q
+                top = np.argpartition(-scores, args.k - 1)[: args.k]
+                brute_ms.append((time.perf_counter() - t0) * 1000)
+                truth.append({ids[i] for i in top})
+
+            print(f"\n{n:,} vectors × {args.dim}d — nlist={index.meta['nlist']}, build {build_s:.1f}s, "
+                  f"brute force {statistics.median(brute_ms):.2f} ms/query")
+            print(f"{'nprobe':>7} | {'recall@' + str(args.k):>10} | {'ms/query':>9} | {'speedup':>8}")
+            print("-" * 44)
+            for nprobe in args.nprobe:
+                hits, lat = 0, []
+                for q, want in zip(queries, truth):
+                    t0 = time.perf_counter()
+                    got = index.search(q, args.k, nprobe)
+                    lat.append((time.perf_counter() - t0) * 1000)
+                    hits += len(want & {rid for rid, _ in got})
+                ms = statistics.median(lat)
+                print(f"{nprobe:>7} | {hits / (args.k * len(queries)):>10.3f} | {ms:>9.2f} | "
+                      f"{statistics.median(brute_ms) / ms:>7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
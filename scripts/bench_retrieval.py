@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+bench_retrieval.py — Latency and Python-heap benchmark for retrieve_memories.
+
+Compares retrieve() (ACT-R scored, sorted and limited inside SQLite) against
+the legacy path that fetched every memory for the agent, scored each row with
+act_r_score in Python and sorted the full list before slicing. The SQL rows
+bypass the result cache; "cache hit" times a repeat served from it.
+
+Peak memory is Python-heap allocation measured with tracemalloc; SQLite's
+own page cache is not included (it is the same for both paths).
+
+Usage:
+    python3 bench_retrieval.py                  # 100k memories
+    python3 bench_retrieval.py --rows 10000 100000 --runs 5 --fts
+"""
+
+import argparse
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+import migrate_schema
+import retrieval_cache
+import retrieve_memories
+
+AGENT = "forge"
+WORDS = ("auth jwt token deploy kafka postgres cache index retry budget schema queue "
+         "latency rollout canary migration webhook oauth session cookie").split()
+
+
+def build_db(path: Path, n: int, seed: int = 11) -> None:
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    conn = sqlite3.connect(str(path))
+    conn.execute(
+        """CREATE TABLE memories (
+             id TEXT PRIMARY KEY, agent_id TEXT NOT NULL, content TEXT NOT NULL,
+             importance REAL, decay_rate REAL, access_count INTEGER, last_accessed TEXT,
+             activation_score REAL DEFAULT 0.0, embedding BLOB, source TEXT, created_at TEXT, scope TEXT)"""
+    )
+    conn.executemany(
+        "INSERT INTO memories (id, agent_id, content, importance, decay_rate, access_count, last_accessed) "
+        "VALUES (?,?,?,?,?,?,?)",
+        (
+            (f"m{i}", AGENT if i % 4 else "__shared__",
+             " ".join(rng.choices(WORDS, k=12)) + f" note {i}",
+             rng.uniform(1, 10), rng.choice([0.1, 0.3, 0.5]), rng.randint(0, 20),
+             (now - timedelta(hours=rng.uniform(0, 24 * 120))).isoformat())
+            for i in range(n)
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+
+def legacy_retrieve(conn, agent, limit):
+    """The pre-SQL path: materialize, score in Python, full sort, slice."""
+    now = datetime.now(timezone.utc)
+    rows = conn.execute(
+        """SELECT id, content, importance, decay_rate, access_count, last_accessed, activation_score
+           FROM memories WHERE agent_id IN (?, '__shared__')""",
+        (agent,),
+    ).fetchall()
+    scored = [(retrieve_memories.act_r_score(*r[2:6], now=now), r) for r in rows]
+    scored.sort(reverse=True)
+    return scored[:limit]
+
+
+def measure(fn, runs):
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(times) * 1000, peak / 1024
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Benchmark SQL-side ACT-R top-k vs full materialization")
+    ap.add_argument("--rows", nargs="*", type=int, default=[100_000])
+    ap.add_argument("--limit", type=int, default=5)
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--fts", action="store_true", help="Also time keyword retrieval through memories_fts")
+    args = ap.parse_args()
+
+    print(f"{'rows':>9} | {'path':<24} | {'median ms':>10} | {'peak KiB':>10}")
+    print("-" * 64)
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.rows:
+            db = Path(tmp) / f"bench_{n}.db"
+            build_db(db, n)
+            conn = sqlite3.connect(str(db))
+            cases = [
+                ("legacy full materialize", lambda: legacy_retrieve(conn, AGENT, args.limit)),
+                ("sql top-k", lambda: retrieve_memories.retrieve(AGENT, limit=args.limit, conn=conn,
+                                                                 use_cache=False)),
+                ("sql top-k, cache hit", lambda: retrieve_memories.retrieve(AGENT, limit=args.limit, conn=conn)),
+            ]
+            if args.fts:
+                migrate_schema.migrate_fts(conn)
+                cases.append(("sql top-k + fts", lambda: retrieve_memories.retrieve(
+                    AGENT, ["kafka", "canary"], args.limit, conn=conn, use_cache=False)))
+            for name, fn in cases:
+                ms, kib = measure(fn, args.runs)
+                print(f"{n:>9,} | {name:<24} | {ms:>10.1f} | {kib:>10,.0f}")
+            retrieval_cache.for_connection(conn).close()  # its sidecar lives in tmp
+            conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,20 +1,77 @@
 #!/usr/bin/env python3
-"""build_pm_cognition_block.py — Standalone PM belief injector."""
+"""build_pm_cognition_block.py — Standalone PM belief injector.
+
+The __shared__ and chief sections are identical for every PM; they are
+materialized in shared_sections.py and rebuilt only after an approval or
+promotion invalidates them, so a spawn normally queries its private beliefs
+alone.
+"""
 
 import argparse
 import math
 import sqlite3
 import sys
+import time
 from datetime import datetime, timezone
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent))
+import retrieval_cache
+import shared_sections
+from context_packer import pack
+
 DB_DEFAULT = Path("/Users/acevashisth/.openclaw/workspace/state/vector.db")
 MAX_PRIVATE = 5
 MAX_SHARED = 3
 MAX_CHIEF = 5
+# Token budget for the belief lines of all three sections together; the
+# MAX_* counts above remain per-section caps. The shared and chief sections
+# get at most SHARED_TOKEN_BUDGET; private beliefs get the rest.
+TOKEN_BUDGET = 700
+SHARED_TOKEN_BUDGET = 350
+RECENCY_DECAY = 0.1  # per day of age
+
+# importance × recency_weight(created_at), computed by SQLite from the stored
+# created_epoch (migrate_schema.py); falls back to parsing created_at, and an
+# unknown age weighs 1.0 as in recency_weight().
+_EPOCH = "COALESCE(created_epoch, CAST(strftime('%s', created_at) AS REAL))"
+_VALUE_MATH = ("COALESCE(importance, 5.0) * COALESCE(exp(-:decay * "
+               "max(0, CAST((:now - {epoch}) / 86400 AS INTEGER))), 1.0)")
+_VALUE_UDF = "COALESCE(importance, 5.0) * belief_recency(:decay, :now - {epoch})"
+
+# Candidates are picked as before the single query: the top OVERFETCH × MAX_*
+# private and shared beliefs by activation_score, then importance (the order
+# activation-scorer.py ranks them for), and the top MAX_CHIEF chief
+# preferences by importance. Each namespace is one range of
+# idx_beliefs_agent_rank read from the index alone — in reverse for the
+# activation order, with a sort of the chief entries for the importance one —
+# and only the picked rowids are looked up in beliefs, where the decayed value
+# re-sorts them. :shared / :chief are NULL when those sections are cached.
+OVERFETCH = 4
+_BLOCK_SQL = """
+    WITH picked AS (
+        SELECT * FROM (
+            SELECT rowid AS rid, ROW_NUMBER() OVER (ORDER BY activation_score DESC, importance DESC) AS rn
+            FROM beliefs WHERE agent_id = :agent AND status = 'active'
+            ORDER BY activation_score DESC, importance DESC LIMIT :max_private * :overfetch)
+        UNION ALL
+        SELECT * FROM (
+            SELECT rowid AS rid, ROW_NUMBER() OVER (ORDER BY activation_score DESC, importance DESC) AS rn
+            FROM beliefs WHERE agent_id = :shared AND status = 'active'
+            ORDER BY activation_score DESC, importance DESC LIMIT :max_shared * :overfetch)
+        UNION ALL
+        SELECT * FROM (
+            SELECT rowid AS rid, ROW_NUMBER() OVER (ORDER BY importance DESC, activation_score DESC) AS rn
+            FROM beliefs WHERE agent_id = :chief AND status = 'active'
+            ORDER BY importance DESC, activation_score DESC LIMIT :max_chief)
+    )
+    SELECT b.agent_id, b.content, b.category, b.confidence, b.action_implication, {value} AS value
+    FROM picked p JOIN beliefs b ON b.rowid = p.rid
+    ORDER BY b.agent_id, value DESC, p.rn
+"""
 
 
-def recency_weight(created_at_str: str, decay_rate: float = 0.1) -> float:
+def recency_weight(created_at_str: str, decay_rate: float = RECENCY_DECAY) -> float:
     """Returns weight 0-1, decaying exponentially with age in days."""
     try:
         created = datetime.fromisoformat((created_at_str or "").replace("Z", "+00:00"))
@@ -24,96 +81,123 @@ def recency_weight(created_at_str: str, decay_rate: float = 0.1) -> float:
         return 1.0
 
 
-def _resort_with_decay(rows):
-    beliefs = []
-    for r in rows:
-        beliefs.append(
-            {
-                "content": r[0],
-                "category": r[1],
-                "confidence": float(r[2] if r[2] is not None else 0.5),
-                "action_implication": r[3],
-                "importance": float(r[4] if r[4] is not None else 5.0),
-                "created_at": r[5] or "",
-            }
-        )
-    beliefs.sort(
-        key=lambda b: b["importance"] * recency_weight(b.get("created_at", "")),
-        reverse=True,
-    )
-    return beliefs
-
+def _belief_recency(decay_rate, age_seconds):
+    """recency_weight with the age already computed by SQLite (NULL = unknown)."""
+    if age_seconds is None:
+        return 1.0
+    return math.exp(-decay_rate * max(0, int(age_seconds // 86400)))
 
-def build_pm_cognition_block(db_path: Path, agent_id: str) -> str:
-    conn = sqlite3.connect(str(db_path))
-    private_rows = []
-    shared_rows = []
-    chief_rows = []
 
+def _block_sql(conn: sqlite3.Connection, epoch: str) -> str:
+    """_BLOCK_SQL for this connection; registers belief_recency without math functions."""
     try:
-        private_rows = conn.execute(
-            """SELECT content, category, confidence, action_implication, importance, created_at
-               FROM beliefs
-               WHERE agent_id = ? AND status = 'active'
-               ORDER BY activation_score DESC, importance DESC
-               LIMIT ?""",
-            (agent_id, MAX_PRIVATE * 4),
-        ).fetchall()
-    except Exception as e:
-        print(f"[build_pm_cognition_block] WARNING: private belief query failed: {e}", file=sys.stderr)
-
+        conn.execute("SELECT exp(0.0)").fetchone()
+        value = _VALUE_MATH
+    except sqlite3.OperationalError:
+        conn.create_function("belief_recency", 2, _belief_recency, deterministic=True)
+        value = _VALUE_UDF
+    return _BLOCK_SQL.format(value=value.format(epoch=epoch))
+
+
+def build_pm_cognition_block(db_path: Path, agent_id: str, use_cache: bool = True,
+                             conn: sqlite3.Connection | None = None) -> str:
+    """
+    The <pm-cognition> block for agent_id. With use_cache, a block built from
+    the same beliefs (see retrieval_cache.py) is reused instead of re-queried.
+    Pass `conn` to reuse an open connection; it is left open.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(str(db_path))
     try:
-        shared_rows = conn.execute(
-            """SELECT content, category, confidence, action_implication, importance, created_at
-               FROM beliefs
-               WHERE agent_id = '__shared__' AND status = 'active'
-               ORDER BY activation_score DESC, importance DESC
-               LIMIT ?""",
-            (MAX_SHARED * 4,),
-        ).fetchall()
-    except Exception as e:
-        print(f"[build_pm_cognition_block] WARNING: shared belief query failed: {e}", file=sys.stderr)
-
+        if not use_cache:
+            return _build_block(conn, agent_id)
+        cache = retrieval_cache.for_connection(conn)
+        key = cache.make_key("cognition", agent_id, MAX_PRIVATE, MAX_SHARED, MAX_CHIEF)
+        return cache.cached(conn, key, (f"beliefs:{agent_id}", "beliefs:__shared__", "beliefs:chief"),
+                            lambda: _build_block(conn, agent_id))
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def _fetch_beliefs(conn: sqlite3.Connection, agent_id: str, with_shared: bool = True) -> list:
+    params = {"agent": agent_id, "decay": RECENCY_DECAY, "now": time.time(),
+              "shared": "__shared__" if with_shared else None, "chief": "chief" if with_shared else None,
+              "max_private": MAX_PRIVATE, "max_shared": MAX_SHARED, "max_chief": MAX_CHIEF,
+              "overfetch": OVERFETCH}
     try:
-        chief_rows = conn.execute(
-            """SELECT content, category, confidence, action_implication, importance, created_at
-               FROM beliefs
-               WHERE agent_id = 'chief' AND status = 'active'
-               ORDER BY importance DESC, activation_score DESC
-               LIMIT ?""",
-            (MAX_CHIEF,),
-        ).fetchall()
-    except Exception as e:
-        print(f"[build_pm_cognition_block] WARNING: chief belief query failed: {e}", file=sys.stderr)
+        return conn.execute(_block_sql(conn, _EPOCH), params).fetchall()
+    except sqlite3.OperationalError as e:
+        if "created_epoch" not in str(e):
+            raise
+    # Not migrated yet (migrate_schema.py): derive the epoch from created_at.
+    return conn.execute(_block_sql(conn, "CAST(strftime('%s', created_at) AS REAL)"), params).fetchall()
+
 
-    conn.close()
+def _format_belief(row: dict) -> str:
+    base = f"- [{row['category']}, {row['confidence']:.2f}] {row['content']}"
+    if row.get("action_implication") and str(row["action_implication"]).strip():
+        return f"{base}\n  → {str(row['action_implication']).strip()}"
+    return base
 
-    private_beliefs = _resort_with_decay(private_rows)[:MAX_PRIVATE]
-    shared_beliefs = _resort_with_decay(shared_rows)[:MAX_SHARED]
-    chief_beliefs = _resort_with_decay(chief_rows)[:MAX_CHIEF]
 
-    def format_belief(row: dict) -> str:
-        base = f"- [{row['category']}, {row['confidence']:.2f}] {row['content']}"
-        if row.get("action_implication") and str(row["action_implication"]).strip():
-            return f"{base}\n  → {str(row['action_implication']).strip()}"
-        return base
+def _shared_config() -> str:
+    return f"{MAX_SHARED},{MAX_CHIEF},{SHARED_TOKEN_BUDGET},{RECENCY_DECAY},{OVERFETCH}"
+
+
+def _build_block(conn: sqlite3.Connection, agent_id: str) -> str:
+    config = _shared_config()
+    cached, generation = shared_sections.lookup(conn, config)
+    stamp = retrieval_cache.data_version(conn, shared_sections.STAMP_TABLES) if cached is None else None
+    rows, failed = [], False
+    try:
+        rows = _fetch_beliefs(conn, agent_id, with_shared=cached is None)
+    except Exception as e:
+        failed = True
+        print(f"[build_pm_cognition_block] WARNING: belief query failed: {e}", file=sys.stderr)
+
+    # Value is the SQL ranking key (importance × recency); the packer keeps
+    # the most value per token that fits the budget, within each section cap.
+    candidates = []
+    for owner, content, category, confidence, implication, value in rows:
+        belief = {"content": content, "category": category,
+                  "confidence": float(confidence if confidence is not None else 0.5),
+                  "action_implication": implication}
+        group = "private" if owner == agent_id else "shared" if owner == "__shared__" else "chief"
+        candidates.append({"text": _format_belief(belief), "value": value, "group": group})
+
+    if cached is None:
+        kept = pack([c for c in candidates if c["group"] != "private"], SHARED_TOKEN_BUDGET,
+                    caps={"shared": MAX_SHARED, "chief": MAX_CHIEF})
+        cached = {"shared": [k["text"] for k in kept if k["group"] == "shared"],
+                  "chief": [k["text"] for k in kept if k["group"] == "chief"],
+                  "tokens": sum(k["tokens"] for k in kept)}
+        if not failed:
+            shared_sections.store(conn, generation, config, stamp, cached["shared"], cached["chief"],
+                                  cached["tokens"])
+    kept = pack([c for c in candidates if c["group"] == "private"], TOKEN_BUDGET - cached["tokens"],
+                caps={"private": MAX_PRIVATE})
+    private_beliefs = [k["text"] for k in kept]
+    shared_beliefs = cached["shared"]
+    chief_beliefs = cached["chief"]
 
     block = "<pm-cognition>\n"
     block += "## Your beliefs (private)\n"
     if private_beliefs:
-        block += "\n".join(format_belief(r) for r in private_beliefs) + "\n"
+        block += "\n".join(private_beliefs) + "\n"
     else:
         block += "No prior beliefs for this agent — forming from scratch.\n"
 
     block += "\n## Shared context (from VECTOR)\n"
     if shared_beliefs:
-        block += "\n".join(format_belief(r) for r in shared_beliefs) + "\n"
+        block += "\n".join(shared_beliefs) + "\n"
     else:
         block += "No shared context available.\n"
 
     if chief_beliefs:
         block += "\n## Chief's observed preferences (read-only — extracted from real interactions)\n"
-        block += "\n".join(format_belief(r) for r in chief_beliefs) + "\n"
+        block += "\n".join(chief_beliefs) + "\n"
 
     block += "</pm-cognition>"
     return block
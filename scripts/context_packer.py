@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+context_packer.py — Fit prompt context into a token budget by value.
+
+Callers hand over candidate items ({"text", "value"}, optionally "group")
+and a budget. pack() keeps the set with the highest total value that fits,
+chosen greedily by value per token (the 0/1-knapsack density heuristic, with
+the usual best-single-item check so one valuable long item is not lost to
+many cheap ones). Each item is first cut to max_item_tokens at a word
+boundary, which replaces the old fixed content[:N] slicing.
+
+Token counts come from estimate_tokens(), a local approximation of BPE
+lengths (about one token per short word or punctuation mark, more for long
+words). It needs no tokenizer and runs in microseconds.
+
+Used by build_pm_cognition_block.py, spawn_pm.py, system1_scan.py and
+system2_think.py.
+"""
+
+import re
+
+MAX_ITEM_TOKENS = 120
+
+_PIECE_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate LLM token count: 1 per word or symbol, +1 per 6 chars beyond the first 6."""
+    return sum(1 + max(0, len(p) - 6) // 6 for p in _PIECE_RE.findall(text or ""))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """`text` cut at a word boundary to at most max_tokens (ellipsis included)."""
+    text = text or ""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    used = 1  # the ellipsis
+    end = 0
+    for m in _PIECE_RE.finditer(text):
+        piece = m.group(0)
+        used += 1 + max(0, len(piece) - 6) // 6
+        if used > max_tokens:
+            break
+        end = m.end()
+    return text[:end].rstrip() + "…"
+
+
+def pack(items: list[dict], budget: int, caps: dict | None = None,
+         max_item_tokens: int = MAX_ITEM_TOKENS) -> list[dict]:
+    """
+    The subset of `items` to keep, in their original order. Each kept item
+    gets "text" truncated to max_item_tokens and "tokens" set. `caps` maps an
+    item's "group" to the most items that group may contribute.
+    """
+    caps = caps or {}
+    sized = []
+    for i, item in enumerate(items):
+        text = truncate_to_tokens(item["text"], max_item_tokens)
+        sized.append((i, {**item, "text": text, "tokens": max(1, estimate_tokens(text))}))
+
+    def fill(order):
+        chosen, used, per_group = [], 0, {}
+        for i, item in order:
+            group = item.get("group")
+            if group in caps and per_group.get(group, 0) >= caps[group]:
+                continue
+            if used + item["tokens"] > budget:
+                continue
+            chosen.append((i, item))
+            used += item["tokens"]
+            per_group[group] = per_group.get(group, 0) + 1
+        return chosen
+
+    by_density = sorted(sized, key=lambda e: (-max(e[1]["value"], 0.0) / e[1]["tokens"], e[0]))
+    chosen = fill(by_density)
+    fitting = [e for e in sized if e[1]["tokens"] <= budget and caps.get(e[1].get("group"), 1) > 0]
+    if fitting:
+        best = max(fitting, key=lambda e: (e[1]["value"], -e[0]))
+        if best[1]["value"] > sum(item["value"] for _, item in chosen):
+            chosen = fill([best] + [e for e in by_density if e[0] != best[0]])
+    return [item for _, item in sorted(chosen, key=lambda e: e[0])]
+
+
+def pack_sections(sections: list[tuple], budget: int, max_item_tokens: int = MAX_ITEM_TOKENS) -> list[str]:
+    """
+    Render (header, items, empty_line) sections into lines under one budget.
+    Headers always stay and are charged first. An empty section shows
+    empty_line; a section whose candidates were all squeezed out says so.
+    """
+    overhead = sum(estimate_tokens(header) for header, _, _ in sections)
+    flat = [{**item, "group": n} for n, (_, items, _) in enumerate(sections) for item in items]
+    kept = pack(flat, max(0, budget - overhead), max_item_tokens=max_item_tokens)
+    lines = []
+    for n, (header, items, empty_line) in enumerate(sections):
+        lines.append(header)
+        mine = [item["text"] for item in kept if item["group"] == n]
+        if mine:
+            lines.extend(mine)
+        elif items:
+            lines.append(f"  ({len(items)} omitted over token budget)")
+        else:
+            lines.append(empty_line)
+    return lines
@@ -6,20 +6,59 @@ Usage:
 
 Output:
   JSON array of keywords only.
+
+Expansions are cached in vector.db (expansion_cache), keyed by agent and a
+fingerprint of the normalized task. A task that is not an exact repeat is
+still served if its MinHash signature says it is a near-duplicate (estimated
+word-shingle Jaccard >= NEAR_DUP_JACCARD) of a cached one; LSH band rows in
+expansion_cache_bands keep that lookup to a few candidates. Entries expire
+after EXPANSION_TTL_S and the least recently used are evicted beyond
+MAX_CACHE_ENTRIES. Only LLM answers are cached — fallbacks are cheap to redo.
+
+With a latency budget (budget_s; --budget, default LLM_BUDGET_S) the LLM
+is asked on a background thread. If it has not answered within the budget,
+the local keywords from local_keywords.py are returned at once and the
+thread keeps running, so its answer lands in the cache for the next spawn.
+A daemon thread dies with its process, so long-lived callers (spawn_pm
+--batch, the prewarmer) call join_refreshes() before they exit. Short-lived
+callers (the CLI, spawn_pm for one spawn) pass isolate=True to ask from a
+detached `--refresh` child instead, which outlives them. The same local
+keywords replace the old regex fallback when the LLM call fails.
+
+expand_retrieval_queries() does the same for many (task, agent) pairs with
+one combined LLM request for all cache misses (spawn_pm.py --batch).
 """
 
 import argparse
+import hashlib
 import json
 import re
 import sqlite3
 import subprocess
 import sys
+import threading
+import time
 import uuid
+import zlib
 from datetime import datetime, timezone
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent))
+import local_keywords
+
 DB_PATH = Path('/Users/acevashisth/.openclaw/workspace/state/vector.db')
 
+LLM_BUDGET_S = 5.0
+EXPANSION_TTL_S = 7 * 24 * 3600
+MAX_CACHE_ENTRIES = 2000
+NEAR_DUP_JACCARD = 0.75
+MINHASH_PERMS = 64
+LSH_BANDS = 16  # 16 bands x 4 rows: candidates from ~0.5 Jaccard, verified at NEAR_DUP_JACCARD
+
+_MERSENNE = (1 << 61) - 1
+_PERMS = [((2 * i + 1) * 0x9E3779B97F4A7C15 % _MERSENNE, (i + 1) * 0x632BE59BD9B4E019 % _MERSENNE)
+          for i in range(MINHASH_PERMS)]
+
 
 def _now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
@@ -42,6 +81,104 @@ def _log(agent: str, task: str, mode: str, detail: str = '') -> None:
         pass
 
 
+# ── expansion cache ─────────────────────────────────────────────────────────
+
+def _normalize_task(task: str) -> list[str]:
+    return re.findall(r"[a-z0-9_]+", (task or '').lower())
+
+
+def task_fingerprint(task: str) -> str:
+    return hashlib.sha1(' '.join(_normalize_task(task)).encode('utf-8')).hexdigest()
+
+
+def _shingles(words: list[str]) -> set[str]:
+    return set(words) | {f'{a} {b}' for a, b in zip(words, words[1:])}
+
+
+def minhash(task: str) -> list[int]:
+    hashes = [zlib.crc32(sh.encode('utf-8')) for sh in _shingles(_normalize_task(task))]
+    if not hashes:
+        return []
+    return [min((a * h + b) % _MERSENNE for h in hashes) for a, b in _PERMS]
+
+
+def _bands(sig: list[int]) -> list[str]:
+    rows = MINHASH_PERMS // LSH_BANDS
+    return [f"{i}:{zlib.crc32(repr(sig[i * rows:(i + 1) * rows]).encode())}" for i in range(LSH_BANDS)]
+
+
+def _cache_conn() -> sqlite3.Connection:
+    conn = sqlite3.connect(str(DB_PATH), timeout=2.0)
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS expansion_cache (
+            agent_id TEXT NOT NULL, fingerprint TEXT NOT NULL, task TEXT,
+            keywords TEXT NOT NULL, minhash TEXT NOT NULL,
+            created_at REAL NOT NULL, last_used REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (agent_id, fingerprint));
+        CREATE TABLE IF NOT EXISTS expansion_cache_bands (
+            agent_id TEXT NOT NULL, band TEXT NOT NULL, fingerprint TEXT NOT NULL,
+            PRIMARY KEY (agent_id, band, fingerprint));
+    """)
+    return conn
+
+
+def cache_lookup(conn: sqlite3.Connection, task: str, agent_id: str):
+    """(keywords, how) for a cached exact or near-duplicate task, else None."""
+    now = time.time()
+    fp = task_fingerprint(task)
+    row = conn.execute(
+        'SELECT keywords FROM expansion_cache WHERE agent_id=? AND fingerprint=? AND created_at > ?',
+        (agent_id, fp, now - EXPANSION_TTL_S),
+    ).fetchone()
+    how = 'exact'
+    if row is None:
+        sig = minhash(task)
+        if not sig:
+            return None
+        bands = _bands(sig)
+        marks = ','.join('?' * len(bands))
+        best = None
+        for cand_fp, keywords, cand_sig in conn.execute(
+            f"""SELECT c.fingerprint, c.keywords, c.minhash FROM expansion_cache c
+                WHERE c.agent_id = ? AND c.created_at > ? AND c.fingerprint IN (
+                    SELECT fingerprint FROM expansion_cache_bands WHERE agent_id = ? AND band IN ({marks}))""",
+            [agent_id, now - EXPANSION_TTL_S, agent_id, *bands],
+        ):
+            other = json.loads(cand_sig)
+            jaccard = sum(x == y for x, y in zip(sig, other)) / MINHASH_PERMS
+            if jaccard >= NEAR_DUP_JACCARD and (best is None or jaccard > best[0]):
+                best = (jaccard, cand_fp, keywords)
+        if best is None:
+            return None
+        fp, row, how = best[1], (best[2],), f'near j={best[0]:.2f}'
+    conn.execute('UPDATE expansion_cache SET last_used=?, hits=hits+1 WHERE agent_id=? AND fingerprint=?',
+                 (now, agent_id, fp))
+    conn.commit()
+    return json.loads(row[0]), how
+
+
+def cache_store(conn: sqlite3.Connection, task: str, agent_id: str, keywords: list[str]) -> None:
+    now = time.time()
+    fp, sig = task_fingerprint(task), minhash(task)
+    conn.execute(
+        'INSERT OR REPLACE INTO expansion_cache (agent_id, fingerprint, task, keywords, minhash, created_at, last_used) '
+        'VALUES (?,?,?,?,?,?,?)',
+        (agent_id, fp, (task or '')[:500], json.dumps(keywords), json.dumps(sig), now, now),
+    )
+    conn.execute('DELETE FROM expansion_cache_bands WHERE agent_id=? AND fingerprint=?', (agent_id, fp))
+    if sig:
+        conn.executemany('INSERT OR IGNORE INTO expansion_cache_bands (agent_id, band, fingerprint) VALUES (?,?,?)',
+                         [(agent_id, b, fp) for b in _bands(sig)])
+    conn.execute('DELETE FROM expansion_cache WHERE created_at <= ?', (now - EXPANSION_TTL_S,))
+    conn.execute(
+        'DELETE FROM expansion_cache WHERE rowid IN (SELECT rowid FROM expansion_cache '
+        'ORDER BY last_used DESC LIMIT -1 OFFSET ?)', (MAX_CACHE_ENTRIES,))
+    conn.execute(
+        'DELETE FROM expansion_cache_bands WHERE NOT EXISTS (SELECT 1 FROM expansion_cache c '
+        'WHERE c.agent_id = expansion_cache_bands.agent_id AND c.fingerprint = expansion_cache_bands.fingerprint)')
+    conn.commit()
+
+
 def fallback_keywords(task: str) -> list[str]:
     words = re.findall(r"[A-Za-z0-9_]{5,}", task or "")
     out = []
@@ -56,6 +193,22 @@ def fallback_keywords(task: str) -> list[str]:
     return out
 
 
+def _local_keywords(task: str, agent_id: str) -> list[str]:
+    """Corpus-weighted local keywords; the regex fallback if the DB is unusable."""
+    try:
+        conn = sqlite3.connect(str(DB_PATH)) if DB_PATH.exists() else None
+        try:
+            kws = local_keywords.extract_keywords(conn, agent_id, task)
+        finally:
+            if conn is not None:
+                conn.close()
+        if kws:
+            return kws
+    except Exception as e:
+        print(f'[expand_retrieval_query] WARNING: local keyword tier failed: {e}', file=sys.stderr)
+    return fallback_keywords(task)
+
+
 def _extract_json_array(text: str) -> list[str] | None:
     if not text:
         return None
@@ -68,6 +221,10 @@ def _extract_json_array(text: str) -> list[str] | None:
         return None
     if not isinstance(data, list):
         return None
+    return _clean_keywords(data)
+
+
+def _clean_keywords(data: list) -> list[str]:
     cleaned = []
     seen = set()
     for item in data:
@@ -82,7 +239,133 @@ def _extract_json_array(text: str) -> list[str] | None:
     return cleaned
 
 
-def expand_retrieval_query(task: str, agent_id: str) -> list[str]:
+def expand_retrieval_query(task: str, agent_id: str, use_cache: bool = True,
+                           budget_s: float | None = None, isolate: bool = False) -> list[str]:
+    """
+    Retrieval keywords for `task`: cached, else from the LLM. With budget_s,
+    wait at most that long for the LLM before answering from the local tier;
+    isolate asks from a detached child interpreter rather than a thread.
+    """
+    cache = None
+    if use_cache and (task or '').strip():
+        try:
+            cache = _cache_conn()
+            hit = cache_lookup(cache, task, agent_id)
+            if hit:
+                cache.close()
+                _log(agent_id, task, 'cache_hit', hit[1])
+                return hit[0]
+            _log(agent_id, task, 'cache_miss')
+        except Exception as e:
+            print(f'[expand_retrieval_query] WARNING: expansion cache unavailable: {e}', file=sys.stderr)
+            if cache is not None:
+                cache.close()
+            cache = None
+
+    if budget_s:
+        if cache is not None:
+            cache.close()
+        return _expand_within_budget(task, agent_id, budget_s, isolate)
+    try:
+        return _expand_via_agent(task, agent_id, cache)
+    finally:
+        if cache is not None:
+            cache.close()
+
+
+def _start_refresh(task: str, agent_id: str) -> subprocess.Popen:
+    """Detached child that asks the LLM, stores the answer and prints it."""
+    return subprocess.Popen(
+        [sys.executable, str(Path(__file__).resolve()), '--task', task, '--agent', agent_id, '--refresh'],
+        stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        text=True, start_new_session=True,
+    )
+
+
+_refresh_threads: list = []
+_refresh_lock = threading.Lock()
+
+
+def join_refreshes(timeout: float | None = None) -> int:
+    """Wait for outstanding background LLM calls (at most `timeout` s overall); returns how many still run."""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    with _refresh_lock:
+        threads = list(_refresh_threads)
+    for thread in threads:
+        thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+    with _refresh_lock:
+        _refresh_threads[:] = [t for t in _refresh_threads if t.is_alive()]
+        return len(_refresh_threads)
+
+
+def _start_refresh_thread(fn, *args) -> tuple[threading.Thread, dict]:
+    """fn(*args, cache) on a daemon thread with its own cache connection; its result lands in box['result']."""
+    box: dict = {}
+
+    def run():
+        cache = None
+        try:
+            cache = _cache_conn()
+        except Exception:
+            pass
+        try:
+            box['result'] = fn(*args, cache)
+        except Exception as e:
+            print(f'[expand_retrieval_query] WARNING: background expansion failed: {e}', file=sys.stderr)
+        finally:
+            if cache is not None:
+                cache.close()
+
+    thread = threading.Thread(target=run, name='expansion-refresh', daemon=True)
+    with _refresh_lock:
+        _refresh_threads[:] = [t for t in _refresh_threads if t.is_alive()]
+        _refresh_threads.append(thread)
+    thread.start()
+    return thread, box
+
+
+def _expand_within_budget(task: str, agent_id: str, budget_s: float, isolate: bool = False) -> list[str]:
+    if not isolate:
+        thread, box = _start_refresh_thread(_expand_via_agent, task, agent_id)
+        thread.join(budget_s)
+        if thread.is_alive():
+            kws = _local_keywords(task, agent_id)
+            _log(agent_id, task, 'budget_local', f'llm over {budget_s}s budget; answer will be cached')
+            return kws
+        return box.get('result') or _local_keywords(task, agent_id)
+    try:
+        child = _start_refresh(task, agent_id)
+        out, _ = child.communicate(timeout=budget_s)
+        data = json.loads(out.strip() or '[]')
+        if isinstance(data, list) and data:
+            return [str(x) for x in data]
+    except subprocess.TimeoutExpired:
+        kws = _local_keywords(task, agent_id)
+        _log(agent_id, task, 'budget_local', f'llm over {budget_s}s budget; answer will be cached')
+        return kws
+    except Exception as e:
+        print(f'[expand_retrieval_query] WARNING: budgeted expansion failed: {e}', file=sys.stderr)
+    return _local_keywords(task, agent_id)
+
+
+def _ask_agent(prompt: str) -> str:
+    """Text of one `openclaw agent` reply; raises on any failure."""
+    session_id = str(uuid.uuid4())
+    r = subprocess.run(
+        ['openclaw', 'agent', '--json', '--session-id', session_id, '--message', prompt],
+        capture_output=True,
+        text=True,
+        timeout=90,
+    )
+    if r.returncode != 0:
+        raise RuntimeError(f'openclaw agent rc={r.returncode}: {r.stderr[:160]}')
+
+    data = json.loads(r.stdout)
+    payloads = data.get('result', {}).get('payloads', [])
+    return payloads[0].get('text', '') if payloads else ''
+
+
+def _expand_via_agent(task: str, agent_id: str, cache: sqlite3.Connection | None) -> list[str]:
     prompt = (
         f'Given this task for agent {agent_id}: "{task}"\n\n'
         'List 5-8 specific keywords to search for relevant memories and beliefs.\n'
@@ -93,38 +376,181 @@ def expand_retrieval_query(task: str, agent_id: str) -> list[str]:
     )
 
     try:
-        session_id = str(uuid.uuid4())
-        r = subprocess.run(
-            ['openclaw', 'agent', '--json', '--session-id', session_id, '--message', prompt],
-            capture_output=True,
-            text=True,
-            timeout=90,
-        )
-        if r.returncode != 0:
-            raise RuntimeError(f'openclaw agent rc={r.returncode}: {r.stderr[:160]}')
-
-        data = json.loads(r.stdout)
-        payloads = data.get('result', {}).get('payloads', [])
-        text = payloads[0].get('text', '') if payloads else ''
-        keywords = _extract_json_array(text)
+        keywords = _extract_json_array(_ask_agent(prompt))
         if keywords:
             _log(agent_id, task, 'api')
+            if cache is not None:
+                try:
+                    cache_store(cache, task, agent_id, keywords)
+                except Exception as e:
+                    print(f'[expand_retrieval_query] WARNING: expansion cache write failed: {e}', file=sys.stderr)
             return keywords
         raise ValueError('API response missing parseable JSON array')
     except Exception as e:
-        fb = fallback_keywords(task)
+        fb = _local_keywords(task, agent_id)
         _log(agent_id, task, 'fallback', str(e))
         return fb
 
 
+# ── batch ───────────────────────────────────────────────────────────────────
+
+def _expand_batch_via_agent(pairs: list, cache: sqlite3.Connection | None) -> list:
+    """One LLM request for all (task, agent) pairs; None where it gave no usable answer."""
+    numbered = '\n'.join(f'{i}. [agent {agent}] "{task}"' for i, (task, agent) in enumerate(pairs, 1))
+    prompt = (
+        f'Below are {len(pairs)} tasks, each for a named agent:\n{numbered}\n\n'
+        'For EACH task list 5-8 specific keywords to search for relevant memories and beliefs.\n'
+        'Focus on: technical terms, concepts, related topics, potential failure modes.\n'
+        'Be specific — not generic words like "fix" or "issue".\n'
+        'Return ONLY a JSON object mapping each task number to its array of strings: '
+        '{"1": ["keyword1", ...], "2": [...]}\n'
+        'No explanation, no markdown, just the JSON object.'
+    )
+    try:
+        text = _ask_agent(prompt)
+        m = re.search(r"\{[\s\S]*\}", text or '')
+        data = json.loads(m.group(0)) if m else {}
+        if not isinstance(data, dict):
+            raise ValueError('API response missing parseable JSON object')
+    except Exception as e:
+        for task, agent in pairs:
+            _log(agent, task, 'fallback', f'batch: {e}')
+        return [None] * len(pairs)
+
+    out = []
+    for i, (task, agent) in enumerate(pairs, 1):
+        raw = data.get(str(i))
+        keywords = _clean_keywords(raw) if isinstance(raw, list) else []
+        if not keywords:
+            _log(agent, task, 'fallback', 'batch: no keywords for this task')
+            out.append(None)
+            continue
+        _log(agent, task, 'api_batch')
+        if cache is not None:
+            try:
+                cache_store(cache, task, agent, keywords)
+            except Exception as e:
+                print(f'[expand_retrieval_query] WARNING: expansion cache write failed: {e}', file=sys.stderr)
+        out.append(keywords)
+    return out
+
+
+def _start_batch_refresh() -> subprocess.Popen:
+    """Detached child that reads pairs as JSON on stdin, asks the LLM once, caches and prints."""
+    return subprocess.Popen(
+        [sys.executable, str(Path(__file__).resolve()), '--task', '', '--agent', '', '--refresh-batch'],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        text=True, start_new_session=True,
+    )
+
+
+def expand_retrieval_queries(pairs: list, use_cache: bool = True, budget_s: float | None = None,
+                             local_only: bool = False, isolate: bool = False) -> list[list[str]]:
+    """
+    Keywords for each (task, agent_id) pair, in order. Cache hits are served
+    as in expand_retrieval_query; all misses share one LLM request. With
+    local_only the LLM is skipped and every miss gets the local tier.
+    """
+    results: list = [None] * len(pairs)
+    misses: dict = {}  # (task, agent) -> indexes into pairs
+    cache = None
+    try:
+        if use_cache:
+            try:
+                cache = _cache_conn()
+            except Exception as e:
+                print(f'[expand_retrieval_query] WARNING: expansion cache unavailable: {e}', file=sys.stderr)
+        for i, (task, agent) in enumerate(pairs):
+            if not (task or '').strip():
+                results[i] = []
+                continue
+            hit = None
+            if cache is not None:
+                try:
+                    hit = cache_lookup(cache, task, agent)
+                except sqlite3.Error:
+                    hit = None
+                _log(agent, task, 'cache_hit' if hit else 'cache_miss', hit[1] if hit else '')
+            if hit:
+                results[i] = hit[0]
+            else:
+                misses.setdefault((task, agent), []).append(i)
+
+        answers = [None] * len(misses)
+        if misses and not local_only:
+            todo = list(misses)
+            if budget_s and not isolate:
+                thread, box = _start_refresh_thread(_expand_batch_via_agent, todo)
+                thread.join(budget_s)
+                if thread.is_alive():
+                    for task, agent in todo:
+                        _log(agent, task, 'budget_local', f'batch llm over {budget_s}s budget; answers will be cached')
+                else:
+                    answers = box.get('result') or answers
+            elif budget_s:
+                try:
+                    child = _start_batch_refresh()
+                    out, _ = child.communicate(json.dumps(todo), timeout=budget_s)
+                    data = json.loads(out.strip() or '[]')
+                    if isinstance(data, list) and len(data) == len(todo):
+                        answers = data
+                except subprocess.TimeoutExpired:
+                    for task, agent in todo:
+                        _log(agent, task, 'budget_local', f'batch llm over {budget_s}s budget; answers will be cached')
+                except Exception as e:
+                    print(f'[expand_retrieval_query] WARNING: budgeted batch expansion failed: {e}', file=sys.stderr)
+            else:
+                answers = _expand_batch_via_agent(todo, cache)
+        for (task, agent), answer in zip(list(misses), answers):
+            keywords = answer or _local_keywords(task, agent)
+            for i in misses[(task, agent)]:
+                results[i] = keywords
+    finally:
+        if cache is not None:
+            cache.close()
+    return results
+
+
 def main() -> int:
     ap = argparse.ArgumentParser()
     ap.add_argument('--task', required=True)
     ap.add_argument('--agent', required=True)
+    ap.add_argument('--no-cache', action='store_true', help='Always ask the LLM; skip the expansion cache')
+    ap.add_argument('--budget', type=float, default=LLM_BUDGET_S,
+                    help=f'Seconds to wait for the LLM before using local keywords (0 = wait; default {LLM_BUDGET_S})')
+    ap.add_argument('--refresh', action='store_true', help=argparse.SUPPRESS)
+    ap.add_argument('--refresh-batch', action='store_true', help=argparse.SUPPRESS)
     args = ap.parse_args()
 
-    kws = expand_retrieval_query(args.task, args.agent)
-    print(json.dumps(kws))
+    if args.refresh_batch:
+        cache = None
+        try:
+            cache = _cache_conn()
+        except Exception:
+            pass
+        try:
+            kws = _expand_batch_via_agent([tuple(p) for p in json.load(sys.stdin)], cache)
+        finally:
+            if cache is not None:
+                cache.close()
+    elif args.refresh:
+        cache = None
+        try:
+            cache = _cache_conn()
+        except Exception:
+            pass
+        try:
+            kws = _expand_via_agent(args.task, args.agent, cache)
+        finally:
+            if cache is not None:
+                cache.close()
+    else:
+        kws = expand_retrieval_query(args.task, args.agent, use_cache=not args.no_cache, budget_s=args.budget,
+                                     isolate=True)
+    try:
+        print(json.dumps(kws), flush=True)
+    except BrokenPipeError:
+        pass  # budgeted parent already answered locally; the cache write above is what mattered
     return 0
 
 
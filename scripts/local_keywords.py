@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+local_keywords.py — Millisecond keyword extraction from a task, weighted by
+the agent's own corpus. This is the local tier in front of the LLM expansion
+in expand_retrieval_query.py.
+
+Candidate phrases are split out of the task at stopwords and punctuation,
+as in RAKE. Each word scores sqrt(degree/frequency) (RAKE, dampened so one
+long phrase does not dominate) times its IDF over the agent's memories and
+active beliefs. Words the corpus has never seen, and bare numbers, are
+damped: they rarely match anything at retrieval time. Adjacent word pairs
+inside a phrase whose words the corpus knows are offered as phrases.
+
+Document frequencies persist in vector.db (keyword_df, keyword_df_meta) per
+agent. A source-table signature refreshes them: new rows are appended;
+any other change triggers a rebuild.
+
+Usage:
+    python3 local_keywords.py --agent forge --task "fix JWT auth bug"
+"""
+
+import argparse
+import json
+import math
+import re
+import sqlite3
+import sys
+from pathlib import Path
+
+DB_PATH = Path("/Users/acevashisth/.openclaw/workspace/state/vector.db")
+
+MAX_KEYWORDS = 8
+MAX_PHRASES = 2
+UNSEEN_WEIGHT = 0.6
+NUMBER_WEIGHT = 0.5
+
+# English function words plus task boilerplate the LLM prompt also rules out.
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have having
+he her here hers him his how i if in into is it its itself just me more most my no nor not now of off on
+once only or other our ours out over own same she should so some such than that the their them then there
+these they this those through to too under until up very was we were what when where which while who whom
+why will with would you your yours every
+fix fixed fixes fixing issue issues bug bugs problem task ticket make add added update updated implement
+implemented new please need needs want should via using use used
+""".split())
+
+SOURCES = (
+    ("memories", "agent_id = ?"),
+    ("beliefs", "agent_id = ? AND status = 'active'"),
+)
+
+_PHRASE_SPLIT_RE = re.compile(r"[^\w\s-]|\s-\s")
+_WORD_RE = re.compile(r"[a-z0-9_]+(?:-[a-z0-9_]+)*")
+
+
+def _words(text: str) -> list[str]:
+    return [w for w in _WORD_RE.findall((text or "").lower()) if len(w) >= 3 or any(c.isdigit() for c in w)]
+
+
+def _doc_terms(text: str) -> set[str]:
+    return {w for w in _words(text) if w not in STOPWORDS}
+
+
+def _ensure_tables(conn: sqlite3.Connection) -> None:
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS keyword_df (
+            agent_id TEXT NOT NULL, term TEXT NOT NULL, df INTEGER NOT NULL,
+            PRIMARY KEY (agent_id, term)) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS keyword_df_meta (
+            agent_id TEXT PRIMARY KEY, n_docs INTEGER NOT NULL, signature TEXT NOT NULL);
+    """)
+
+
+def _signature(conn: sqlite3.Connection, agent: str) -> list:
+    sig = []
+    for table, where in SOURCES:
+        try:
+            sig += list(conn.execute(
+                f"SELECT COUNT(*), COALESCE(MAX(rowid), 0), TOTAL(length(content)) FROM {table} WHERE {where}",
+                (agent,),
+            ).fetchone())
+        except sqlite3.OperationalError:
+            sig += [0, 0, 0]
+    return sig
+
+
+def _rows(conn: sqlite3.Connection, agent: str, after: list | None = None) -> list[str]:
+    texts = []
+    for i, (table, where) in enumerate(SOURCES):
+        floor = after[i * 3 + 1] if after else 0
+        try:
+            texts += [r[0] or "" for r in conn.execute(
+                f"SELECT content FROM {table} WHERE {where} AND rowid > ?", (agent, floor))]
+        except sqlite3.OperationalError:
+            pass
+    return texts
+
+
+def _count(texts: list[str]) -> dict[str, int]:
+    df: dict[str, int] = {}
+    for text in texts:
+        for term in _doc_terms(text):
+            df[term] = df.get(term, 0) + 1
+    return df
+
+
+def refresh_stats(conn: sqlite3.Connection, agent: str, rebuild: bool = False) -> int:
+    """Bring the agent's document frequencies up to date; returns the corpus size."""
+    _ensure_tables(conn)
+    sig = _signature(conn, agent)
+    row = conn.execute("SELECT n_docs, signature FROM keyword_df_meta WHERE agent_id=?", (agent,)).fetchone()
+    old = json.loads(row[1]) if row else None
+    if not rebuild and old == sig:
+        return row[0]
+
+    appended = None
+    if not rebuild and old and len(old) == len(sig):
+        new_texts = _rows(conn, agent, old)
+        grew = all(sig[i] - old[i] >= 0 for i in range(len(sig)))
+        sizes = sum(len(t) for t in new_texts)
+        if grew and len(new_texts) == sum(sig[0::3]) - sum(old[0::3]) \
+                and sizes == sum(sig[2::3]) - sum(old[2::3]):
+            appended = new_texts
+    if appended is not None:
+        conn.executemany(
+            "INSERT INTO keyword_df (agent_id, term, df) VALUES (?,?,?) "
+            "ON CONFLICT(agent_id, term) DO UPDATE SET df = df + excluded.df",
+            [(agent, t, n) for t, n in _count(appended).items()],
+        )
+    else:
+        conn.execute("DELETE FROM keyword_df WHERE agent_id=?", (agent,))
+        conn.executemany("INSERT INTO keyword_df (agent_id, term, df) VALUES (?,?,?)",
+                         [(agent, t, n) for t, n in _count(_rows(conn, agent)).items()])
+    n_docs = sum(sig[0::3])
+    conn.execute("INSERT OR REPLACE INTO keyword_df_meta (agent_id, n_docs, signature) VALUES (?,?,?)",
+                 (agent, n_docs, json.dumps(sig)))
+    conn.commit()
+    return n_docs
+
+
+def _phrases(task: str) -> list[list[str]]:
+    phrases = []
+    for chunk in _PHRASE_SPLIT_RE.split((task or "").lower()):
+        current = []
+        for word in _WORD_RE.findall(chunk):
+            if word in STOPWORDS or not (len(word) >= 3 or any(c.isdigit() for c in word)):
+                if current:
+                    phrases.append(current)
+                current = []
+            else:
+                current.append(word)
+        if current:
+            phrases.append(current)
+    return phrases
+
+
+def extract_keywords(conn: sqlite3.Connection | None, agent: str, task: str,
+                     limit: int = MAX_KEYWORDS) -> list[str]:
+    """
+    Up to `limit` keywords for `task`, best first. The first MAX_PHRASES
+    slots can go to two-word phrases the corpus knows both words of.
+    With conn=None the words are ranked by RAKE alone.
+    """
+    phrases = _phrases(task)
+    if not phrases:
+        return []
+    freq: dict[str, int] = {}
+    degree: dict[str, int] = {}
+    for phrase in phrases:
+        for w in phrase:
+            freq[w] = freq.get(w, 0) + 1
+            degree[w] = degree.get(w, 0) + len(phrase)
+
+    n_docs, df = 0, {}
+    if conn is not None:
+        try:
+            n_docs = refresh_stats(conn, agent)
+            marks = ",".join("?" * len(freq))
+            df = dict(conn.execute(
+                f"SELECT term, df FROM keyword_df WHERE agent_id=? AND term IN ({marks})", [agent, *freq]
+            ).fetchall())
+        except sqlite3.Error as e:
+            print(f"[local_keywords] WARNING: corpus stats unavailable: {e}", file=sys.stderr)
+
+    def weight(w: str) -> float:
+        score = math.sqrt(degree[w] / freq[w])
+        if w.isdigit():
+            score *= NUMBER_WEIGHT
+        if n_docs:
+            score *= math.log((n_docs + 1) / (df.get(w, 0) + 1)) + 1.0
+            if not df.get(w):
+                score *= UNSEEN_WEIGHT
+        return score
+
+    scores = {w: weight(w) for w in freq}
+    multi = {f"{a} {b}": scores[a] + scores[b] for p in phrases for a, b in zip(p, p[1:])
+             if not (a.isdigit() or b.isdigit()) and (not n_docs or (df.get(a) and df.get(b)))}
+    out = [p for p, _ in sorted(multi.items(), key=lambda kv: -kv[1])[:MAX_PHRASES]]
+    out += sorted(scores, key=lambda w: (-scores[w], w))
+    seen, result = set(), []
+    for k in out:
+        if k not in seen:
+            seen.add(k)
+            result.append(k)
+    return result[:limit]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Extract retrieval keywords from a task without an LLM.")
+    parser.add_argument("--agent", required=True)
+    parser.add_argument("--task", required=True)
+    parser.add_argument("--limit", type=int, default=MAX_KEYWORDS)
+    parser.add_argument("--db", default=str(DB_PATH))
+    parser.add_argument("--rebuild", action="store_true", help="Recount the agent's document frequencies")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db) if Path(args.db).exists() else None
+    try:
+        if conn is not None and args.rebuild:
+            refresh_stats(conn, args.agent, rebuild=True)
+        print(json.dumps(extract_keywords(conn, args.agent, args.task, args.limit)))
+    finally:
+        if conn is not None:
+            conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
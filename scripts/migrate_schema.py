@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+migrate_schema.py — Idempotent schema migrations for vector.db that live on
+the Python side (the plugin's gateway_start hook owns column additions).
+
+Migrations:
+  fts       FTS5 full-text indexes memories_fts / beliefs_fts (external content,
+            kept in sync by triggers) for ranked keyword retrieval.
+  counters  change_counters table, bumped by triggers on every write to a
+            tracked table (row '<table>') and per agent (row '<table>:<agent_id>');
+            retrieval_cache.py uses it as a data version.
+  rank      beliefs.created_epoch (created_at as Unix seconds, kept in sync by
+            triggers) and idx_beliefs_agent_rank, for the single-query
+            cognition block in build_pm_cognition_block.py.
+  verdicts  agent_messages / proposals .validator_fingerprint — the validator
+            ruleset a stored verdict was reached under (read_agent_messages.py,
+            revalidate_messages.py).
+
+Usage:
+    python3 migrate_schema.py                 # apply everything pending
+    python3 migrate_schema.py --rebuild-fts   # also re-index existing rows
+
+Every migration is safe to re-run.
+"""
+
+import argparse
+import sqlite3
+import sys
+from pathlib import Path
+
+DB_PATH = Path("/Users/acevashisth/.openclaw/workspace/state/vector.db")
+
+# table → FTS5 shadow index. Only `content` is indexed; agent_id/status
+# filtering happens on the base table via the rowid join.
+FTS_TABLES = {
+    "memories": "memories_fts",
+    "beliefs": "beliefs_fts",
+}
+
+
+def _table_exists(conn: sqlite3.Connection, name: str) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name=? AND type IN ('table', 'view')", (name,)
+    ).fetchone() is not None
+
+
+def _index_exists(conn: sqlite3.Connection, name: str) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name=? AND type='index'", (name,)).fetchone() is not None
+
+
+def migrate_fts(conn: sqlite3.Connection, rebuild: bool = False) -> list[str]:
+    """
+    Create the FTS5 indexes and their sync triggers. The update trigger fires
+    only on UPDATE OF content, so activation rescoring never touches the index.
+    Returns the names of indexes created or rebuilt.
+    """
+    done = []
+    for table, fts in FTS_TABLES.items():
+        if not _table_exists(conn, table):
+            continue
+        created = not _table_exists(conn, fts)
+        conn.executescript(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+                content, content='{table}', content_rowid='rowid',
+                tokenize='unicode61 remove_diacritics 2'
+            );
+            CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN
+                INSERT INTO {fts}(rowid, content) VALUES (new.rowid, new.content);
+            END;
+            CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN
+                INSERT INTO {fts}({fts}, rowid, content) VALUES ('delete', old.rowid, old.content);
+            END;
+            CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF content ON {table} BEGIN
+                INSERT INTO {fts}({fts}, rowid, content) VALUES ('delete', old.rowid, old.content);
+                INSERT INTO {fts}(rowid, content) VALUES (new.rowid, new.content);
+            END;
+        """)
+        if created or rebuild:
+            conn.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+            done.append(fts)
+    conn.commit()
+    return done
+
+
+# table → columns whose UPDATE bumps the counter (None = any column). Rescoring
+# memories.activation_score does not affect retrieve(), which scores itself.
+COUNTED_TABLES = {
+    "memories": ("agent_id", "content", "importance", "decay_rate", "access_count", "last_accessed"),
+    "beliefs": None,
+}
+
+
+def migrate_change_counters(conn: sqlite3.Connection) -> list[str]:
+    """
+    Create change_counters and its triggers. Per-agent rows are created on
+    the agent's first write, so a missing '<table>:<agent>' row reads as 0.
+    Returns the tables newly tracked.
+    """
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS change_counters (tbl TEXT PRIMARY KEY, n INTEGER NOT NULL DEFAULT 0)"
+    )
+    done = []
+    for table, columns in COUNTED_TABLES.items():
+        if not _table_exists(conn, table):
+            continue
+        cur = conn.execute("INSERT OR IGNORE INTO change_counters (tbl, n) VALUES (?, 0)", (table,))
+        if cur.rowcount:
+            done.append(table)
+        bump = f"UPDATE change_counters SET n = n + 1 WHERE tbl = '{table}';"
+        of = f" OF {', '.join(columns)}" if columns else ""
+
+        def bump_agent(row: str, when: str = "true") -> str:
+            return (f"INSERT INTO change_counters (tbl, n) SELECT '{table}:' || {row}.agent_id, 1 WHERE {when} "
+                    f"ON CONFLICT(tbl) DO UPDATE SET n = n + 1;")
+
+        conn.executescript(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_cc_ai AFTER INSERT ON {table} BEGIN {bump} END;
+            CREATE TRIGGER IF NOT EXISTS {table}_cc_ad AFTER DELETE ON {table} BEGIN {bump} END;
+            CREATE TRIGGER IF NOT EXISTS {table}_cc_au AFTER UPDATE{of} ON {table} BEGIN {bump} END;
+            CREATE TRIGGER IF NOT EXISTS {table}_cc_agent_ai AFTER INSERT ON {table} BEGIN
+                {bump_agent("new")} END;
+            CREATE TRIGGER IF NOT EXISTS {table}_cc_agent_ad AFTER DELETE ON {table} BEGIN
+                {bump_agent("old")} END;
+            CREATE TRIGGER IF NOT EXISTS {table}_cc_agent_au AFTER UPDATE{of} ON {table} BEGIN
+                {bump_agent("old")}
+                {bump_agent("new", "new.agent_id IS NOT old.agent_id")} END;
+        """)
+    conn.commit()
+    return done
+
+
+_EPOCH_OF = "CAST(strftime('%s', {}) AS REAL)"
+
+
+def migrate_belief_rank(conn: sqlite3.Connection) -> list[str]:
+    """
+    Add and backfill beliefs.created_epoch, its sync triggers, and the index
+    the cognition block ranks over. The column is also added by the plugin's
+    gateway_start hook; whichever runs first wins. Returns what was created.
+    """
+    if not _table_exists(conn, "beliefs"):
+        return []
+    done = []
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(beliefs)")}
+    if "created_epoch" not in columns:
+        conn.execute("ALTER TABLE beliefs ADD COLUMN created_epoch REAL")
+        done.append("created_epoch")
+    conn.execute(f"UPDATE beliefs SET created_epoch = {_EPOCH_OF.format('created_at')} "
+                 "WHERE created_epoch IS NULL AND created_at IS NOT NULL")
+    conn.executescript(f"""
+        CREATE TRIGGER IF NOT EXISTS beliefs_epoch_ai AFTER INSERT ON beliefs
+        WHEN new.created_epoch IS NULL AND new.created_at IS NOT NULL BEGIN
+            UPDATE beliefs SET created_epoch = {_EPOCH_OF.format('new.created_at')} WHERE rowid = new.rowid;
+        END;
+        CREATE TRIGGER IF NOT EXISTS beliefs_epoch_au AFTER UPDATE OF created_at ON beliefs BEGIN
+            UPDATE beliefs SET created_epoch = {_EPOCH_OF.format('new.created_at')} WHERE rowid = new.rowid;
+        END;
+    """)
+    if not _index_exists(conn, "idx_beliefs_agent_rank"):
+        conn.execute("CREATE INDEX idx_beliefs_agent_rank "
+                     "ON beliefs(agent_id, status, activation_score, importance)")
+        done.append("idx_beliefs_agent_rank")
+    conn.commit()
+    return done
+
+
+def migrate_message_verdicts(conn: sqlite3.Connection) -> list[str]:
+    """
+    Add validator_fingerprint to agent_messages and proposals. Existing rows
+    stay NULL, i.e. stale: the next revalidate_messages.py pass stamps them.
+    """
+    done = []
+    for table in ("agent_messages", "proposals"):
+        if not _table_exists(conn, table):
+            continue
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if "validator_fingerprint" not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN validator_fingerprint TEXT")
+            done.append(f"{table}.validator_fingerprint")
+    conn.commit()
+    return done
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Apply pending vector.db schema migrations.")
+    parser.add_argument("--db", default=str(DB_PATH), help="Path to vector.db")
+    parser.add_argument("--rebuild-fts", action="store_true", help="Re-index FTS tables from scratch")
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        print(f"[migrate_schema] ERROR: DB not found at {args.db}", file=sys.stderr)
+        return 1
+
+    conn = sqlite3.connect(args.db)
+    try:
+        try:
+            indexed = migrate_fts(conn, rebuild=args.rebuild_fts)
+        except sqlite3.OperationalError as e:
+            # SQLite builds without FTS5 — keyword retrieval keeps its scan path.
+            print(f"[migrate_schema] WARNING: FTS5 unavailable ({e}) — skipped", file=sys.stderr)
+            indexed = []
+        print(f"fts: {', '.join(indexed) if indexed else 'up to date'}")
+        counted = migrate_change_counters(conn)
+        print(f"counters: {', '.join(counted) if counted else 'up to date'}")
+        ranked = migrate_belief_rank(conn)
+        print(f"rank: {', '.join(ranked) if ranked else 'up to date'}")
+        verdicts = migrate_message_verdicts(conn)
+        print(f"verdicts: {', '.join(verdicts) if verdicts else 'up to date'}")
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
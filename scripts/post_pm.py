@@ -26,6 +26,16 @@ def now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
+def _drop_from_ann(db_path: Path, agent_id: str, belief_ids: list) -> None:
+    """Tombstone archived beliefs in the agent's ANN index; best-effort."""
+    try:
+        from ann_index import AnnIndex, ann_root, np as ann_np
+        if ann_np is not None:
+            AnnIndex(ann_root(db_path), agent_id).remove(belief_ids)
+    except Exception:
+        pass  # the next sync_agent() catches up
+
+
 def process_output(agent_id: str, output_json: dict, db_path: Path) -> dict:
     errors = []
 
@@ -140,6 +150,7 @@ def process_output(agent_id: str, output_json: dict, db_path: Path) -> dict:
             errors.append(f"belief_updates[{i}]: DB insert failed — {e}")
 
     memory_ops = output_json.get("memory_operations", [])
+    archived_ids = []
     if isinstance(memory_ops, list):
         for op in memory_ops:
             if not isinstance(op, dict):
@@ -162,6 +173,10 @@ def process_output(agent_id: str, output_json: dict, db_path: Path) -> dict:
                     errors.append(f"memory_operations store failed: {e}")
             elif operation == "archive" and content:
                 try:
+                    archived_ids += [r[0] for r in conn.execute(
+                        "SELECT id FROM beliefs WHERE agent_id=? AND content=? AND status='active'",
+                        (agent_id, content),
+                    )]
                     conn.execute(
                         "UPDATE beliefs SET status='archived' WHERE agent_id=? AND content=?",
                         (agent_id, content),
@@ -207,6 +222,9 @@ def process_output(agent_id: str, output_json: dict, db_path: Path) -> dict:
     conn.commit()
     conn.close()
 
+    if archived_ids:
+        _drop_from_ann(db_path, agent_id, archived_ids)
+
     return {"stored": stored, "pending": pending, "errors": errors, "gaps": gaps_stored}
 
 
@@ -22,7 +22,10 @@ from datetime import datetime, timezone
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent))
-from validate_agent_message import validate_message, _get_db, _now_iso, _log_security_audit
+from validate_agent_message import (
+    RULESET_FINGERPRINT, validate_message, _ensure_verdict_column, _get_db, _now_iso,
+    _log_security_audit, _log_security_audits,
+)
 
 DB_PATH = Path("/Users/acevashisth/.openclaw/workspace/state/vector.db")
 
@@ -31,6 +34,83 @@ MAX_CONTENT_LENGTH = 2000
 MAX_TITLE_LENGTH = 200
 
 
+def _review(validation: dict, evidence: list) -> tuple[bool, list[str], list[str]]:
+    """(requires_review, validator_log entries, review reasons) for an allowed proposal."""
+    requires_review = validation["requires_review"]
+    review_reasons: list[str] = []
+
+    if not evidence:
+        requires_review = True
+        review_reasons.append("no evidence cited")
+
+    validator_log_entries = list(validation["log"])
+    for reason in review_reasons:
+        validator_log_entries.append(f"[REQUIRES_REVIEW] {reason}")
+    return requires_review, validator_log_entries, review_reasons
+
+
+def store_proposal_verdicts(conn: sqlite3.Connection, verdicts: list[tuple[sqlite3.Row, dict]]) -> int:
+    """
+    Persist re-validation results for stored proposals, as (row, validation)
+    pairs over validate_message(f"{title}\n\n{content}", author, "__proposals__"),
+    under RULESET_FINGERPRINT in bulk. Proposals that now fail Tier 1 are
+    blocked (readers skip blocked=1) and logged to security_audit, which
+    commits. Returns how many were blocked. Blocks for an exhausted CPU
+    budget are not stored, so the proposal stays stale and is retried.
+    """
+    now = _now_iso()
+    verdicts = [(row, validation) for row, validation in verdicts if not validation.get("budget_exceeded")]
+    passed = []
+    for row, validation in verdicts:
+        if not validation["blocked"]:
+            requires_review, log_entries, _ = _review(validation, json.loads(row["evidence"] or "[]"))
+            passed.append((1 if requires_review else 0, json.dumps(log_entries), RULESET_FINGERPRINT, row["id"]))
+    blocked = [(row, validation) for row, validation in verdicts if validation["blocked"]]
+
+    if passed:
+        conn.executemany(
+            "UPDATE proposals SET requires_review = ?, validator_log = ?, validator_fingerprint = ? WHERE id = ?",
+            passed,
+        )
+    if not blocked:
+        return 0
+
+    conn.executemany(
+        """
+        UPDATE proposals
+        SET blocked = 1, blocked_reason = ?, validator_log = ?, validator_fingerprint = ?, updated_at = ?
+        WHERE id = ?
+        """,
+        [
+            (
+                "Re-validation failed: " + "; ".join(validation["violations"]),
+                json.dumps(validation["log"]),
+                RULESET_FINGERPRINT,
+                now,
+                row["id"],
+            )
+            for row, validation in blocked
+        ],
+    )
+    _log_security_audits(conn, [
+        (
+            row["author_agent_id"],
+            "TIER1_PROPOSAL_REVALIDATION_BLOCK",
+            json.dumps({
+                "proposal_id": row["id"],
+                "agent": row["author_agent_id"],
+                "title": row["title"],
+                "violations": validation["violations"],
+                "content_preview": row["content"][:200],
+            }),
+            "CRITICAL",
+            f"PROPOSAL_BLOCKED_ON_REVALIDATION proposal_id={row['id']}",
+        )
+        for row, validation in blocked
+    ])
+    return len(blocked)
+
+
 def post_proposal(
     agent: str,
     title: str,
@@ -107,27 +187,18 @@ def post_proposal(
         }
 
     # ── Determine requires_review ─────────────────────────────────────────────
-    requires_review = validation["requires_review"]
-    review_reasons: list[str] = []
-
-    if not evidence:
-        requires_review = True
-        review_reasons.append("no evidence cited")
-
-    validator_log_entries = list(validation["log"])
-    if review_reasons:
-        for reason in review_reasons:
-            validator_log_entries.append(f"[REQUIRES_REVIEW] {reason}")
+    requires_review, validator_log_entries, review_reasons = _review(validation, evidence)
 
     # ── INSERT proposal ───────────────────────────────────────────────────────
     conn = _get_db()
+    _ensure_verdict_column(conn, "proposals")
     conn.execute(
         """
         INSERT INTO proposals
           (id, author_agent_id, title, content, evidence, status,
            requires_review, blocked, blocked_reason, validator_log,
-           created_at, updated_at)
-        VALUES (?, ?, ?, ?, ?, 'open', ?, 0, NULL, ?, ?, ?)
+           validator_fingerprint, created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, 'open', ?, 0, NULL, ?, ?, ?, ?)
         """,
         (
             proposal_id,
@@ -137,6 +208,7 @@ def post_proposal(
             json.dumps(evidence),
             1 if requires_review else 0,
             json.dumps(validator_log_entries),
+            RULESET_FINGERPRINT,
             now,
             now,
         ),
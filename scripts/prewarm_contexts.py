@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+prewarm_contexts.py — Build <cognitive-context> parts for queued tickets
+ahead of their spawn.
+
+For every TODO / IN_PROGRESS ticket assigned to a PM (per sync_tickets.py),
+the expansion keywords, retrieved memories and cognition block are built
+from the ticket title and stored in context_blocks. Each row carries a
+change_counters stamp for the agent's memories and beliefs plus the
+__shared__ / chief beliefs the block also shows (migrate_schema.py). Any
+write to those rows invalidates it, and so does age: memory and belief
+ranks decay with time, so a row older than BLOCK_TTL_S is rebuilt (the same
+bound as the shared sections, shared_sections.SHARED_TTL_S).
+spawn_pm.build_cognitive_context serves a still-valid row for the same
+agent and ticket instead of rebuilding when the spawn task is the ticket
+title or mentions the ticket (its id or its title): the chief's spawn task
+is free text around the ticket, rarely the title verbatim.
+
+Usage:
+    python3 prewarm_contexts.py                # one pass
+    python3 prewarm_contexts.py --loop 120     # keep warming every 120 s
+"""
+
+import argparse
+import hashlib
+import json
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+import retrieval_cache
+import shared_sections
+from expand_retrieval_query import expand_retrieval_query, join_refreshes
+
+DB_PATH = Path("/Users/acevashisth/.openclaw/workspace/state/vector.db")
+
+QUEUED_STATUSES = ("IN_PROGRESS", "TODO")
+NON_PM_ASSIGNEES = {"", "CHIEF", "VECTOR"}
+MAX_TICKETS = 50
+BLOCK_TTL_S = shared_sections.SHARED_TTL_S
+
+
+def _ensure_table(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS context_blocks (
+            agent_id TEXT NOT NULL, ticket_id TEXT NOT NULL, task_fp TEXT NOT NULL,
+            keywords TEXT NOT NULL, memories TEXT NOT NULL, cognition TEXT NOT NULL,
+            version TEXT NOT NULL, built_at REAL NOT NULL,
+            PRIMARY KEY (agent_id, ticket_id))
+    """)
+
+
+def task_fingerprint(task: str) -> str:
+    return hashlib.sha1(" ".join((task or "").split()).lower().encode("utf-8")).hexdigest()
+
+
+def block_version(conn: sqlite3.Connection, agent: str) -> str:
+    """Stamp over everything a context block for `agent` reads."""
+    return retrieval_cache.data_version(conn, (
+        f"memories:{agent}", "memories:__shared__",
+        f"beliefs:{agent}", "beliefs:__shared__", "beliefs:chief",
+    ))
+
+
+def _normalized(text: str) -> str:
+    return " ".join((text or "").split()).lower()
+
+
+def _ticket_title(conn: sqlite3.Connection, ticket: str) -> str:
+    try:
+        row = conn.execute("SELECT title FROM tickets WHERE id=?", (ticket,)).fetchone()
+    except sqlite3.Error:
+        return ""
+    return (row[0] or "").strip() if row else ""
+
+
+def _same_task(conn: sqlite3.Connection, ticket: str, task: str, stored_fp: str) -> bool:
+    """The block was built for this task, or for the ticket's current title and the task mentions the ticket."""
+    if stored_fp == task_fingerprint(task):
+        return True
+    title = _ticket_title(conn, ticket)
+    if not title or stored_fp != task_fingerprint(title):
+        return False
+    text = _normalized(task)
+    return _normalized(ticket) in text or _normalized(title) in text
+
+
+def lookup(conn: sqlite3.Connection, agent: str, ticket: str, task: str) -> dict | None:
+    """The stored parts for this spawn if still valid, else None. Never raises."""
+    try:
+        row = conn.execute(
+            "SELECT task_fp, keywords, memories, cognition, version, built_at FROM context_blocks "
+            "WHERE agent_id=? AND ticket_id=?", (agent, ticket),
+        ).fetchone()
+        if row is None or time.time() - row[5] >= BLOCK_TTL_S or not _same_task(conn, ticket, task, row[0]):
+            return None
+        if not row[4].startswith("cc:") or row[4] != block_version(conn, agent):
+            return None
+        return {"keywords": json.loads(row[1]), "memories": row[2], "cognition": row[3]}
+    except sqlite3.Error:
+        return None
+
+
+def queued_tickets(conn: sqlite3.Connection, limit: int = MAX_TICKETS) -> list[tuple[str, str, str]]:
+    """(agent, ticket_id, task) for queued PM tickets, in-progress and highest priority first."""
+    marks = ",".join("?" * len(QUEUED_STATUSES))
+    rows = conn.execute(
+        f"""SELECT id, title, assignee FROM tickets WHERE status IN ({marks})
+            ORDER BY status = 'IN_PROGRESS' DESC, priority ASC, updated_at DESC""",
+        QUEUED_STATUSES,
+    ).fetchall()
+    out = []
+    for ticket_id, title, assignee in rows:
+        if (assignee or "").strip().upper() in NON_PM_ASSIGNEES or not (title or "").strip():
+            continue
+        out.append((assignee.strip().lower(), ticket_id, title.strip()))
+    return out[:limit]
+
+
+def _expand(agent: str, task: str) -> list[str]:
+    # No latency budget here: nobody is waiting, so take the full LLM answer.
+    return [k.strip().lower() for k in expand_retrieval_query(task, agent) if k.strip()]
+
+
+def prewarm(conn: sqlite3.Connection, db_path: Path, limit: int = MAX_TICKETS) -> dict:
+    """One pass: (re)build stale or missing blocks and drop rows for tickets no longer queued."""
+    import spawn_pm  # deferred: spawn_pm imports this module for lookup()
+
+    _ensure_table(conn)
+    stats = {"built": 0, "fresh": 0, "dropped": 0}
+    queued = queued_tickets(conn, limit)
+    for agent, ticket, task in queued:
+        if lookup(conn, agent, ticket, task) is not None:
+            stats["fresh"] += 1
+            continue
+        # Stamp before reading, so a write that lands mid-build invalidates the row.
+        version = block_version(conn, agent)
+        keywords = _expand(agent, task) or spawn_pm.expand_keywords(agent, task)
+        memories = spawn_pm.get_memories(agent, task, conn=conn, db_path=db_path, queries=keywords)
+        cognition = spawn_pm.get_cognition_block(agent, db_path, conn=conn)
+        conn.execute(
+            "INSERT OR REPLACE INTO context_blocks (agent_id, ticket_id, task_fp, keywords, memories, "
+            "cognition, version, built_at) VALUES (?,?,?,?,?,?,?,?)",
+            (agent, ticket, task_fingerprint(task), json.dumps(keywords), memories, cognition,
+             version, time.time()),
+        )
+        conn.commit()
+        stats["built"] += 1
+    keep = {(agent, ticket) for agent, ticket, _ in queued}
+    for agent, ticket in conn.execute("SELECT agent_id, ticket_id FROM context_blocks").fetchall():
+        if (agent, ticket) not in keep:
+            conn.execute("DELETE FROM context_blocks WHERE agent_id=? AND ticket_id=?", (agent, ticket))
+            stats["dropped"] += 1
+    conn.commit()
+    return stats
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Pre-build cognitive contexts for queued tickets.")
+    parser.add_argument("--db", default=str(DB_PATH))
+    parser.add_argument("--limit", type=int, default=MAX_TICKETS)
+    parser.add_argument("--loop", type=float, default=0, help="Repeat every N seconds (0 = one pass)")
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        print(f"[prewarm_contexts] ERROR: DB not found at {args.db}", file=sys.stderr)
+        return 1
+    conn = sqlite3.connect(args.db, timeout=5.0)
+    try:
+        while True:
+            try:
+                print(json.dumps(prewarm(conn, Path(args.db), args.limit)), flush=True)
+            except sqlite3.Error as e:
+                print(f"[prewarm_contexts] WARNING: pass failed: {e}", file=sys.stderr)
+            if not args.loop:
+                break
+            time.sleep(args.loop)
+    finally:
+        conn.close()
+        join_refreshes()  # spawn_pm.expand_keywords may leave over-budget LLM answers caching on threads
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
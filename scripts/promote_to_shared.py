@@ -4,16 +4,22 @@
 Security guard: rejects beliefs with source='test' or 'Test' to prevent
 test artifacts from polluting the shared namespace.
 """
-import argparse, sqlite3, json, re
+import argparse, sqlite3, json, re, sys
 from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+import shared_sections
+
+DB = "/Users/acevashisth/.openclaw/workspace/state/vector.db"
 
 parser = argparse.ArgumentParser()
 parser.add_argument("--belief-id", required=True)
 parser.add_argument("--reason", default="")
+parser.add_argument("--db", default=DB)
 args = parser.parse_args()
 
-DB = "/Users/acevashisth/.openclaw/workspace/state/vector.db"
-conn = sqlite3.connect(DB)
+conn = sqlite3.connect(args.db)
 
 row = conn.execute("SELECT id, content, agent_id, source FROM beliefs WHERE id=?", (args.belief_id,)).fetchone()
 if not row:
@@ -63,6 +69,10 @@ conn.execute(
     (json.dumps({"belief_id": args.belief_id, "reason": args.reason, "prev_agent": agent_id}),),
 )
 conn.commit()
+try:
+    shared_sections.invalidate(conn, f"promote:{args.belief_id}")
+except sqlite3.Error as e:
+    print(f"[promote_to_shared] WARNING: shared section cache not invalidated: {e}", file=sys.stderr)
 conn.close()
 print(f"Promoted {args.belief_id} to __shared__  (was: {agent_id})")
 print(f"Content: {content[:100]}")
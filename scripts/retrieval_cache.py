@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+retrieval_cache.py — Result cache for retrieval and cognition-block lookups.
+
+Entries are keyed by (namespace, normalized key) and stamped with a data
+version read from vector.db:
+  - change_counters (migrate_schema.py): per-table counters bumped by
+    triggers. Comparable across processes, so entries are also persisted to
+    a sidecar retrieval_cache.db next to vector.db and survive restarts.
+    A '<table>:<agent_id>' key narrows the stamp to one agent's rows.
+  - PRAGMA data_version + total_changes, when the counters are not
+    installed. Only meaningful on one connection, so memory-only; the entry
+    holds a reference to that connection so its id() cannot be reused.
+An entry is served only while its version still matches and it is younger
+than ttl (scores also drift with time).
+
+Hit/miss counters are kept per process (stats()) and cumulatively in the
+sidecar (python3 retrieval_cache.py --stats). Lookups only count in memory;
+the sidecar totals are written every FLUSH_EVERY lookups, with each put()
+and on close() / process exit, so a hit never waits on a commit.
+
+Callers get their own copy of a cached result list (and of the dicts in
+it), so mutating a result cannot change what later hits see.
+"""
+
+import argparse
+import atexit
+import json
+import sqlite3
+import sys
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+DB_PATH = Path("/Users/acevashisth/.openclaw/workspace/state/vector.db")
+
+CACHE_TTL_S = 300
+MAX_MEMORY_ENTRIES = 512
+MAX_DISK_ENTRIES = 5_000
+FLUSH_EVERY = 100
+
+
+def _db_file(conn: sqlite3.Connection) -> str:
+    for _, name, path in conn.execute("PRAGMA database_list"):
+        if name == "main":
+            return path or ""
+    return ""
+
+
+def data_version(conn: sqlite3.Connection, tables) -> str:
+    """
+    Version stamp for `tables` (names or '<table>:<agent_id>' keys); 'cc:'
+    stamps are valid across connections. A per-agent key with no row yet
+    counts as 0 as long as its table is tracked.
+    """
+    keys = sorted(set(tables))
+    needed = sorted({k.split(":", 1)[0] for k in keys} | set(keys))
+    marks = ",".join("?" * len(needed))
+    try:
+        counts = dict(conn.execute(
+            f"SELECT tbl, n FROM change_counters WHERE tbl IN ({marks})", needed
+        ).fetchall())
+        if all(k.split(":", 1)[0] in counts for k in keys):
+            return "cc:" + ",".join(f"{k}={counts.get(k, 0)}" for k in keys)
+    except sqlite3.OperationalError:
+        pass
+    dv = conn.execute("PRAGMA data_version").fetchone()[0]
+    return f"dv:{id(conn)}:{dv}:{conn.total_changes}"
+
+
+class ResultCache:
+    """In-process LRU in front of an optional on-disk sidecar."""
+
+    def __init__(self, sidecar: Path | None = None, ttl: float = CACHE_TTL_S):
+        self.sidecar = Path(sidecar) if sidecar else None
+        self.ttl = ttl
+        self._mem: OrderedDict = OrderedDict()
+        self._disk = None
+        self.counts = {"hits": 0, "disk_hits": 0, "misses": 0, "stale": 0}
+        self._unflushed: dict = {}
+
+    def _disk_conn(self):
+        if self._disk is None and self.sidecar is not None:
+            try:
+                self._disk = sqlite3.connect(str(self.sidecar), timeout=1.0)
+                self._disk.executescript("""
+                    PRAGMA journal_mode=WAL;
+                    PRAGMA synchronous=OFF;
+                    CREATE TABLE IF NOT EXISTS cache_entries (
+                        key TEXT PRIMARY KEY, version TEXT NOT NULL,
+                        created REAL NOT NULL, value TEXT NOT NULL);
+                    CREATE TABLE IF NOT EXISTS cache_stats (
+                        name TEXT PRIMARY KEY, n INTEGER NOT NULL DEFAULT 0);
+                """)
+            except sqlite3.Error as e:
+                print(f"[retrieval_cache] WARNING: sidecar unavailable ({e}) — memory only", file=sys.stderr)
+                self.sidecar = None
+                self._disk = None
+        return self._disk
+
+    def _count(self, name: str) -> None:
+        self.counts[name] += 1
+        self._unflushed[name] = self._unflushed.get(name, 0) + 1
+        if sum(self._unflushed.values()) >= FLUSH_EVERY:
+            self.flush()
+
+    def _write_counts(self, disk: sqlite3.Connection) -> None:
+        """Add the unflushed counters to cache_stats; the caller commits."""
+        disk.executemany("INSERT INTO cache_stats (name, n) VALUES (?, ?) "
+                         "ON CONFLICT(name) DO UPDATE SET n = n + excluded.n", list(self._unflushed.items()))
+        self._unflushed = {}
+
+    def flush(self) -> None:
+        """Write the counters since the last flush to the sidecar. Never raises."""
+        disk = self._disk_conn() if self._unflushed else None
+        if disk is None:
+            return
+        try:
+            self._write_counts(disk)
+            disk.commit()
+        except sqlite3.Error:
+            pass
+
+    def close(self) -> None:
+        """Flush the counters and close the sidecar connection."""
+        self.flush()
+        if self._disk is not None:
+            self._disk.close()
+            self._disk = None
+
+    @staticmethod
+    def make_key(namespace: str, *parts) -> str:
+        return namespace + ":" + json.dumps(parts, sort_keys=True, default=str)
+
+    def get(self, key: str, version: str):
+        now = time.time()
+        entry = self._mem.get(key)
+        if entry is not None:
+            if entry[0] == version and now - entry[1] < self.ttl:
+                self._mem.move_to_end(key)
+                self._count("hits")
+                return _copy(entry[2])
+            self._mem.pop(key, None)
+            self._count("stale")
+        disk = self._disk_conn() if version.startswith("cc:") else None
+        if disk is not None:
+            row = disk.execute("SELECT version, created, value FROM cache_entries WHERE key=?", (key,)).fetchone()
+            if row and row[0] == version and now - row[1] < self.ttl:
+                value = json.loads(row[2])
+                self._remember(key, version, row[1], value)
+                self._count("disk_hits")
+                return _copy(value)
+        self._count("misses")
+        return None
+
+    def _remember(self, key, version, created, value, conn=None) -> None:
+        self._mem[key] = (version, created, value, conn)
+        self._mem.move_to_end(key)
+        while len(self._mem) > MAX_MEMORY_ENTRIES:
+            self._mem.popitem(last=False)
+
+    def put(self, key: str, version: str, value, conn=None) -> None:
+        created = time.time()
+        self._remember(key, version, created, value, conn)
+        disk = self._disk_conn() if version.startswith("cc:") else None
+        if disk is None:
+            return
+        try:
+            disk.execute("INSERT OR REPLACE INTO cache_entries (key, version, created, value) VALUES (?,?,?,?)",
+                         (key, version, created, json.dumps(value)))
+            disk.execute("DELETE FROM cache_entries WHERE created < ?", (created - self.ttl,))
+            disk.execute(
+                "DELETE FROM cache_entries WHERE key IN (SELECT key FROM cache_entries "
+                "ORDER BY created DESC LIMIT -1 OFFSET ?)", (MAX_DISK_ENTRIES,))
+            if self._unflushed:
+                self._write_counts(disk)  # committing anyway
+            disk.commit()
+        except sqlite3.Error:
+            pass
+
+    def cached(self, conn: sqlite3.Connection, key: str, tables, compute):
+        """Serve `key` if its tables are unchanged, else compute() and store."""
+        version = data_version(conn, tables)
+        value = self.get(key, version)
+        if value is None:
+            value = compute()
+            self.put(key, version, value, conn if version.startswith("dv:") else None)
+            value = _copy(value)
+        return value
+
+    def stats(self) -> dict:
+        served = self.counts["hits"] + self.counts["disk_hits"]
+        lookups = served + self.counts["misses"]
+        return {**self.counts, "hit_rate": round(served / lookups, 3) if lookups else 0.0,
+                "entries": len(self._mem)}
+
+
+def _copy(value):
+    """A copy of a cached value a caller may mutate: lists and dicts (one level into lists)."""
+    if isinstance(value, list):
+        return [dict(v) if isinstance(v, dict) else v for v in value]
+    if isinstance(value, dict):
+        return dict(value)
+    return value
+
+
+_caches: dict = {}
+
+
+def for_connection(conn: sqlite3.Connection) -> ResultCache:
+    """The process-wide cache for the DB behind `conn` (sidecar next to it)."""
+    db_file = _db_file(conn)
+    if db_file not in _caches:
+        if not _caches:
+            atexit.register(close_all)
+        sidecar = Path(db_file).parent / "retrieval_cache.db" if db_file else None
+        _caches[db_file] = ResultCache(sidecar)
+    return _caches[db_file]
+
+
+def close_all() -> None:
+    """Flush and close every process-wide cache (registered at exit)."""
+    for cache in _caches.values():
+        cache.close()
+
+
+def stats() -> dict:
+    return {db or ":memory:": c.stats() for db, c in _caches.items()}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Inspect the retrieval result cache.")
+    parser.add_argument("--db", default=str(DB_PATH))
+    parser.add_argument("--stats", action="store_true", help="Print cumulative hit/miss counters")
+    parser.add_argument("--clear", action="store_true", help="Drop every cached entry")
+    args = parser.parse_args()
+
+    sidecar = Path(args.db).parent / "retrieval_cache.db"
+    if not sidecar.exists():
+        print(json.dumps({"entries": 0, "hits": 0, "disk_hits": 0, "misses": 0, "stale": 0}))
+        return 0
+    conn = sqlite3.connect(str(sidecar))
+    try:
+        if args.clear:
+            conn.execute("DELETE FROM cache_entries")
+            conn.commit()
+        out = dict(conn.execute("SELECT name, n FROM cache_stats").fetchall())
+        out["entries"] = conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+        served = out.get("hits", 0) + out.get("disk_hits", 0)
+        lookups = served + out.get("misses", 0)
+        out["hit_rate"] = round(served / lookups, 3) if lookups else 0.0
+        print(json.dumps(out))
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,26 +1,58 @@
 #!/usr/bin/env python3
-"""Retrieve memories for an agent using ACT-R activation scoring."""
-import argparse, sqlite3, math
+"""Retrieve memories for an agent using ACT-R activation scoring.
+
+Importable:
+    from retrieve_memories import retrieve
+    retrieve("forge", ["jwt", "auth"], limit=5, conn=conn)
+    → [{"id": ..., "content": ..., "score": ...}, ...]
+
+CLI (thin wrapper, prints "[score] content"):
+    python3 retrieve_memories.py --agent forge --queries jwt auth --limit 5
+
+Scoring, sorting and the LIMIT all run inside SQLite, so only `limit` rows
+ever reach Python. The score is a plain SQL expression when SQLite has its
+math functions (exp/ln), else the act_r function registered per connection.
+
+Keyword filtering uses the memories_fts index (migrate_schema.py) when it
+exists: terms match as word prefixes and the best FTS_CANDIDATES hits by
+bm25 are kept. Without the index it falls back to an instr() substring scan
+of every memory for the agent, with BM25 computed in Python.
+
+Keyword hits are ranked by fusing BM25 relevance with ACT-R activation:
+  linear  WEIGHT * bm25/max(bm25) + (1 - WEIGHT) * act/max(act)
+  rrf     WEIGHT / (RRF_K + bm25 rank) + (1 - WEIGHT) / (RRF_K + act rank)
+  none    ACT-R only (the pre-fusion ordering)
+Hits below MIN_RELEVANCE of the best bm25 are dropped, so a memory that
+brushes one of eight expanded keywords no longer fills a slot.
+"""
+import argparse, sqlite3, math, re, sys
 from datetime import datetime, timezone
+from pathlib import Path
 
-parser = argparse.ArgumentParser()
-parser.add_argument("--agent", required=True)
-parser.add_argument("--query", default="")
-parser.add_argument("--queries", nargs='*', default=None)
-parser.add_argument("--limit", type=int, default=5)
-args = parser.parse_args()
+sys.path.insert(0, str(Path(__file__).parent))
+import retrieval_cache
 
 DB = "/Users/acevashisth/.openclaw/workspace/state/vector.db"
-now = datetime.now(timezone.utc)
 
-conn = sqlite3.connect(DB)
-rows = conn.execute(
-    """SELECT id, content, importance, decay_rate, access_count, last_accessed, activation_score
-       FROM memories WHERE agent_id IN (?, '__shared__')""",
-    (args.agent,),
-).fetchall()
+FTS_CANDIDATES = 200
 
-def act_r_score(importance, decay_rate, access_count, last_accessed):
+FUSION = "linear"
+FUSION_WEIGHT = 0.6   # share of the fused score given to BM25 relevance
+RRF_K = 60
+MIN_RELEVANCE = 0.25  # fraction of the top bm25 a keyword hit must reach
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# act_r_score in SQL. An unparseable/NULL last_accessed leaves exp() NULL → recency 0.5.
+_SCORE_MATH = ("COALESCE(m.importance, 0.0)"
+               " * COALESCE(exp(-m.decay_rate * (julianday(:now) - julianday(m.last_accessed))), 0.5)"
+               " * ln(max(COALESCE(m.access_count, 0), 1) + 1)")
+_SCORE_UDF = ("act_r(m.importance, m.decay_rate, m.access_count, "
+              "(julianday(:now) - julianday(m.last_accessed)) * 86400.0)")
+
+
+def act_r_score(importance, decay_rate, access_count, last_accessed, now=None):
+    now = now or datetime.now(timezone.utc)
     recency = 0.5
     if last_accessed:
         try:
@@ -28,24 +60,239 @@ def act_r_score(importance, decay_rate, access_count, last_accessed):
             recency = math.exp(-decay_rate * delta / 86400)
         except Exception:
             pass
-    freq = math.log(max(access_count, 1) + 1)
-    return importance * recency * freq
-
-scored = [(act_r_score(*r[2:6]), r) for r in rows]
-scored.sort(reverse=True)
-
-# Multi-keyword filter has precedence when provided
-if args.queries is not None and len(args.queries) > 0:
-    query_terms = [q.lower() for q in args.queries if q and q.strip()]
-    filtered = [(s, r) for s, r in scored if any(q in r[1].lower() for q in query_terms)]
-    scored = filtered
-# Backward-compatible single query behavior
-elif args.query:
-    tokens = args.query.lower().split()
-    filtered = [(s, r) for s, r in scored if any(t in r[1].lower() for t in tokens)]
-    if filtered:
-        scored = filtered
-
-for score, row in scored[:args.limit]:
-    print(f"[{score:.3f}] {row[1][:120]}")
-conn.close()
+    freq = math.log(max(access_count or 0, 1) + 1)
+    return (importance or 0.0) * recency * freq
+
+
+def _act_r_sql(importance, decay_rate, access_count, age_seconds):
+    """act_r_score with the age already computed by SQLite (NULL = unknown)."""
+    recency = 0.5
+    if age_seconds is not None and decay_rate is not None:
+        recency = math.exp(-decay_rate * age_seconds / 86400)
+    freq = math.log(max(access_count or 0, 1) + 1)
+    return (importance or 0.0) * recency * freq
+
+
+def fts_match_expr(terms):
+    """
+    OR of prefix phrases for an FTS5 MATCH — "jwt-rs256" becomes "jwt rs256"*.
+    Returns None when no term has an indexable word in it.
+    """
+    phrases = []
+    for term in terms:
+        words = re.findall(r"\w+", term.lower())
+        if words:
+            phrases.append('"' + " ".join(words) + '"*')
+    return " OR ".join(phrases) or None
+
+
+def _has_fts(conn):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='memories_fts'"
+    ).fetchone() is not None
+
+
+def _score_expr(conn):
+    """SQL for the ACT-R score on this connection; registers act_r if needed."""
+    try:
+        conn.execute("SELECT exp(0.0), ln(1.0)").fetchone()
+        return _SCORE_MATH
+    except sqlite3.OperationalError:
+        conn.create_function("act_r", 4, _act_r_sql, deterministic=True)
+        return _SCORE_UDF
+
+
+def _fuse(candidates, limit, fusion, weight):
+    """
+    Python twin of the SQL fusion in _top_k. candidates are
+    (rowid, id, content, relevance, activation); returns (id, content, score).
+    """
+    if not candidates:
+        return []
+    top_rel = max(max(c[3] for c in candidates), 1e-9)
+    kept = [c for c in candidates if c[3] / top_rel >= MIN_RELEVANCE]
+    top_act = max(max(c[4] for c in kept), 1e-9)
+    rel_rank = {c[0]: 1 + sum(o[3] > c[3] for o in kept) for c in kept}
+    act_rank = {c[0]: 1 + sum(o[4] > c[4] for o in kept) for c in kept}
+    fused = []
+    for rid, mid, content, rel, act in kept:
+        if fusion == "rrf":
+            score = weight / (RRF_K + rel_rank[rid]) + (1 - weight) / (RRF_K + act_rank[rid])
+        else:
+            score = weight * rel / top_rel + (1 - weight) * act / top_act
+        fused.append((score, rid, mid, content))
+    fused.sort(key=lambda f: (-f[0], f[1]))
+    return [(mid, content, score) for score, _, mid, content in fused[:limit]]
+
+
+def _bm25(rows, terms, n_docs, avg_len):
+    """BM25 of each (.., content, ..) row against `terms`, substring tf, char lengths."""
+    texts = [(r[2] or "").lower() for r in rows]
+    out = [0.0] * len(rows)
+    for term in terms:
+        tfs = [t.count(term) for t in texts]
+        df = sum(1 for tf in tfs if tf)
+        if not df:
+            continue
+        idf = math.log((n_docs - df + 0.5) / (df + 0.5) + 1.0)
+        for i, tf in enumerate(tfs):
+            if tf:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * len(texts[i]) / max(avg_len, 1.0))
+                out[i] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+    return out
+
+
+def _top_k(conn, agent, limit, now, terms=None, fusion=FUSION, weight=FUSION_WEIGHT):
+    """
+    (id, content, score) for the best `limit` memories. `terms` restricts to
+    memories containing any of them (None = all) and ranks them by `fusion`.
+    """
+    score = _score_expr(conn)
+    params = {"agent": agent, "now": now, "limit": limit}
+    if terms is not None:
+        expr = fts_match_expr(terms)
+        if expr and _has_fts(conn):
+            if fusion == "none":
+                final = "act"
+            elif fusion == "rrf":
+                final = ("CAST(:w AS REAL) / (:rrf_k + RANK() OVER (ORDER BY rel DESC))"
+                         " + (1.0 - :w) / (:rrf_k + RANK() OVER (ORDER BY act DESC))")
+            else:
+                final = ("CAST(:w AS REAL) * rel / MAX(MAX(rel) OVER (), 1e-9)"
+                         " + (1.0 - :w) * act / MAX(MAX(act) OVER (), 1e-9)")
+            floor = "" if fusion == "none" else "WHERE rel >= :min_rel * top_rel"
+            try:
+                return conn.execute(
+                    f"""WITH cand AS (
+                            SELECT m.rowid AS rid, -f.rank AS rel
+                            FROM memories_fts f JOIN memories m ON m.rowid = f.rowid
+                            WHERE memories_fts MATCH :match AND m.agent_id IN (:agent, '__shared__')
+                            ORDER BY f.rank
+                            LIMIT :candidates
+                        ),
+                        scored AS (
+                            SELECT m.id, m.content, m.rowid AS rid, cand.rel, {score} AS act,
+                                   MAX(cand.rel) OVER () AS top_rel
+                            FROM cand JOIN memories m ON m.rowid = cand.rid
+                        ),
+                        kept AS (SELECT * FROM scored {floor})
+                        SELECT id, content, {final} AS score
+                        FROM kept
+                        ORDER BY score DESC, rid
+                        LIMIT :limit""",
+                    {**params, "match": expr, "candidates": FTS_CANDIDATES, "w": weight,
+                     "rrf_k": RRF_K, "min_rel": MIN_RELEVANCE},
+                ).fetchall()
+            except sqlite3.OperationalError:
+                pass  # malformed MATCH or missing fts5 module — scan instead
+
+    where = ""
+    if terms is not None:
+        if not terms:
+            return []
+        where = "AND (" + " OR ".join(f"instr(lower(m.content), :t{i}) > 0" for i in range(len(terms))) + ")"
+        params.update({f"t{i}": t for i, t in enumerate(terms)})
+    if terms is None or fusion == "none":
+        return conn.execute(
+            f"""SELECT m.id, m.content, {score} AS score
+                FROM memories m
+                WHERE m.agent_id IN (:agent, '__shared__') {where}
+                ORDER BY score DESC, m.rowid
+                LIMIT :limit""",
+            params,
+        ).fetchall()
+
+    rows = conn.execute(
+        f"""SELECT m.rowid, m.id, m.content, {score} AS act
+            FROM memories m
+            WHERE m.agent_id IN (:agent, '__shared__') {where}""",
+        params,
+    ).fetchall()
+    if not rows:
+        return []
+    n_docs, avg_len = conn.execute(
+        "SELECT COUNT(*), AVG(length(content)) FROM memories WHERE agent_id IN (?, '__shared__')", (agent,)
+    ).fetchone()
+    rel = _bm25(rows, terms, n_docs, avg_len or 1.0)
+    return _fuse([(r[0], r[1], r[2], rv, r[3]) for r, rv in zip(rows, rel)], limit, fusion, weight)
+
+
+def retrieve(agent, queries=None, limit=5, conn=None, query="", db_path=DB,
+             fusion=FUSION, weight=FUSION_WEIGHT, use_cache=True):
+    """
+    Top `limit` memories for `agent` (plus __shared__), best first.
+
+    `queries` is a strict multi-keyword filter: a memory must contain at least
+    one term, otherwise nothing is returned. `query` is the lenient legacy path:
+    its whitespace tokens filter only when something matches.
+
+    Keyword hits are ranked by `fusion` ("linear", "rrf" or "none") with
+    `weight` on BM25 relevance; without keywords the order is ACT-R only.
+
+    Pass `conn` to reuse an open connection; it is left open. Otherwise a
+    connection to `db_path` is opened and closed here. Results are served
+    from retrieval_cache while the memories table is unchanged.
+    """
+    query_terms = [q.lower() for q in (queries or []) if q and q.strip()]
+    tokens = query.lower().split() if query else []
+    now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")
+
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(str(db_path))
+    def compute():
+        # Multi-keyword filter has precedence when provided
+        if queries:
+            rows = _top_k(conn, agent, limit, now, query_terms, fusion, weight)
+        # Backward-compatible single query behavior: filter only if something matches
+        elif tokens:
+            rows = _top_k(conn, agent, limit, now, tokens, fusion, weight) or _top_k(conn, agent, limit, now)
+        else:
+            rows = _top_k(conn, agent, limit, now)
+        return [{"id": r[0], "content": r[1] or "", "score": r[2]} for r in rows]
+
+    try:
+        if not use_cache:
+            return compute()
+        cache = retrieval_cache.for_connection(conn)
+        key = cache.make_key("retrieve", agent, sorted(set(query_terms)) if queries is not None else None,
+                             sorted(set(tokens)), limit, fusion, weight)
+        return cache.cached(conn, key, (f"memories:{agent}", "memories:__shared__"), compute)
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def format_results(results):
+    """CLI rendering: one "[score] content[:120]" line per result."""
+    return "\n".join(f"[{r['score']:.3f}] {r['content'][:120]}" for r in results)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--agent", required=True)
+    parser.add_argument("--query", default="")
+    parser.add_argument("--queries", nargs='*', default=None)
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--db", default=DB)
+    parser.add_argument("--fusion", choices=("linear", "rrf", "none"), default=FUSION,
+                        help="How keyword hits combine BM25 relevance with ACT-R activation")
+    parser.add_argument("--weight", type=float, default=FUSION_WEIGHT, help="BM25 share of the fused score")
+    parser.add_argument("--semantic", action="store_true",
+                        help="Rank by local vector similarity (semantic_index.py) instead of keywords")
+    args = parser.parse_args(argv)
+
+    if args.semantic:
+        from semantic_index import semantic_retrieve
+        text = " ".join(args.queries or []) or args.query
+        results = semantic_retrieve(args.agent, text, args.limit, db_path=args.db)
+    else:
+        results = retrieve(args.agent, args.queries, args.limit, query=args.query, db_path=args.db,
+                           fusion=args.fusion, weight=args.weight)
+    if results:
+        print(format_results(results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
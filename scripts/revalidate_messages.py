@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+revalidate_messages.py — Re-validate the agent_messages and proposals
+backlogs after a validator ruleset change.
+
+Every stored verdict carries the RULESET_FINGERPRINT it was reached under
+(validate_agent_message.py). read_agent_messages.py re-validates only rows
+whose fingerprint is stale; this job sweeps them ahead of the reads, so
+inboxes are served from stored verdicts. Stale rows are streamed through
+validate_messages() — a process pool, one worker per CPU by default — and
+the verdicts written back in bulk, one executemany per batch. Messages and
+proposals that now fail Tier 1 are blocked and logged to security_audit.
+
+Each pass prints, and writes to audit_log as 'messages_revalidated' when it
+did any work, the rows re-validated and newly blocked per table and the
+throughput. Rows whose validation ran out of CPU budget are counted as
+deferred and left stale for the next pass.
+
+Usage:
+    python3 revalidate_messages.py                # sweep until nothing is stale
+    python3 revalidate_messages.py --workers 4    # pool size (1 = in process)
+    python3 revalidate_messages.py --loop 300     # keep sweeping every 300 s
+"""
+
+import argparse
+import json
+import sqlite3
+import sys
+import time
+from collections import deque
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+import validate_agent_message
+from post_proposal import store_proposal_verdicts
+from read_agent_messages import store_verdicts
+from validate_agent_message import RULESET_FINGERPRINT, validate_messages, _ensure_verdict_column, _now_iso
+
+DB_PATH = Path("/Users/acevashisth/.openclaw/workspace/state/vector.db")
+
+BATCH_SIZE = 200
+
+# table → (columns read, validate_message arguments for a row, bulk writer)
+TABLES = {
+    "agent_messages": (
+        "id, from_agent_id, to_agent_id, content",
+        lambda row: (row["content"], row["from_agent_id"], row["to_agent_id"]),
+        lambda conn, verdicts: store_verdicts(conn, verdicts, "bulk_revalidation"),
+    ),
+    "proposals": (
+        "id, author_agent_id, title, content, evidence",
+        lambda row: (f"{row['title']}\n\n{row['content']}", row["author_agent_id"], "__proposals__"),
+        store_proposal_verdicts,
+    ),
+}
+
+
+def _stale_rows(conn: sqlite3.Connection, table: str, columns: str, batch: int):
+    """Unblocked rows with a stale fingerprint, a page at a time (keyset on rowid)."""
+    last = 0
+    while True:
+        rows = conn.execute(
+            f"""
+            SELECT rowid, {columns} FROM {table}
+            WHERE rowid > ? AND blocked = 0
+              AND (validator_fingerprint IS NULL OR validator_fingerprint != ?)
+            ORDER BY rowid LIMIT ?
+            """,
+            (last, RULESET_FINGERPRINT, batch),
+        ).fetchall()
+        if not rows:
+            return
+        yield from rows
+        last = rows[-1]["rowid"]
+
+
+def _revalidate_table(conn: sqlite3.Connection, table: str, batch: int, workers: int | None) -> dict:
+    columns, arguments, store = TABLES[table]
+    stats = {"revalidated": 0, "newly_blocked": 0, "deferred": 0}
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,)).fetchone():
+        return stats
+    _ensure_verdict_column(conn, table)
+
+    fed: deque = deque()
+
+    def items():
+        for row in _stale_rows(conn, table, columns, batch):
+            fed.append(row)
+            yield arguments(row)
+
+    def flush(verdicts: list) -> None:
+        deferred = sum(1 for _, validation in verdicts if validation.get("budget_exceeded"))
+        stats["newly_blocked"] += store(conn, verdicts)
+        stats["revalidated"] += len(verdicts) - deferred
+        stats["deferred"] += deferred
+        conn.commit()
+
+    pending = []
+    # Tier 1 audits go through conn: it holds this batch's uncommitted writes.
+    for validation in validate_messages(items(), workers=workers, conn=conn):
+        pending.append((fed.popleft(), validation))
+        if len(pending) >= batch:
+            flush(pending)
+            pending = []
+    if pending:
+        flush(pending)
+    return stats
+
+
+def revalidate(conn: sqlite3.Connection, batch: int = BATCH_SIZE, workers: int | None = None) -> dict:
+    """Re-validate every unblocked message and proposal with a stale fingerprint."""
+    t0 = time.perf_counter()
+    stats = {"fingerprint": RULESET_FINGERPRINT}
+    for table in TABLES:
+        stats[table] = _revalidate_table(conn, table, batch, workers)
+    elapsed = time.perf_counter() - t0
+    total = sum(stats[table]["revalidated"] for table in TABLES)
+    stats.update({
+        "revalidated": total,
+        "newly_blocked": sum(stats[table]["newly_blocked"] for table in TABLES),
+        "deferred": sum(stats[table]["deferred"] for table in TABLES),
+        "seconds": round(elapsed, 3),
+        "msgs_per_sec": round(total / elapsed, 1) if total and elapsed else 0.0,
+    })
+    if total:
+        conn.execute(
+            "INSERT INTO audit_log (ts, agent, action, detail) VALUES (?, 'vector', 'messages_revalidated', ?)",
+            (_now_iso(), json.dumps(stats)),
+        )
+        conn.commit()
+    return stats
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Re-validate stored agent messages under the current ruleset.")
+    parser.add_argument("--db", default=str(DB_PATH))
+    parser.add_argument("--batch", type=int, default=BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=None, help="Validator processes (default: one per CPU)")
+    parser.add_argument("--loop", type=float, default=0, help="Repeat every N seconds (0 = one pass)")
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        print(f"[revalidate_messages] ERROR: DB not found at {args.db}", file=sys.stderr)
+        return 1
+    validate_agent_message.DB_PATH = Path(args.db)
+    conn = sqlite3.connect(args.db, timeout=5.0)
+    conn.row_factory = sqlite3.Row
+    try:
+        while True:
+            try:
+                print(json.dumps(revalidate(conn, args.batch, args.workers)), flush=True)
+            except sqlite3.Error as e:
+                print(f"[revalidate_messages] WARNING: pass failed: {e}", file=sys.stderr)
+            if not args.loop:
+                break
+            time.sleep(args.loop)
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
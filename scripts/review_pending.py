@@ -4,10 +4,14 @@
 import argparse
 import json
 import sqlite3
+import sys
 import uuid
 from datetime import datetime, timezone
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent))
+import shared_sections
+
 DB_DEFAULT = Path("/Users/acevashisth/.openclaw/workspace/state/vector.db")
 
 
@@ -72,6 +76,10 @@ def cmd_approve(conn: sqlite3.Connection, pending_id: str):
         (now_iso(), pending_id),
     )
     conn.commit()
+    try:
+        shared_sections.invalidate(conn, f"approve:{pending_id}")
+    except sqlite3.Error as e:
+        print(f"[review_pending] WARNING: shared section cache not invalidated: {e}", file=sys.stderr)
     print(json.dumps({"ok": True, "action": "approved", "pending_id": pending_id, "belief_id": bid, "target_agent": target_agent}))
 
 
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+rule_compiler.py — Merge many regex rules into one alternation.
+
+compile_rules() turns a list of named rules into a single pattern whose
+named groups tell the rules apart, so one finditer() pass reports every
+hit. Each rule keeps its own flags (scoped inline groups). Rules marked as
+probes sit inside a lookahead: they report a hit without consuming text,
+so they never hide a consuming rule that starts at the same place.
+
+The alternation is gated by a lookahead on the characters any rule can
+start with (first_chars()). Positions that cannot start a rule are rejected
+with one character-class test instead of trying every branch.
+
+backtracking_risks() is a static check for rules whose matching time can grow
+faster than linearly in the input (ReDoS): nested or overlapping quantifiers,
+and scans that every later match start repeats. compile_rules(strict=True)
+refuses such rules.
+
+Used by validate_agent_message.py for Tier 2 and Tier 3.
+
+Usage:
+    python3 rule_compiler.py        # analyse the validator's rule set
+"""
+
+import re
+import sys
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:  # pragma: no cover — older interpreters
+    import sre_parse
+
+_FLAG_LETTERS = (("i", re.IGNORECASE), ("m", re.MULTILINE), ("s", re.DOTALL), ("x", re.VERBOSE))
+_MAX_RANGE = 256  # wider character ranges make the gate useless; give up instead
+
+_REPEATS = (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT)
+_LOOKAROUNDS = (sre_parse.ASSERT, sre_parse.ASSERT_NOT)
+# Characters every class is tested against, besides the rule's own literals.
+_PROBES = "aZ0_ \t\n-`\"':#/=é\x00"
+_CATEGORIES = {
+    sre_parse.CATEGORY_DIGIT: re.compile(r"\d"), sre_parse.CATEGORY_NOT_DIGIT: re.compile(r"\D"),
+    sre_parse.CATEGORY_SPACE: re.compile(r"\s"), sre_parse.CATEGORY_NOT_SPACE: re.compile(r"\S"),
+    sre_parse.CATEGORY_WORD: re.compile(r"\w"), sre_parse.CATEGORY_NOT_WORD: re.compile(r"\W"),
+}
+
+
+def scoped(regex: re.Pattern) -> str:
+    """regex's pattern wrapped so its flags apply to it alone inside a larger pattern."""
+    letters = "".join(letter for letter, bit in _FLAG_LETTERS if regex.flags & bit)
+    return f"(?{letters}:{regex.pattern})" if letters else f"(?:{regex.pattern})"
+
+
+def _firsts(ops) -> tuple[set[str], bool] | None:
+    """(characters a match can start with, whether it can be empty), None if unbounded."""
+    chars: set[str] = set()
+    for op, av in ops:
+        if op is sre_parse.LITERAL:
+            chars.add(chr(av))
+            return chars, False
+        if op is sre_parse.IN:
+            for item_op, item_av in av:
+                if item_op is sre_parse.LITERAL:
+                    chars.add(chr(item_av))
+                elif item_op is sre_parse.RANGE and item_av[1] - item_av[0] < _MAX_RANGE:
+                    chars.update(chr(c) for c in range(item_av[0], item_av[1] + 1))
+                else:
+                    return None
+            return chars, False
+        if op in (sre_parse.AT, sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            continue  # zero-width: the next item supplies the first character
+        if op is sre_parse.SUBPATTERN:
+            branches = [av[-1]]
+        elif op is sre_parse.BRANCH:
+            branches = av[1]
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+            branches = [av[2]]
+        else:
+            return None
+        nullable = False
+        for branch in branches:
+            sub = _firsts(branch)
+            if sub is None:
+                return None
+            chars |= sub[0]
+            nullable = nullable or sub[1]
+        if op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and av[0] == 0:
+            nullable = True
+        if not nullable:
+            return chars, False
+    return chars, True
+
+
+def first_chars(regex: re.Pattern) -> set[str] | None:
+    """Characters every match of `regex` starts with (before case folding), or None if unbounded."""
+    result = _firsts(sre_parse.parse(regex.pattern, regex.flags))
+    if result is None or result[1]:
+        return None
+    return result[0]
+
+
+class _RiskScan:
+    """
+    Walks a parsed pattern. Character classes are compared on a finite probe
+    alphabet (the pattern's literals plus _PROBES), so overlap is approximate
+    but errs towards reporting.
+    """
+
+    def __init__(self, regex: re.Pattern):
+        self.tree = sre_parse.parse(regex.pattern, regex.flags)
+        self.alphabet = set(_PROBES)
+        self._collect_literals(self.tree)
+        self.alphabet |= {c.swapcase() for c in self.alphabet}
+        self.risks: list[str] = []
+
+    def _collect_literals(self, ops) -> None:
+        for op, av in ops:
+            if op in (sre_parse.LITERAL, sre_parse.NOT_LITERAL):
+                self.alphabet.add(chr(av))
+            elif op is sre_parse.IN:
+                self._collect_literals([item for item in av if item[0] is sre_parse.LITERAL])
+            elif op in _REPEATS or op is sre_parse.SUBPATTERN:
+                self._collect_literals(av[-1])
+            elif op in _LOOKAROUNDS:
+                self._collect_literals(av[1])
+            elif op is sre_parse.BRANCH:
+                for branch in av[1]:
+                    self._collect_literals(branch)
+
+    @staticmethod
+    def _char_matches(op, av, ch: str, ignorecase: bool, dotall: bool) -> bool:
+        variants = {ch, ch.lower(), ch.upper()} if ignorecase else {ch}
+        if op is sre_parse.LITERAL:
+            return chr(av) in variants
+        if op is sre_parse.NOT_LITERAL:
+            return chr(av) not in variants
+        if op is sre_parse.ANY:
+            return dotall or ch != "\n"
+        negate = bool(av) and av[0][0] is sre_parse.NEGATE
+        hit = False
+        for item_op, item_av in av:
+            if item_op is sre_parse.LITERAL:
+                hit = chr(item_av) in variants
+            elif item_op is sre_parse.RANGE:
+                hit = any(item_av[0] <= ord(v) <= item_av[1] for v in variants)
+            elif item_op is sre_parse.CATEGORY:
+                hit = bool(_CATEGORIES[item_av].match(ch)) if item_av in _CATEGORIES else True
+            if hit:
+                break
+        return hit != negate
+
+    def _chars(self, ops, flags: int, first_only: bool) -> tuple[set[str], bool]:
+        """(probe characters a match can contain — or start with, if first_only — and whether it can be empty)."""
+        chars: set[str] = set()
+        seq_nullable = True
+        for op, av in ops:
+            if op in (sre_parse.LITERAL, sre_parse.NOT_LITERAL, sre_parse.ANY, sre_parse.IN):
+                chars |= {c for c in self.alphabet
+                          if self._char_matches(op, av, c, bool(flags & re.IGNORECASE), bool(flags & re.DOTALL))}
+                nullable = False
+            elif op in _REPEATS or op is sre_parse.POSSESSIVE_REPEAT:
+                sub, sub_nullable = self._chars(av[2], flags, first_only)
+                chars |= sub
+                nullable = sub_nullable or av[0] == 0
+            elif op is sre_parse.SUBPATTERN:
+                sub, nullable = self._chars(av[3], (flags | av[1]) & ~av[2], first_only)
+                chars |= sub
+            elif op is sre_parse.ATOMIC_GROUP:
+                sub, nullable = self._chars(av, flags, first_only)
+                chars |= sub
+            elif op is sre_parse.BRANCH:
+                nullable = False
+                for branch in av[1]:
+                    sub, sub_nullable = self._chars(branch, flags, first_only)
+                    chars |= sub
+                    nullable = nullable or sub_nullable
+            else:  # anchors, lookarounds, group references: no characters consumed
+                nullable = True
+            seq_nullable = seq_nullable and nullable
+            if first_only and not nullable:
+                return chars, False
+        return chars, seq_nullable
+
+    def _nullable(self, ops, flags: int) -> bool:
+        return self._chars(ops, flags, True)[1]
+
+    @staticmethod
+    def _can_fail(continuation: list) -> bool:
+        """Whether what follows can fail to match (optional repeats cannot)."""
+        return any(not (op in _REPEATS and av[0] == 0) for ops in continuation for op, av in ops)
+
+    @staticmethod
+    def _leading_literals(ops) -> str:
+        text = ""
+        for op, av in ops:
+            if op is not sre_parse.LITERAL:
+                break
+            text += chr(av)
+        return text
+
+    def scan(self, flags: int) -> list[str]:
+        self.starts = self._chars(self.tree, flags, True)[0]
+        self.opening = self._leading_literals(self.tree)
+        self._walk(list(self.tree), flags, [], None, False)
+        return self.risks
+
+    def _walk(self, ops, flags: int, after: list, enclosing: set[str] | None, in_look: bool) -> None:
+        """enclosing: first characters of the innermost unbounded repeat's body, if inside one."""
+        for i, (op, av) in enumerate(ops):
+            rest = [ops[i + 1:]] + after
+            if op in _REPEATS:
+                lo, hi, body = av
+                inner = enclosing
+                if hi == sre_parse.MAXREPEAT:
+                    self._check_repeat(op, list(body), ops[i + 1:], rest, flags, enclosing, in_look)
+                    inner = self._chars(body, flags, True)[0]
+                self._walk(list(body), flags, rest, inner, in_look)
+            elif op is sre_parse.SUBPATTERN:
+                self._walk(list(av[3]), (flags | av[1]) & ~av[2], rest, enclosing, in_look)
+            elif op is sre_parse.BRANCH:
+                for branch in av[1]:
+                    self._walk(list(branch), flags, rest, enclosing, in_look)
+            elif op in _LOOKAROUNDS:
+                self._walk(list(av[1]), flags, [], enclosing, True)
+            # ATOMIC_GROUP / POSSESSIVE_REPEAT never backtrack into themselves.
+
+    @staticmethod
+    def _branches(ops):
+        """BRANCH alternatives in ops, through groups but not into nested repeats."""
+        for op, av in ops:
+            if op is sre_parse.BRANCH:
+                yield av[1]
+                for branch in av[1]:
+                    yield from _RiskScan._branches(branch)
+            elif op is sre_parse.SUBPATTERN:
+                yield from _RiskScan._branches(av[3])
+
+    def _check_repeat(self, op, body, following, rest, flags: int,
+                      enclosing: set[str] | None, in_look: bool) -> None:
+        body_chars = self._chars(body, flags, False)[0]
+        # (a+)+ — the inner repeat can run into the next outer iteration, so a
+        # run splits between iterations in exponentially many ways. (x\d+)* is fine.
+        if enclosing is not None and body_chars & enclosing:
+            self.risks.append("nested unbounded quantifiers (exponential backtracking)")
+        for branches in self._branches(body):
+            firsts = [self._chars(b, flags, True)[0] for b in branches]
+            if any(a & b for j, a in enumerate(firsts) for b in firsts[j + 1:]):
+                self.risks.append("overlapping alternatives under an unbounded quantifier (exponential)")
+        for next_op, next_av in following:
+            if next_op in _REPEATS and next_av[1] == sre_parse.MAXREPEAT:
+                if body_chars & self._chars(next_av[2], flags, False)[0]:
+                    self.risks.append("adjacent unbounded quantifiers over the same characters (polynomial)")
+                break
+            if not self._nullable([(next_op, next_av)], flags):
+                break
+        if body_chars & self.starts and (in_look or self._can_fail(rest)):
+            # A lazy scan that ends at the rule's own opening stops at the next
+            # match start, so scans from successive starts never overlap.
+            closing = self._leading_literals(following)
+            if not (op is sre_parse.MIN_REPEAT and self.opening and closing.startswith(self.opening)):
+                self.risks.append("unbounded scan over the rule's own start characters, "
+                                  "repeated from every match start (quadratic)")
+
+
+def backtracking_risks(regex: re.Pattern) -> list[str]:
+    """Reasons `regex` can take super-linear time on adversarial input; empty if none found."""
+    return sorted(set(_RiskScan(regex).scan(regex.flags)))
+
+
+def compile_rules(rules: list[tuple[str, re.Pattern, bool]], strict: bool = False) -> re.Pattern:
+    """
+    One pattern for (group_name, regex, probe) rules, in priority order. A
+    match's lastgroup names the rule that fired; probes match empty. strict
+    raises ValueError for a rule with backtracking_risks().
+    """
+    if strict:
+        risky = {name: backtracking_risks(regex) for name, regex, _ in rules}
+        risky = {name: risks for name, risks in risky.items() if risks}
+        if risky:
+            raise ValueError(f"rules with super-linear matching: {risky}")
+    branches, gate = [], set()
+    for name, regex, probe in rules:
+        group = f"(?P<{name}>{scoped(regex)})"
+        branches.append(f"(?={group})" if probe else group)
+        starts = first_chars(regex)
+        gate = None if gate is None or starts is None else gate | starts
+    alternation = "|".join(branches)
+    if not gate:
+        return re.compile(alternation)
+    # Case-folded, so a rule's IGNORECASE variants (e.g. 'ſ' for 's') pass the gate too.
+    klass = "".join(re.escape(c) for c in sorted(gate))
+    return re.compile(f"(?i:(?=[{klass}]))(?:{alternation})")
+
+
+def main() -> int:
+    import validate_agent_message as vam
+
+    rules = ([(f"tier2 {d}", r) for r, _, d in vam.TIER2_PATTERNS]
+             + [(f"tier3 {d}", r) for r, d in vam.TIER3_PATTERNS]
+             + [("code block", vam._CODE_BLOCK_RE), ("base64 candidate", vam._BASE64_RE)])
+    flagged = 0
+    for name, regex in rules:
+        risks = backtracking_risks(regex)
+        flagged += bool(risks)
+        print(f"{'RISK' if risks else 'ok':<4}  {name}: {regex.pattern}")
+        for risk in risks:
+            print(f"      - {risk}")
+    return 1 if flagged else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
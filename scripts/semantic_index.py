@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+semantic_index.py — Local, offline semantic retrieval over memories.
+
+Each namespace (one per agent, plus __shared__) is a directory under
+SEMANTIC_DIR holding:
+  vectors.f32   row-major float32 matrix, L2-normalized, memory-mapped on read
+  ids.txt       row-id sidecar: line i is the memory id of matrix row i
+  crc.u32       CRC-32 of the content each row was embedded from
+  idf.f32       per-dimension IDF weights (hashing embedder only)
+  meta.json     dim, embedder name, row count and the source-table signature
+
+The signature carries the namespace's change_counters stamp
+(migrate_schema.py), so any write to the agent's memories is noticed. The
+row CRCs then tell an append (index rows unchanged, new rows after them)
+from an edit or delete, which rebuilds.
+
+A query is one matrix-vector product over the memmap plus argpartition top-k.
+The embedder is pluggable (anything with .name, .dim and .embed(texts));
+the default HashingEmbedder needs no model and no network.
+
+Consumers opt in: retrieve_memories.py --semantic, spawn_pm.py --semantic
+and system2_think.py --semantic.
+
+Usage:
+    python3 semantic_index.py --agent forge --query "rotate signing keys"
+    python3 semantic_index.py --agent forge --rebuild
+"""
+
+import argparse
+import json
+import math
+import os
+import re
+import sqlite3
+import sys
+import zlib
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+import retrieval_cache
+
+try:
+    import numpy as np
+except ImportError:  # semantic search is unavailable; callers fall back to keywords
+    np = None
+
+DB_PATH = Path("/Users/acevashisth/.openclaw/workspace/state/vector.db")
+SEMANTIC_DIR = DB_PATH.parent / "semantic"
+
+DEFAULT_DIM = 256
+
+_WORD_RE = re.compile(r"\w+")
+
+
+class HashingEmbedder:
+    """
+    Signed feature hashing of word unigrams and bigrams with sublinear TF.
+    crc32 keeps bucket assignment stable across processes (unlike hash()).
+    `weighted` tells SemanticIndex to apply its IDF vector on top.
+    """
+
+    weighted = True
+
+    def __init__(self, dim: int = DEFAULT_DIM):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text: str) -> list[str]:
+        words = _WORD_RE.findall((text or "").lower())
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def embed(self, texts) -> "np.ndarray":
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            counts = {}
+            for feat in self._features(text):
+                h = zlib.crc32(feat.encode("utf-8"))
+                key = (h % self.dim, 1.0 if h & 0x80000000 else -1.0)
+                counts[key] = counts.get(key, 0) + 1
+            for (col, sign), n in counts.items():
+                out[row, col] += sign * (1.0 + math.log(n))
+        return out
+
+
+def _normalize(mat: "np.ndarray") -> "np.ndarray":
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (mat / norms).astype(np.float32, copy=False)
+
+
+def _namespace_dir(root: Path, namespace: str) -> Path:
+    return Path(root) / re.sub(r"[^A-Za-z0-9_.-]", "_", namespace)
+
+
+def _crc(text) -> int:
+    return zlib.crc32((text or "").encode("utf-8"))
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+class SemanticIndex:
+    """One namespace's persisted vector matrix and row-id sidecar."""
+
+    def __init__(self, root: Path, namespace: str, embedder=None):
+        self.dir = _namespace_dir(root, namespace)
+        self.embedder = embedder or HashingEmbedder()
+        self.meta = self._read_meta()
+
+    # ── persistence ──────────────────────────────────────────────────────────
+
+    def _read_meta(self) -> dict:
+        try:
+            meta = json.loads((self.dir / "meta.json").read_text())
+        except (OSError, ValueError):
+            return {}
+        if meta.get("embedder") != self.embedder.name or meta.get("dim") != self.embedder.dim:
+            return {}  # built by a different embedder — treat as absent
+        return meta
+
+    @property
+    def count(self) -> int:
+        return int(self.meta.get("count", 0))
+
+    def _ids(self) -> list[str]:
+        lines = (self.dir / "ids.txt").read_text().split("\n")
+        return lines[: self.count]
+
+    def _crcs(self) -> list[int]:
+        try:
+            return np.fromfile(self.dir / "crc.u32", dtype=np.uint32)[: self.count].tolist()
+        except OSError:
+            return []
+
+    def _matrix(self) -> "np.ndarray":
+        return np.memmap(self.dir / "vectors.f32", dtype=np.float32, mode="r",
+                         shape=(self.count, self.embedder.dim))
+
+    def _idf(self):
+        if not getattr(self.embedder, "weighted", False):
+            return None
+        try:
+            return np.fromfile(self.dir / "idf.f32", dtype=np.float32)
+        except OSError:
+            return None
+
+    def _vectors(self, texts, idf) -> "np.ndarray":
+        mat = self.embedder.embed(texts)
+        if idf is not None:
+            mat = mat * idf
+        return _normalize(mat)
+
+    def build(self, ids: list[str], texts: list[str], signature=None) -> None:
+        """Replace the namespace with `ids`/`texts`; meta.json is written last."""
+        self.dir.mkdir(parents=True, exist_ok=True)
+        idf = None
+        if getattr(self.embedder, "weighted", False):
+            raw = self.embedder.embed(texts)
+            df = np.count_nonzero(raw, axis=0)
+            idf = (np.log((1.0 + len(texts)) / (1.0 + df)) + 1.0).astype(np.float32)
+            mat = _normalize(raw * idf) if len(texts) else raw
+            _write_atomic(self.dir / "idf.f32", idf.tobytes())
+        else:
+            mat = self._vectors(texts, None)
+        _write_atomic(self.dir / "vectors.f32", np.ascontiguousarray(mat, dtype=np.float32).tobytes())
+        _write_atomic(self.dir / "ids.txt", "\n".join(ids).encode("utf-8"))
+        _write_atomic(self.dir / "crc.u32", np.asarray([_crc(t) for t in texts], dtype=np.uint32).tobytes())
+        self._write_meta(len(ids), signature)
+
+    def append(self, ids: list[str], texts: list[str], signature=None) -> None:
+        """Add rows in place; IDF stays as of the last build()."""
+        if not self.meta:
+            return self.build(ids, texts, signature)
+        mat = self._vectors(texts, self._idf())
+        with open(self.dir / "vectors.f32", "r+b") as f:
+            f.truncate(self.count * self.embedder.dim * 4)
+            f.seek(0, os.SEEK_END)
+            f.write(np.ascontiguousarray(mat, dtype=np.float32).tobytes())
+        with open(self.dir / "crc.u32", "r+b") as f:
+            f.truncate(self.count * 4)
+            f.seek(0, os.SEEK_END)
+            f.write(np.asarray([_crc(t) for t in texts], dtype=np.uint32).tobytes())
+        _write_atomic(self.dir / "ids.txt", "\n".join(self._ids() + list(ids)).encode("utf-8"))
+        self._write_meta(self.count + len(ids), signature)
+
+    def _write_meta(self, count: int, signature) -> None:
+        self.meta = {"embedder": self.embedder.name, "dim": self.embedder.dim,
+                     "count": count, "signature": signature}
+        _write_atomic(self.dir / "meta.json", json.dumps(self.meta).encode("utf-8"))
+
+    # ── query ────────────────────────────────────────────────────────────────
+
+    def search(self, query: str, k: int = 5) -> list[tuple[str, float]]:
+        """(id, cosine) for the k nearest rows, best first."""
+        if not self.count or k <= 0:
+            return []
+        q = self._vectors([query], self._idf())[0]
+        if not q.any():
+            return []
+        scores = self._matrix() @ q
+        k = min(k, scores.shape[0])
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        ids = self._ids()
+        return [(ids[i], float(scores[i])) for i in top]
+
+
+# ── memories table sync ──────────────────────────────────────────────────────
+
+def _signature(conn: sqlite3.Connection, agent: str) -> list:
+    count, max_rowid = conn.execute(
+        "SELECT COUNT(*), COALESCE(MAX(rowid), 0) FROM memories WHERE agent_id=?", (agent,),
+    ).fetchone()
+    return [count, max_rowid, retrieval_cache.data_version(conn, [f"memories:{agent}"])]
+
+
+def sync_namespace(conn: sqlite3.Connection, agent: str, root: Path = SEMANTIC_DIR,
+                   embedder=None, rebuild: bool = False) -> "SemanticIndex":
+    """
+    Bring the agent's namespace up to date with the memories table: nothing
+    if the signature matches, append if the indexed rows are unchanged (by
+    id and content CRC) and rows were only added, else rebuild.
+    """
+    index = SemanticIndex(root, agent, embedder)
+    sig = _signature(conn, agent)
+    old = index.meta.get("signature")
+    if not rebuild and old == sig:
+        return index
+    if not rebuild and old and sig[0] >= index.count:
+        conn.create_function("semantic_crc", 1, _crc, deterministic=True)
+        live = conn.execute(
+            "SELECT id, semantic_crc(content), rowid FROM memories WHERE agent_id=? ORDER BY rowid", (agent,),
+        ).fetchall()
+        n = index.count
+        if [(r[0], r[1]) for r in live[:n]] == list(zip(index._ids(), index._crcs())):
+            new_rows = conn.execute(
+                "SELECT id, content FROM memories WHERE agent_id=? AND rowid > ? ORDER BY rowid",
+                (agent, live[n - 1][2] if n else 0),
+            ).fetchall()
+            if new_rows:
+                index.append([r[0] for r in new_rows], [r[1] or "" for r in new_rows], sig)
+            else:
+                index._write_meta(n, sig)  # e.g. only access counts moved
+            return index
+    rows = conn.execute(
+        "SELECT id, content FROM memories WHERE agent_id=? ORDER BY rowid", (agent,)
+    ).fetchall()
+    index.build([r[0] for r in rows], [r[1] or "" for r in rows], sig)
+    return index
+
+
+def semantic_retrieve(agent: str, query: str, limit: int = 5, conn: sqlite3.Connection | None = None,
+                      db_path: Path = DB_PATH, root: Path | None = None, embedder=None) -> list[dict]:
+    """
+    retrieve()-shaped results ({id, content, score}) ranked by cosine over the
+    agent's and __shared__ namespaces. Returns [] when numpy is unavailable.
+    The namespaces live next to the connection's database unless `root` is
+    given; an in-memory database needs an explicit root.
+    """
+    if np is None or not (query or "").strip():
+        return []
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(str(db_path))
+    if root is None:
+        db_file = retrieval_cache._db_file(conn)
+        if not db_file:
+            if own_conn:
+                conn.close()
+            raise ValueError("semantic_retrieve: pass root for an in-memory database")
+        root = Path(db_file).parent / "semantic"
+    try:
+        hits = []
+        for ns in (agent, "__shared__"):
+            hits += sync_namespace(conn, ns, root, embedder).search(query, limit)
+        hits.sort(key=lambda h: h[1], reverse=True)
+        hits = hits[:limit]
+        if not hits:
+            return []
+        marks = ",".join("?" * len(hits))
+        content = dict(conn.execute(
+            f"SELECT id, content FROM memories WHERE id IN ({marks})", [h[0] for h in hits]
+        ).fetchall())
+    finally:
+        if own_conn:
+            conn.close()
+    return [{"id": rid, "content": content[rid] or "", "score": score}
+            for rid, score in hits if rid in content]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Local semantic retrieval over memories.")
+    parser.add_argument("--agent", required=True)
+    parser.add_argument("--query", default="")
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--db", default=str(DB_PATH))
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the agent's namespace from scratch")
+    args = parser.parse_args()
+
+    if np is None:
+        print("[semantic_index] ERROR: numpy not installed", file=sys.stderr)
+        return 1
+    root = Path(args.db).parent / "semantic"
+    conn = sqlite3.connect(args.db)
+    try:
+        if args.rebuild:
+            for ns in (args.agent, "__shared__"):
+                idx = sync_namespace(conn, ns, root, rebuild=True)
+                print(f"{ns}: {idx.count} rows")
+        if args.query:
+            for r in semantic_retrieve(args.agent, args.query, args.limit, conn=conn, root=root):
+                print(f"[{r['score']:.3f}] {r['content'][:120]}")
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -18,7 +18,9 @@ from pathlib import Path
 
 # Ensure scripts/ is on path for import
 sys.path.insert(0, str(Path(__file__).parent))
-from validate_agent_message import validate_message, _get_db, _now_iso, _log_security_audit
+from validate_agent_message import (
+    RULESET_FINGERPRINT, validate_message, _ensure_verdict_column, _get_db, _now_iso, _log_security_audit,
+)
 
 DB_PATH = Path("/Users/acevashisth/.openclaw/workspace/state/vector.db")
 
@@ -93,6 +95,7 @@ def send_message(from_agent: str, to_agent: str, content: str) -> dict:
     now = _now_iso()
 
     conn = _get_db()
+    _ensure_verdict_column(conn)
 
     if validation["blocked"]:
         # Store blocked message for audit trail (does NOT count toward rate limit)
@@ -105,13 +108,13 @@ def send_message(from_agent: str, to_agent: str, content: str) -> dict:
             INSERT INTO agent_messages
               (id, from_agent_id, to_agent_id, content, validated, blocked,
                blocked_reason, sanitized_content, requires_review, validator_log,
-               created_at, read_at, read_by)
-            VALUES (?, ?, ?, ?, 1, 1, ?, ?, 0, ?, ?, NULL, NULL)
+               validator_fingerprint, created_at, read_at, read_by)
+            VALUES (?, ?, ?, ?, 1, 1, ?, ?, 0, ?, ?, ?, NULL, NULL)
             """,
             (
                 msg_id, from_agent, to_agent, content,
                 blocked_reason, "",
-                validator_log, now,
+                validator_log, RULESET_FINGERPRINT, now,
             ),
         )
         detail = json.dumps({
@@ -166,13 +169,13 @@ def send_message(from_agent: str, to_agent: str, content: str) -> dict:
         INSERT INTO agent_messages
           (id, from_agent_id, to_agent_id, content, validated, blocked,
            blocked_reason, sanitized_content, requires_review, validator_log,
-           created_at, read_at, read_by)
-        VALUES (?, ?, ?, ?, 1, 0, NULL, ?, ?, ?, ?, NULL, NULL)
+           validator_fingerprint, created_at, read_at, read_by)
+        VALUES (?, ?, ?, ?, 1, 0, NULL, ?, ?, ?, ?, ?, NULL, NULL)
         """,
         (
             msg_id, from_agent, to_agent, content,
             sanitized, 1 if requires_review else 0,
-            validator_log, now,
+            validator_log, RULESET_FINGERPRINT, now,
         ),
     )
     conn.commit()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+shared_sections.py — Materialized __shared__ / chief sections of the
+<pm-cognition> block.
+
+Those two sections are the same for every PM and change only when
+review_pending.py approves an item or promote_to_shared.py runs. Both call
+invalidate(), which bumps the generation; build_pm_cognition_block.py
+formats the sections once per generation, stores them here, and every
+other spawn only queries its private beliefs.
+
+An entry is served while its generation is current, its config (caps and
+budget) matches, it is younger than SHARED_TTL_S and the change_counters
+stamp (migrate_schema.py) taken at build time still matches. A write that
+bypasses the two paths (deprecations, edits) moves the stamp, so the entry
+is treated as stale — a miss that rebuilds it — and logged to audit_log as
+'shared_sections_stale'. The TTL is the backstop when change_counters is
+not migrated.
+
+Hit rate and staleness are written to audit_log as 'shared_sections_cache'
+every FLUSH_EVERY lookups and at process exit; invalidations as
+'shared_sections_invalidated'.
+
+Usage:
+    python3 shared_sections.py                       # show the current entry
+    python3 shared_sections.py --invalidate --reason manual
+"""
+
+import argparse
+import atexit
+import json
+import sqlite3
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+import retrieval_cache
+
+DB_PATH = Path("/Users/acevashisth/.openclaw/workspace/state/vector.db")
+
+SHARED_TTL_S = 900
+FLUSH_EVERY = 50
+STAMP_TABLES = ("beliefs:__shared__", "beliefs:chief")
+
+_counts = {"hits": 0, "misses": 0, "stale": 0, "max_age_s": 0.0}
+_flush_db = {"path": None}
+
+
+def _ensure_table(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS shared_sections (
+            key TEXT PRIMARY KEY, generation INTEGER NOT NULL DEFAULT 0,
+            built_generation INTEGER, config TEXT, stamp TEXT,
+            shared TEXT, chief TEXT, tokens INTEGER, built_at REAL)
+    """)
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _writable(conn: sqlite3.Connection) -> tuple[sqlite3.Connection, bool]:
+    """(connection to write with, whether the caller must close it). spawn_pm reads query_only."""
+    if not conn.execute("PRAGMA query_only").fetchone()[0]:
+        return conn, False
+    return sqlite3.connect(retrieval_cache._db_file(conn), timeout=2.0), True
+
+
+def lookup(conn: sqlite3.Connection, config: str) -> tuple[dict | None, int]:
+    """
+    (entry, generation): entry has "shared", "chief" (line lists) and
+    "tokens" when servable, else None. Pass generation back to store().
+    Never raises.
+    """
+    try:
+        row = conn.execute(
+            "SELECT generation, built_generation, config, stamp, shared, chief, tokens, built_at "
+            "FROM shared_sections WHERE key = 'current'"
+        ).fetchone()
+    except sqlite3.Error:
+        row = None
+    if row is None:
+        _record("misses", conn)
+        return None, 0
+    generation, built, cfg, stamp, shared, chief, tokens, built_at = row
+    age = time.time() - (built_at or 0)
+    if built != generation or cfg != config or age >= SHARED_TTL_S:
+        _record("misses", conn)
+        return None, generation
+    if stamp and stamp.startswith("cc:"):
+        current = retrieval_cache.data_version(conn, STAMP_TABLES)
+        if stamp != current:
+            _counts["stale"] += 1
+            _audit(retrieval_cache._db_file(conn), "shared_sections_stale",
+                   {"generation": generation, "built_stamp": stamp, "stamp": current, "age_s": round(age, 1)})
+            _record("misses", conn)
+            return None, generation
+    _counts["max_age_s"] = max(_counts["max_age_s"], round(age, 1))
+    _record("hits", conn)
+    return {"shared": json.loads(shared), "chief": json.loads(chief), "tokens": tokens}, generation
+
+
+def store(conn: sqlite3.Connection, generation: int, config: str, stamp: str,
+          shared: list[str], chief: list[str], tokens: int) -> None:
+    """Materialize sections built at `generation`; dropped if it was invalidated meanwhile."""
+    try:
+        writer, close = _writable(conn)
+    except sqlite3.Error:
+        return
+    try:
+        _ensure_table(writer)
+        writer.execute("INSERT OR IGNORE INTO shared_sections (key, generation) VALUES ('current', 0)")
+        writer.execute(
+            "UPDATE shared_sections SET built_generation=?, config=?, stamp=?, shared=?, chief=?, tokens=?, "
+            "built_at=? WHERE key='current' AND generation=?",
+            (generation, config, stamp, json.dumps(shared), json.dumps(chief), tokens, time.time(), generation),
+        )
+        writer.commit()
+    except sqlite3.Error as e:
+        print(f"[shared_sections] WARNING: store failed: {e}", file=sys.stderr)
+    finally:
+        if close:
+            writer.close()
+
+
+def invalidate(conn: sqlite3.Connection, reason: str) -> int:
+    """Bump the generation so the next spawn rebuilds; returns it. Commits."""
+    _ensure_table(conn)
+    conn.execute(
+        "INSERT INTO shared_sections (key, generation) VALUES ('current', 1) "
+        "ON CONFLICT(key) DO UPDATE SET generation = generation + 1"
+    )
+    generation = conn.execute("SELECT generation FROM shared_sections WHERE key='current'").fetchone()[0]
+    conn.execute(
+        "INSERT INTO audit_log (ts, agent, action, detail) VALUES (?, 'vector', 'shared_sections_invalidated', ?)",
+        (_now_iso(), json.dumps({"reason": reason, "generation": generation})),
+    )
+    conn.commit()
+    return generation
+
+
+def _record(name: str, conn: sqlite3.Connection) -> None:
+    _counts[name] += 1
+    if _flush_db["path"] is None:
+        _flush_db["path"] = retrieval_cache._db_file(conn)
+        atexit.register(flush)
+    if _counts["hits"] + _counts["misses"] >= FLUSH_EVERY:
+        flush()
+
+
+def flush() -> None:
+    """Write the counters since the last flush to audit_log and reset them. Never raises."""
+    lookups = _counts["hits"] + _counts["misses"]
+    if not lookups or not _flush_db["path"]:
+        return
+    detail = {**_counts, "lookups": lookups, "hit_rate": round(_counts["hits"] / lookups, 3)}
+    _audit(_flush_db["path"], "shared_sections_cache", detail)
+    _counts.update({"hits": 0, "misses": 0, "stale": 0, "max_age_s": 0.0})
+
+
+def _audit(db_file: str, action: str, detail: dict) -> None:
+    """One audit_log row on its own connection (lookups may hold a query_only one). Never raises."""
+    try:
+        conn = sqlite3.connect(f"file:{db_file}?mode=rw", uri=True, timeout=2.0)
+        try:
+            conn.execute(
+                "INSERT INTO audit_log (ts, agent, action, detail) VALUES (?, 'vector', ?, ?)",
+                (_now_iso(), action, json.dumps(detail)),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"[shared_sections] WARNING: audit write failed ({action}): {e}", file=sys.stderr)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Inspect or invalidate the shared cognition sections.")
+    parser.add_argument("--db", default=str(DB_PATH))
+    parser.add_argument("--invalidate", action="store_true")
+    parser.add_argument("--reason", default="manual")
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        print(f"[shared_sections] ERROR: DB not found at {args.db}", file=sys.stderr)
+        return 1
+    conn = sqlite3.connect(args.db)
+    try:
+        if args.invalidate:
+            print(json.dumps({"generation": invalidate(conn, args.reason)}))
+            return 0
+        _ensure_table(conn)
+        row = conn.execute(
+            "SELECT generation, built_generation, tokens, built_at FROM shared_sections WHERE key='current'"
+        ).fetchone()
+        generation, built, tokens, built_at = row or (0, None, None, None)
+        print(json.dumps({"generation": generation, "built_generation": built, "tokens": tokens,
+                          "age_s": round(time.time() - built_at, 1) if built_at else None}))
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
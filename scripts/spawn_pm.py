@@ -10,8 +10,39 @@ This ensures every PM spawns with:
 
 Usage:
     python3 spawn_pm.py --agent forge --task "Implement JWT auth" --ticket FORGE-AUTH-001
+    python3 spawn_pm.py --batch sprint.jsonl      # {"agent", "task", "ticket"} per line; - = stdin
 
 Output (stdout): A formatted <cognitive-context> block ready to prepend to the spawn task.
+Output (stderr): One timing line, per stage and total, in milliseconds.
+
+Stages run concurrently under one deadline (--deadline). Keyword expansion
+feeds memory retrieval, which is the critical path. The cognition block and
+the format instruction do not depend on it. A stage still running at the
+deadline is reported as timed out and replaced by its fallback text.
+
+By default every stage runs in this process, each on its own long-lived
+read connection (stage_connection), and the format instruction is read once
+per process. A single spawn from the command line is a short-lived process,
+so an LLM expansion still running at its budget is handed to a detached
+child (detach=True) that caches the answer after we exit; --batch keeps it
+on a thread and waits for outstanding ones before exiting.
+--isolate restores one child interpreter per stage (expand_retrieval_query.py,
+retrieve_memories.py, build_pm_cognition_block.py) for when a stage must not
+share this process.
+
+--semantic ranks memories by local vector similarity to the task
+(semantic_index.py) and skips keyword expansion; it falls back to keywords
+when the index has nothing (or numpy is missing), and bypasses prewarmed
+blocks, which are keyword-built.
+
+--batch expands every task in one combined LLM request (--local: the local
+keyword tier only, no LLM), then builds each context on the shared connection
+and caches and prints one JSON object per line as soon as it is ready.
+
+A block pre-built by prewarm_contexts.py for the same agent and ticket is
+served as-is while the agent's memories and beliefs are unchanged, if the
+task is the ticket title or mentions the ticket (prewarm_contexts.lookup).
+--isolate checks for one too, on a short-lived connection.
 
 Handles gracefully:
   - Empty memories DB → shows empty memories section
@@ -22,13 +53,47 @@ Handles gracefully:
 import argparse
 import json
 import re
+import sqlite3
 import subprocess
 import sys
+import threading
+import time
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent))
+from build_pm_cognition_block import build_pm_cognition_block
+from expand_retrieval_query import LLM_BUDGET_S, expand_retrieval_queries, expand_retrieval_query, join_refreshes
+import prewarm_contexts
+from context_packer import pack
+from retrieve_memories import retrieve
+from semantic_index import semantic_retrieve
+
 SCRIPTS = Path("/Users/acevashisth/.openclaw/workspace/scripts")
 DB_DEFAULT = Path("/Users/acevashisth/.openclaw/workspace/state/vector.db")
 FORMAT_INSTRUCTION_PATH = SCRIPTS / "PM_OUTPUT_FORMAT_INSTRUCTION.txt"
+DEADLINE_S = 60.0
+# Memories: retrieve this many candidates, keep the best score-per-token under the budget.
+MEMORY_CANDIDATES = 10
+MEMORY_TOKEN_BUDGET = 350
+MEMORY_ITEM_TOKENS = 60
+
+# Inline fallback — minimal but functional
+INLINE_FORMAT_INSTRUCTION = (
+    'At the END of your task response, output this JSON on a single line:\n'
+    '{"belief_updates":[{"content":"...","category":"fact","confidence":0.8,'
+    '"importance":5,"action_implication":"...","evidence_for":"...","evidence_against":"..."}],'
+    '"memory_operations":[],"knowledge_gaps":[]}\n'
+    'Empty arrays are fine. This is how you remember across tasks.'
+)
+
+COGNITION_TIMEOUT_BLOCK = (
+    "<pm-cognition>\n"
+    "## Your beliefs (private)\n"
+    "Belief retrieval timed out — starting fresh.\n"
+    "\n## Shared context (from VECTOR)\n"
+    "No shared context available.\n"
+    "</pm-cognition>"
+)
 
 
 def _fallback_terms(task: str) -> list[str]:
@@ -44,8 +109,21 @@ def _fallback_terms(task: str) -> list[str]:
     return out
 
 
-def expand_keywords(agent: str, task: str) -> list[str]:
-    """Expand task into retrieval keywords; never raises."""
+def expand_keywords(agent: str, task: str, detach: bool = False) -> list[str]:
+    """
+    Expand task into retrieval keywords in-process; never raises. detach asks
+    the LLM from a child that outlives this process, for short-lived callers.
+    """
+    try:
+        data = expand_retrieval_query(task, agent, budget_s=LLM_BUDGET_S, isolate=detach)
+        keywords = [str(x).strip().lower() for x in data if str(x).strip()]
+        return keywords or _fallback_terms(task)
+    except Exception:
+        return _fallback_terms(task)
+
+
+def expand_keywords_isolated(agent: str, task: str) -> list[str]:
+    """expand_keywords in a child interpreter; never raises."""
     try:
         result = subprocess.run(
             [sys.executable, str(SCRIPTS / "expand_retrieval_query.py"),
@@ -63,41 +141,135 @@ def expand_keywords(agent: str, task: str) -> list[str]:
         return _fallback_terms(task)
 
 
-def get_memories(agent: str, task: str, limit: int = 5) -> str:
-    """Call retrieve_memories.py to get top memories for this agent + task query."""
-    queries = expand_keywords(agent, task)
+_connections: dict = {}  # (db path, stage) → (connection, lock)
+
+
+def stage_connection(db_path: Path, stage: str = "main") -> tuple[sqlite3.Connection, threading.Lock] | None:
+    """
+    The process-wide read connection `stage` uses on `db_path`, with the lock
+    a stage holds while it runs; None if the DB is missing. Concurrent stages
+    never share a connection. The lock covers a stage abandoned at the
+    deadline that is still on its connection when the next context is built.
+    query_only guards against writes.
+    """
+    key = (str(db_path), stage)
+    entry = _connections.get(key)
+    if entry is None and Path(db_path).exists():
+        conn = sqlite3.connect(key[0], check_same_thread=False)  # opened here, used on a stage thread
+        conn.execute("PRAGMA query_only = ON")
+        entry = _connections[key] = (conn, threading.Lock())
+    return entry
+
+
+def _on_connection(entry: tuple | None, fn):
+    """fn(connection) holding its lock; fn(None) when the DB is missing or the stage is isolated."""
+    if entry is None:
+        return fn(None)
+    conn, lock = entry
+    with lock:
+        return fn(conn)
+
+
+def _retrieve_child(agent: str, limit: int, db_path: Path, args: list[str]) -> str:
+    result = subprocess.run(
+        [sys.executable, str(SCRIPTS / "retrieve_memories.py"), "--agent", agent,
+         "--limit", str(limit), "--db", str(db_path), *args],
+        capture_output=True, text=True, timeout=20
+    )
+    return result.stdout.strip() if result.returncode == 0 else ""
+
+
+def _retrieve_isolated(agent: str, queries: list[str], task: str, limit: int, db_path: Path) -> str:
+    out = _retrieve_child(agent, limit, db_path, ["--queries", *queries, "--query", task]) if queries else ""
+    return out or _retrieve_child(agent, limit, db_path, ["--query", task])
+
+
+def _semantic_memories(agent: str, task: str, limit: int, conn: sqlite3.Connection | None,
+                       db_path: Path, isolate: bool) -> str:
+    """Memories ranked by local vector similarity to the task; "" when there are none."""
+    if isolate:
+        return _retrieve_child(agent, limit, db_path, ["--semantic", "--query", task])
     try:
-        cmd = [sys.executable, str(SCRIPTS / "retrieve_memories.py"),
-               "--agent", agent,
-               "--limit", str(limit)]
-        if queries:
-            cmd += ["--queries", *queries]
-        else:
-            cmd += ["--query", task]
+        results = semantic_retrieve(agent, task, limit, conn=conn, db_path=db_path)
+    except Exception as e:
+        print(f"[spawn_pm] WARNING: semantic retrieval failed: {e}", file=sys.stderr)
+        return ""
+    return format_memories(results) if results else ""
 
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=20)
-        output = result.stdout.strip()
-        if result.returncode != 0 or not output:
-            # hard fallback to single-query path if multi-query yielded nothing/error
-            fallback = subprocess.run(
-                [sys.executable, str(SCRIPTS / "retrieve_memories.py"),
-                 "--agent", agent,
-                 "--query", task,
-                 "--limit", str(limit)],
-                capture_output=True, text=True, timeout=15
-            )
-            fb_out = fallback.stdout.strip()
-            if fb_out:
-                return fb_out
+
+def format_memories(results: list[dict], token_budget: int = MEMORY_TOKEN_BUDGET) -> str:
+    """"[score] content" lines for the memories that best fill token_budget, best first."""
+    kept = pack([{"text": f"[{r['score']:.3f}] {r['content']}", "value": r["score"]} for r in results],
+                token_budget, max_item_tokens=MEMORY_ITEM_TOKENS)
+    return "\n".join(k["text"] for k in kept)
+
+
+def get_memories(agent: str, task: str, limit: int = MEMORY_CANDIDATES, conn: sqlite3.Connection | None = None,
+                 db_path: Path = DB_DEFAULT, timings: dict | None = None, isolate: bool = False,
+                 queries: list[str] | None = None, detach: bool = False, semantic: bool = False) -> str:
+    """
+    Top memories for this agent + task query, retrieved in-process on `conn` if
+    given. Pass already-expanded `queries` to skip the expansion step. With
+    semantic, rank by vector similarity first and use keywords only if that
+    finds nothing.
+    """
+    start = time.perf_counter()
+    if semantic and (conn is not None or Path(db_path).exists()):
+        found = _semantic_memories(agent, task, limit, conn, db_path, isolate)
+        if timings is not None:
+            timings["semantic"] = round((time.perf_counter() - start) * 1000, 1)
+        if found:
+            return found
+        start = time.perf_counter()
+    if queries is None:
+        queries = expand_keywords_isolated(agent, task) if isolate else expand_keywords(agent, task, detach=detach)
+    if timings is not None:
+        timings["expand"] = round((time.perf_counter() - start) * 1000, 1)
+    if conn is None and not Path(db_path).exists():
+        return "(No memories found — this agent is starting fresh)"
+    try:
+        if isolate:
+            return _retrieve_isolated(agent, queries, task, limit, db_path) or \
+                "(No memories found — this agent is starting fresh)"
+        results = retrieve(agent, queries, limit, conn=conn, query=task, db_path=db_path)
+        if not results and queries:
+            # fallback to the lenient single-query path if multi-query yielded nothing
+            results = retrieve(agent, None, limit, conn=conn, query=task, db_path=db_path)
+        if not results:
             return "(No memories found — this agent is starting fresh)"
-        return output
-    except subprocess.TimeoutExpired:
-        return "(Memory retrieval timed out — skipping)"
+        return format_memories(results)
     except Exception as e:
         return f"(Memory retrieval error: {e})"
 
 
-def get_cognition_block(agent: str, db_path: Path) -> str:
+EMPTY_COGNITION_BLOCK = (
+    "<pm-cognition>\n"
+    "## Your beliefs (private)\n"
+    "No prior beliefs for this agent — forming from scratch.\n"
+    "\n## Shared context (from VECTOR)\n"
+    "No shared context available.\n"
+    "</pm-cognition>"
+)
+
+
+def get_cognition_block(agent: str, db_path: Path, conn: sqlite3.Connection | None = None) -> str:
+    """The pm-cognition XML block, built in-process on `conn` if given."""
+    if conn is None and not Path(db_path).exists():
+        return EMPTY_COGNITION_BLOCK
+    try:
+        return build_pm_cognition_block(db_path, agent, conn=conn) or EMPTY_COGNITION_BLOCK
+    except Exception as e:
+        return (
+            f"<pm-cognition>\n"
+            f"## Your beliefs (private)\n"
+            f"Belief retrieval error ({e}) — starting fresh.\n"
+            f"\n## Shared context (from VECTOR)\n"
+            f"No shared context available.\n"
+            f"</pm-cognition>"
+        )
+
+
+def get_cognition_block_isolated(agent: str, db_path: Path) -> str:
     """Call build_pm_cognition_block.py to get the pm-cognition XML block."""
     try:
         result = subprocess.run(
@@ -109,24 +281,10 @@ def get_cognition_block(agent: str, db_path: Path) -> str:
         output = result.stdout.strip()
         if result.returncode != 0 or not output:
             # Graceful fallback — return minimal block
-            return (
-                "<pm-cognition>\n"
-                "## Your beliefs (private)\n"
-                "No prior beliefs for this agent — forming from scratch.\n"
-                "\n## Shared context (from VECTOR)\n"
-                "No shared context available.\n"
-                "</pm-cognition>"
-            )
+            return EMPTY_COGNITION_BLOCK
         return output
     except subprocess.TimeoutExpired:
-        return (
-            "<pm-cognition>\n"
-            "## Your beliefs (private)\n"
-            "Belief retrieval timed out — starting fresh.\n"
-            "\n## Shared context (from VECTOR)\n"
-            "No shared context available.\n"
-            "</pm-cognition>"
-        )
+        return COGNITION_TIMEOUT_BLOCK
     except Exception as e:
         return (
             f"<pm-cognition>\n"
@@ -138,30 +296,130 @@ def get_cognition_block(agent: str, db_path: Path) -> str:
         )
 
 
+_format_instruction: tuple | None = None  # (mtime, text) of the last read
+
+
 def get_format_instruction() -> str:
-    """Read PM_OUTPUT_FORMAT_INSTRUCTION.txt. Returns inline fallback if missing."""
-    if FORMAT_INSTRUCTION_PATH.exists():
+    """Read PM_OUTPUT_FORMAT_INSTRUCTION.txt (once per mtime). Returns inline fallback if missing."""
+    global _format_instruction
+    try:
+        mtime = FORMAT_INSTRUCTION_PATH.stat().st_mtime
+        if _format_instruction is None or _format_instruction[0] != mtime:
+            _format_instruction = (mtime, FORMAT_INSTRUCTION_PATH.read_text().strip())
+        return _format_instruction[1]
+    except Exception:
+        pass  # Fall through to inline fallback
+    return INLINE_FORMAT_INSTRUCTION
+
+
+def _run_stages(stages: dict, deadline_s: float, timings: dict) -> dict:
+    """
+    Run each stage callable on its own daemon thread and collect results until
+    `deadline_s`. A stage is called with a timings dict of its own for any
+    sub-timings. At the deadline the results and timings are snapshotted:
+    a stage that has not finished is left behind (daemon threads do not hold
+    up exit), missing from the result and reported as "timeout" — whatever
+    it records later is dropped.
+    """
+    results, measured = {}, {}
+    lock = threading.Lock()
+    closed = [False]
+    t0 = time.perf_counter()
+
+    def run(name, fn):
+        start = time.perf_counter()
+        own_timings = {}
         try:
-            return FORMAT_INSTRUCTION_PATH.read_text().strip()
+            result = fn(own_timings)
         except Exception as e:
-            pass  # Fall through to inline fallback
-
-    # Inline fallback — minimal but functional
-    return (
-        'At the END of your task response, output this JSON on a single line:\n'
-        '{"belief_updates":[{"content":"...","category":"fact","confidence":0.8,'
-        '"importance":5,"action_implication":"...","evidence_for":"...","evidence_against":"..."}],'
-        '"memory_operations":[],"knowledge_gaps":[]}\n'
-        'Empty arrays are fine. This is how you remember across tasks.'
-    )
+            result = e
+        with lock:
+            if not closed[0]:
+                results[name] = result
+                measured.update(own_timings)
+                measured[name] = round((time.perf_counter() - start) * 1000, 1)
+
+    threads = [threading.Thread(target=run, args=(name, fn), name=f"spawn_pm-{name}", daemon=True)
+               for name, fn in stages.items()]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(max(0.0, deadline_s - (time.perf_counter() - t0)))
+    with lock:
+        closed[0] = True
+        done = dict(results)
+        timings.update(measured)
+    for name in stages:
+        if name not in done:
+            timings[name] = "timeout"
+    return done
+
+
+def _lookup_isolated(agent: str, ticket: str, task: str, db_path: Path) -> dict | None:
+    """prewarm_contexts.lookup on a connection of its own, closed right after."""
+    if not Path(db_path).exists():
+        return None
+    try:
+        conn = sqlite3.connect(str(db_path), timeout=2.0)
+    except sqlite3.Error:
+        return None
+    try:
+        return prewarm_contexts.lookup(conn, agent, ticket, task)
+    finally:
+        conn.close()
+
+
+def build_cognitive_context(agent: str, task: str, ticket: str, db_path: Path,
+                            deadline_s: float = DEADLINE_S, timings: dict | None = None,
+                            isolate: bool = False, detach: bool = False, semantic: bool = False) -> str:
+    """
+    Assemble the full <cognitive-context> block; per-stage ms go to `timings`.
+    detach: see expand_keywords; semantic: see get_memories.
+    """
+    timings = {} if timings is None else timings
+    t0 = time.perf_counter()
+    connection = (lambda stage: None) if isolate else (lambda stage: stage_connection(db_path, stage))
 
+    main = connection("main")
+    if semantic:
+        stored = None  # prewarmed blocks hold keyword-ranked memories
+    elif main is not None:
+        stored = _on_connection(main, lambda conn: prewarm_contexts.lookup(conn, agent, ticket, task))
+    else:
+        stored = _lookup_isolated(agent, ticket, task, db_path)
+    if stored is not None:
+        timings["prewarmed"] = round((time.perf_counter() - t0) * 1000, 1)
+        return _assemble(agent, ticket, stored["memories"], stored["cognition"], get_format_instruction())
 
-def build_cognitive_context(agent: str, task: str, ticket: str, db_path: Path) -> str:
-    """Assemble the full <cognitive-context> block."""
-    memories = get_memories(agent, task)
-    cognition_block = get_cognition_block(agent, db_path)
-    format_instruction = get_format_instruction()
+    memories_conn, cognition_conn = connection("memories"), connection("cognition")
+    if isolate:
+        cognition = lambda t: get_cognition_block_isolated(agent, db_path)
+    else:
+        cognition = lambda t: _on_connection(cognition_conn,
+                                             lambda conn: get_cognition_block(agent, db_path, conn=conn))
+    done = _run_stages({
+        "memories": lambda t: _on_connection(memories_conn, lambda conn: get_memories(
+            agent, task, conn=conn, db_path=db_path, timings=t, isolate=isolate, detach=detach,
+            semantic=semantic)),
+        "cognition": cognition,
+        "format": lambda t: get_format_instruction(),
+    }, deadline_s, timings)
+    timings["total"] = round((time.perf_counter() - t0) * 1000, 1)
 
+    memories = done.get("memories")
+    if not isinstance(memories, str):
+        memories = (f"(Memory retrieval error: {memories})" if memories is not None
+                    else f"(Memory retrieval timed out after {deadline_s:g}s — starting fresh)")
+    cognition_block = done.get("cognition")
+    if not isinstance(cognition_block, str):
+        cognition_block = COGNITION_TIMEOUT_BLOCK
+    format_instruction = done.get("format")
+    if not isinstance(format_instruction, str):
+        format_instruction = INLINE_FORMAT_INSTRUCTION
+    return _assemble(agent, ticket, memories, cognition_block, format_instruction)
+
+
+def _assemble(agent: str, ticket: str, memories: str, cognition_block: str, format_instruction: str) -> str:
     lines = [
         f'<cognitive-context agent="{agent}" ticket="{ticket}">',
         "",
@@ -180,15 +438,81 @@ def build_cognitive_context(agent: str, task: str, ticket: str, db_path: Path) -
     return "\n".join(lines)
 
 
+def run_batch(lines, db_path: Path, out=None, local_only: bool = False,
+              budget_s: float | None = LLM_BUDGET_S, semantic: bool = False) -> int:
+    """
+    Build a context for each JSONL {"agent", "task", "ticket"} line and write
+    one JSON result per line to `out` as each completes. Returns the number of
+    contexts built; malformed lines get an {"error": ...} result instead.
+    """
+    out = out or sys.stdout
+    items = []
+    for n, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+            if not (isinstance(item, dict) and item.get("agent") and item.get("task")):
+                raise ValueError("agent and task are required")
+        except ValueError as e:
+            print(json.dumps({"line": n, "error": str(e)}), file=out, flush=True)
+            continue
+        items.append((str(item["agent"]), str(item["task"]), str(item.get("ticket") or "UNKNOWN-000")))
+
+    main = stage_connection(db_path)  # the stages run in turn here, on the main connection
+    pending, built = [], 0
+    for agent, task, ticket in items:
+        stored = (_on_connection(main, lambda conn: prewarm_contexts.lookup(conn, agent, ticket, task))
+                  if main is not None and not semantic else None)
+        if stored is None:
+            pending.append((agent, task, ticket))
+            continue
+        context = _assemble(agent, ticket, stored["memories"], stored["cognition"], get_format_instruction())
+        print(json.dumps({"agent": agent, "ticket": ticket, "context": context, "keywords": stored["keywords"],
+                          "timings": {"prewarmed": 0.0}}), file=out, flush=True)
+        built += 1
+
+    t0 = time.perf_counter()
+    expanded = expand_retrieval_queries([(task, agent) for agent, task, _ in pending],
+                                        budget_s=budget_s, local_only=local_only) if pending else []
+    expand_ms = round((time.perf_counter() - t0) * 1000, 1)
+    for (agent, task, ticket), keywords in zip(pending, expanded):
+        start = time.perf_counter()
+        keywords = keywords or _fallback_terms(task)
+        timings = {"expand_batch": expand_ms}
+        memories, cognition_block = _on_connection(main, lambda conn: (
+            get_memories(agent, task, conn=conn, db_path=db_path, timings=timings, queries=keywords,
+                         semantic=semantic),
+            get_cognition_block(agent, db_path, conn=conn)))
+        context = _assemble(agent, ticket, memories, cognition_block, get_format_instruction())
+        timings["total"] = round((time.perf_counter() - start) * 1000, 1)
+        print(json.dumps({"agent": agent, "ticket": ticket, "context": context, "keywords": keywords,
+                          "timings": timings}), file=out, flush=True)
+        built += 1
+    return built
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Build cognitive context injection for PM spawns."
     )
-    parser.add_argument("--agent", required=True, help="PM agent ID (e.g. forge, ghost)")
-    parser.add_argument("--task", required=True, help="Task description (used for memory query)")
+    parser.add_argument("--agent", help="PM agent ID (e.g. forge, ghost)")
+    parser.add_argument("--task", help="Task description (used for memory query)")
     parser.add_argument("--ticket", default="UNKNOWN-000", help="Ticket ID (e.g. FORGE-001)")
     parser.add_argument("--db", default=str(DB_DEFAULT), help="Path to vector.db")
+    parser.add_argument("--deadline", type=float, default=DEADLINE_S,
+                        help=f"Overall seconds for all stages (default {DEADLINE_S:g})")
+    parser.add_argument("--isolate", action="store_true",
+                        help="Run each stage in its own child interpreter instead of in-process")
+    parser.add_argument("--batch", metavar="JSONL",
+                        help="Build contexts for every {agent, task, ticket} line of this file (- = stdin)")
+    parser.add_argument("--local", action="store_true",
+                        help="With --batch: local keyword tier only, no LLM expansion")
+    parser.add_argument("--semantic", action="store_true",
+                        help="Rank memories by local vector similarity (semantic_index.py), keywords as fallback")
     args = parser.parse_args()
+    if not args.batch and not (args.agent and args.task):
+        parser.error("--agent and --task are required unless --batch is given")
 
     db_path = Path(args.db)
     if not db_path.exists():
@@ -197,8 +521,20 @@ def main():
             file=sys.stderr
         )
 
-    context = build_cognitive_context(args.agent, args.task, args.ticket, db_path)
-    print(context)
+    if args.batch:
+        if args.batch == "-":
+            run_batch(sys.stdin, db_path, local_only=args.local, semantic=args.semantic)
+        else:
+            with open(args.batch) as f:
+                run_batch(f, db_path, local_only=args.local, semantic=args.semantic)
+        join_refreshes()  # over-budget LLM answers are still being cached on threads
+        return
+
+    timings = {}
+    context = build_cognitive_context(args.agent, args.task, args.ticket, db_path, args.deadline, timings,
+                                      isolate=args.isolate, detach=True, semantic=args.semantic)
+    print(context, flush=True)
+    print("[spawn_pm] timing_ms " + " ".join(f"{k}={v}" for k, v in timings.items()), file=sys.stderr)
 
 
 if __name__ == "__main__":
@@ -34,6 +34,15 @@ sys.path.insert(0, str(SCRIPTS_DIR))
 DB_PATH = Path("/Users/acevashisth/.openclaw/workspace/state/vector.db")
 OPENCLAW_CONFIG = Path.home() / ".openclaw/openclaw.json"
 
+from context_packer import estimate_tokens, pack_sections
+
+# Context block budget (replaces the old 1200-char slice) and per-item cap.
+CONTEXT_TOKEN_BUDGET = 300
+ITEM_TOKENS = 40
+# Packing values for non-belief items, on the belief importance scale.
+MESSAGE_VALUE = 8.0
+PROPOSAL_VALUE = 5.0
+
 # Model preference: cheapest first
 SYSTEM1_MODEL_PREFERENCE = [
     "claude-haiku-4-5-20251001",
@@ -153,16 +162,17 @@ def _get_or_create_cognitive_state(agent_id: str) -> dict:
 
 def _build_context_block(agent_id: str) -> str:
     """
-    Build a compact context block for System 1 (max ~500 tokens).
+    Build a compact context block for System 1 (CONTEXT_TOKEN_BUDGET tokens).
 
     SECURITY: All content is fetched via approved scripts/queries.
     Messages MUST come from read_agent_messages.py (not raw SQL).
-    Content is truncated aggressively to stay within token budget.
+    Items compete for the token budget by value per token (context_packer).
     """
     conn = _get_db()
-    lines = [f"Agent: {agent_id}\n"]
+    sections = []  # (header, items, empty_line) for pack_sections
 
     # ── Top beliefs (active only, limit 5) ───────────────────────────────────
+    items, empty = [], "  (no active beliefs)"
     try:
         beliefs = conn.execute(
             """SELECT content, category, confidence, evidence_for, evidence_against,
@@ -174,9 +184,8 @@ def _build_context_block(agent_id: str) -> str:
             (agent_id,),
         ).fetchall()
 
-        lines.append("BELIEFS (top 5 active):")
         for b in beliefs:
-            content = str(b["content"] or "").strip()[:80]
+            content = str(b["content"] or "").strip()
             cat = b["category"] or "fact"
             conf = b["confidence"] or 0.0
 
@@ -206,30 +215,29 @@ def _build_context_block(agent_id: str) -> str:
                 flags.append("STALE")
             flag_str = f" [{','.join(flags)}]" if flags else ""
 
-            lines.append(f"  - [{cat},{conf:.2f}]{flag_str} {content}")
-
-        if not beliefs:
-            lines.append("  (no active beliefs)")
+            # Flagged beliefs are what System 1 looks for, so they are worth more.
+            value = float(b["importance"] or 5.0) * (1.0 + 0.5 * len(flags))
+            items.append({"text": f"  - [{cat},{conf:.2f}]{flag_str} {content}", "value": value})
     except Exception as e:
-        lines.append(f"  (belief read error: {e})")
+        empty = f"  (belief read error: {e})"
+    sections.append(("BELIEFS (top 5 active):", items, empty))
 
     # ── Unread messages (via read_agent_messages.py — validated path) ─────────
     # SECURITY: We call the validated read function, NOT raw SQL on agent_messages
+    items, empty = [], "  (none)"
     try:
         import read_agent_messages as ram
         messages = ram.read_messages(to_agent=agent_id, unread_only=True, limit=3)
-        lines.append("UNREAD MESSAGES:")
-        if messages:
-            for msg in messages:
-                content_preview = str(msg.get("sanitized_content") or msg.get("content") or "")[:60]
-                from_agent = str(msg.get("from_agent_id", "?"))[:20]
-                lines.append(f"  - from:{from_agent} {content_preview}")
-        else:
-            lines.append("  (none)")
+        for msg in messages or []:
+            content_preview = str(msg.get("sanitized_content") or msg.get("content") or "")
+            from_agent = str(msg.get("from_agent_id", "?"))[:20]
+            items.append({"text": f"  - from:{from_agent} {content_preview}", "value": MESSAGE_VALUE})
     except Exception as e:
-        lines.append(f"  (message read error: {e})")
+        empty = f"  (message read error: {e})"
+    sections.append(("UNREAD MESSAGES:", items, empty))
 
     # ── Open proposals (limit 3) ──────────────────────────────────────────────
+    items, empty = [], "  (none)"
     try:
         proposals = conn.execute(
             """SELECT title, author_agent_id, requires_review
@@ -238,19 +246,18 @@ def _build_context_block(agent_id: str) -> str:
                ORDER BY created_at DESC
                LIMIT 3""",
         ).fetchall()
-        lines.append("OPEN PROPOSALS:")
-        if proposals:
-            for p in proposals:
-                title = str(p["title"] or "")[:60]
-                author = str(p["author_agent_id"] or "?")[:15]
-                rev = " [NEEDS_REVIEW]" if p["requires_review"] else ""
-                lines.append(f"  - {title} (by {author}){rev}")
-        else:
-            lines.append("  (none)")
+        for p in proposals:
+            title = str(p["title"] or "")
+            author = str(p["author_agent_id"] or "?")[:15]
+            rev = " [NEEDS_REVIEW]" if p["requires_review"] else ""
+            items.append({"text": f"  - {title} (by {author}){rev}",
+                          "value": PROPOSAL_VALUE * (1.5 if p["requires_review"] else 1.0)})
     except Exception as e:
-        lines.append(f"  (proposal read error: {e})")
+        empty = f"  (proposal read error: {e})"
+    sections.append(("OPEN PROPOSALS:", items, empty))
 
     # ── Knowledge gaps (unresolved, limit 3) ─────────────────────────────────
+    items, empty = [], "  (none)"
     try:
         gaps = conn.execute(
             """SELECT description, domain, importance
@@ -260,22 +267,21 @@ def _build_context_block(agent_id: str) -> str:
                LIMIT 3""",
             (agent_id,),
         ).fetchall()
-        lines.append("KNOWLEDGE GAPS:")
-        if gaps:
-            for g in gaps:
-                desc = str(g["description"] or "").strip()[:80]
-                domain = str(g["domain"] or "").strip()[:20]
-                imp = g["importance"] or 0.0
-                if not desc:
-                    desc = "(empty description)"  # graceful handling of empty gaps
-                lines.append(f"  - [{domain},imp={imp:.0f}] {desc}")
-        else:
-            lines.append("  (none)")
+        for g in gaps:
+            desc = str(g["description"] or "").strip()
+            domain = str(g["domain"] or "").strip()[:20]
+            imp = g["importance"] or 0.0
+            if not desc:
+                desc = "(empty description)"  # graceful handling of empty gaps
+            items.append({"text": f"  - [{domain},imp={imp:.0f}] {desc}", "value": float(imp)})
     except Exception as e:
-        lines.append(f"  (knowledge_gap read error: {e})")
+        empty = f"  (knowledge_gap read error: {e})"
+    sections.append(("KNOWLEDGE GAPS:", items, empty))
 
     conn.close()
-    return "\n".join(lines)
+    header = f"Agent: {agent_id}\n"
+    lines = pack_sections(sections, CONTEXT_TOKEN_BUDGET - estimate_tokens(header), max_item_tokens=ITEM_TOKENS)
+    return "\n".join([header] + lines)
 
 
 def _call_ai(prompt: str, api_cfg: dict) -> str:
@@ -344,7 +350,7 @@ def run_system1_scan(agent_id: str, mock_response: str | None = None) -> dict:
         f"Given the following agent context, answer: is there anything worth deeper analysis?\n"
         f"Answer with exactly 'YES: <one-sentence reason>' or 'NO: <one-sentence reason>'.\n\n"
         f"--- CONTEXT ---\n"
-        f"{context_block[:1200]}\n"
+        f"{context_block}\n"
         f"--- END CONTEXT ---\n\n"
         f"Decision (YES or NO with one sentence reason):"
     )
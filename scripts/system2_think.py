@@ -8,6 +8,7 @@ Generates ONE action: a proposal, a belief update, or a knowledge_gap update.
 Usage:
     python3 system2_think.py --agent forge --reason "System 1 escalated: new proposal"
     python3 system2_think.py --agent forge --reason "test" --mock-output '{"type":"proposal",...}'
+    python3 system2_think.py --agent forge --reason "..." --semantic   # memories by similarity to the reason
 
 Security rules:
   - Check daily cap FIRST (before any expensive computation)
@@ -35,6 +36,17 @@ OPENCLAW_CONFIG = Path.home() / ".openclaw/openclaw.json"
 SYSTEM2_MODEL = "claude-sonnet-4-6"
 DAILY_CAP = 2  # Hard cap: enforced in code
 
+from context_packer import estimate_tokens, pack_sections
+
+# Rich context budget and per-item cap (tokens).
+CONTEXT_TOKEN_BUDGET = 900
+ITEM_TOKENS = 60
+# Packing values on the belief importance scale. Memory scores are ACT-R
+# activations (unbounded), so they are scaled by the top score first.
+MEMORY_VALUE = 8.0
+MESSAGE_VALUE = 8.0
+PROPOSAL_VALUE = 4.0
+
 
 def _now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
@@ -102,18 +114,23 @@ def _check_daily_cap(agent_id: str) -> tuple[bool, int]:
     return count >= DAILY_CAP, count
 
 
-def _build_rich_context(agent_id: str) -> str:
+def _build_rich_context(agent_id: str, query: str = "", semantic: bool = False) -> str:
     """
-    Build rich context for System 2 reasoning.
+    Build rich context for System 2 reasoning (CONTEXT_TOKEN_BUDGET tokens,
+    items chosen by value per token — see context_packer.py). With semantic,
+    memories are ranked by local vector similarity to `query`
+    (semantic_index.py), falling back to ACT-R activation.
     SECURITY: Only injects THIS agent's beliefs (agent_id filter enforced).
     Never injects other PMs' beliefs.
     """
     conn = _get_db()
-    lines = [f"=== System 2 Context for agent: {agent_id} ===\n"]
+    header = f"=== System 2 Context for agent: {agent_id} ===\n"
+    sections = []  # (header, items, empty_line) for pack_sections
 
     # ── Agent beliefs (OWN ONLY — critical isolation) ─────────────────────────
     # SECURITY: WHERE agent_id = ? ensures we ONLY get this agent's beliefs
     # No cross-PM contamination possible via this query.
+    items, empty = [], "  (no active beliefs)"
     try:
         beliefs = conn.execute(
             """SELECT content, category, confidence, action_implication,
@@ -125,33 +142,39 @@ def _build_rich_context(agent_id: str) -> str:
             (agent_id,),  # PARAMETERIZED — isolation enforced here
         ).fetchall()
 
-        lines.append(f"## My beliefs (agent_id='{agent_id}' ONLY):")
         for b in beliefs:
-            content = str(b["content"] or "")[:120]
+            content = str(b["content"] or "")
             cat = b["category"] or "fact"
             conf = b["confidence"] or 0.0
-            lines.append(f"  - [{cat},{conf:.2f}] {content}")
-        if not beliefs:
-            lines.append("  (no active beliefs)")
+            items.append({"text": f"  - [{cat},{conf:.2f}] {content}",
+                          "value": float(b["importance"] or 5.0) * (0.5 + conf)})
     except Exception as e:
-        lines.append(f"  (belief read error: {e})")
+        empty = f"  (belief read error: {e})"
+    sections.append((f"## My beliefs (agent_id='{agent_id}' ONLY):", items, empty))
 
-    # ── Relevant memories (via retrieve_memories.py) ──────────────────────────
+    # ── Relevant memories (in-process, same connection) ───────────────────────
     try:
-        import subprocess
-        result = subprocess.run(
-            [sys.executable, str(SCRIPTS_DIR / "retrieve_memories.py"),
-             "--agent", agent_id, "--limit", "5"],
-            capture_output=True, text=True, timeout=5
-        )
-        if result.stdout.strip():
-            lines.append("\n## Relevant memories:")
-            for line in result.stdout.strip().split("\n")[:5]:
-                lines.append(f"  {line[:120]}")
+        from retrieve_memories import retrieve
+        memories = []
+        if semantic and query.strip():
+            from semantic_index import semantic_retrieve
+            try:
+                memories = semantic_retrieve(agent_id, query, limit=5, conn=conn)
+            except Exception as e:
+                print(f"[system2_think] WARNING: semantic retrieval failed: {e}", file=sys.stderr)
+        memories = memories or retrieve(agent_id, limit=5, conn=conn)
+        if memories:
+            top = max(m["score"] for m in memories)
+            scale = MEMORY_VALUE / top if top > 0 else 0.0
+            sections.append(("\n## Relevant memories:", [
+                {"text": f"  [{m['score']:.3f}] {m['content']}", "value": scale * max(m["score"], 0.0)}
+                for m in memories
+            ], ""))
     except Exception:
         pass  # Memory retrieval failure is non-fatal
 
     # ── Open proposals (for context, not for injection) ────────────────────────
+    items, empty = [], "  (none)"
     try:
         proposals = conn.execute(
             """SELECT title, content, author_agent_id, requires_review
@@ -160,32 +183,29 @@ def _build_rich_context(agent_id: str) -> str:
                ORDER BY created_at DESC
                LIMIT 3""",
         ).fetchall()
-        lines.append("\n## Open proposals (shared context):")
         for p in proposals:
-            title = str(p["title"] or "")[:80]
+            title = str(p["title"] or "")
             author = str(p["author_agent_id"] or "?")[:15]
-            lines.append(f"  - '{title}' by {author}")
-        if not proposals:
-            lines.append("  (none)")
+            items.append({"text": f"  - '{title}' by {author}", "value": PROPOSAL_VALUE})
     except Exception as e:
-        lines.append(f"  (proposal read error: {e})")
+        empty = f"  (proposal read error: {e})"
+    sections.append(("\n## Open proposals (shared context):", items, empty))
 
     # ── Unread messages (via validated read path) ─────────────────────────────
+    items, empty = [], "  (none)"
     try:
         import read_agent_messages as ram
         messages = ram.read_messages(to_agent=agent_id, unread_only=True, limit=3)
-        lines.append("\n## Unread messages:")
-        if messages:
-            for msg in messages:
-                content_preview = str(msg.get("sanitized_content") or msg.get("content") or "")[:80]
-                from_agent = str(msg.get("from_agent_id", "?"))[:15]
-                lines.append(f"  - from:{from_agent} {content_preview}")
-        else:
-            lines.append("  (none)")
+        for msg in messages or []:
+            content_preview = str(msg.get("sanitized_content") or msg.get("content") or "")
+            from_agent = str(msg.get("from_agent_id", "?"))[:15]
+            items.append({"text": f"  - from:{from_agent} {content_preview}", "value": MESSAGE_VALUE})
     except Exception as e:
-        lines.append(f"  (message read error: {e})")
+        empty = f"  (message read error: {e})"
+    sections.append(("\n## Unread messages:", items, empty))
 
     # ── Knowledge gaps ────────────────────────────────────────────────────────
+    items, empty = [], "  (none)"
     try:
         gaps = conn.execute(
             """SELECT description, domain, importance
@@ -195,21 +215,20 @@ def _build_rich_context(agent_id: str) -> str:
                LIMIT 3""",
             (agent_id,),
         ).fetchall()
-        lines.append("\n## Knowledge gaps:")
         for g in gaps:
-            desc = str(g["description"] or "").strip()[:100]
+            desc = str(g["description"] or "").strip()
             domain = str(g["domain"] or "").strip()[:20]
             imp = g["importance"] or 0.0
             if not desc:
                 desc = "(no description)"
-            lines.append(f"  - [{domain},imp={imp:.0f}] {desc}")
-        if not gaps:
-            lines.append("  (none)")
+            items.append({"text": f"  - [{domain},imp={imp:.0f}] {desc}", "value": float(imp)})
     except Exception as e:
-        lines.append(f"  (knowledge_gap read error: {e})")
+        empty = f"  (knowledge_gap read error: {e})"
+    sections.append(("\n## Knowledge gaps:", items, empty))
 
     conn.close()
-    return "\n".join(lines)
+    lines = pack_sections(sections, CONTEXT_TOKEN_BUDGET - estimate_tokens(header), max_item_tokens=ITEM_TOKENS)
+    return "\n".join([header] + lines)
 
 
 def _get_api_config() -> dict:
@@ -338,9 +357,11 @@ def _route_output(agent_id: str, action_json: dict) -> dict:
     return {"routed": False, "type": "unknown", "detail": f"unknown action type: {action_type}"}
 
 
-def run_system2_think(agent_id: str, reason: str, mock_output: str | None = None) -> dict:
+def run_system2_think(agent_id: str, reason: str, mock_output: str | None = None,
+                      semantic: bool = False) -> dict:
     """
-    Main entry point for System 2 deliberate reasoning.
+    Main entry point for System 2 deliberate reasoning. semantic picks
+    memories by similarity to the escalation reason.
 
     Returns:
         {
@@ -375,7 +396,7 @@ def run_system2_think(agent_id: str, reason: str, mock_output: str | None = None
         }
 
     # ── STEP 2: Build rich context (agent's OWN data only) ────────────────────
-    context = _build_rich_context(agent_id)
+    context = _build_rich_context(agent_id, reason, semantic)
 
     # ── STEP 3: Build deliberate reasoning prompt ─────────────────────────────
     prompt = f"""You are {agent_id}'s background cognitive process (System 2 — deliberate reasoning).
@@ -500,12 +521,14 @@ def main():
         default=None,
         help='Mock JSON output from AI (for testing). E.g. \'{"type":"knowledge_gap",...}\'',
     )
+    parser.add_argument("--semantic", action="store_true",
+                        help="Rank memories by local vector similarity to the reason (semantic_index.py)")
     args = parser.parse_args()
 
     print(f"[system2_think] Starting deliberate reasoning for agent='{args.agent}'")
     print(f"[system2_think] Reason: {args.reason}")
 
-    result = run_system2_think(args.agent, args.reason, mock_output=args.mock_output)
+    result = run_system2_think(args.agent, args.reason, mock_output=args.mock_output, semantic=args.semantic)
 
     if result.get("cap_hit"):
         print("[system2_think] ❌ DAILY_CAP_REACHED — not executed")
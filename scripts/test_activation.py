@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""Tests for the batched ACT-R activation engine in activation-scorer.py.
+
+Runs against a throwaway SQLite DB — never touches vector.db.
+"""
+
+import importlib.util
+import sqlite3
+import sys
+import tempfile
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+SCRIPTS = Path(__file__).parent
+_spec = importlib.util.spec_from_file_location("activation_scorer", SCRIPTS / "activation-scorer.py")
+scorer = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(scorer)
+
+PASS = 0
+FAIL = 0
+
+
+def rec(test, ok, detail):
+    global PASS, FAIL
+    if ok:
+        PASS += 1
+        print(f"✅ [{test}] PASS - {detail}")
+    else:
+        FAIL += 1
+        print(f"❌ [{test}] FAIL - {detail}")
+
+
+class _NoNoise:
+    @staticmethod
+    def gauss(mu, sigma):
+        return 0.0
+
+
+def make_db() -> tuple[sqlite3.Connection, Path]:
+    path = Path(tempfile.gettempdir()) / f"activation_{uuid.uuid4().hex[:10]}.db"
+    conn = sqlite3.connect(str(path))
+    for table in ("memory_entries", "beliefs"):
+        conn.execute(
+            f"""CREATE TABLE {table} (
+                  id TEXT PRIMARY KEY, content TEXT, status TEXT, created_at TEXT,
+                  last_accessed TEXT, access_count INTEGER, decay_rate REAL, importance REAL,
+                  confidence REAL, activation_score REAL, last_activation_calc TEXT)"""
+        )
+    return conn, path
+
+
+def sample_rows(now: datetime) -> list[tuple]:
+    ago = lambda **kw: (now - timedelta(**kw)).isoformat()
+    return [
+        ("r-never", "never accessed", "active", ago(days=3), None, 0, 0.5, 0.5, 0.5),
+        ("r-once", "accessed once", "active", ago(days=9), ago(hours=2), 1, 0.3, 0.75, 0.8),
+        ("r-many", "hot belief", "active", ago(days=40), ago(minutes=5), 37, 0.2, 0.95, 0.9),
+        ("r-flat", "zero span", "active", ago(days=1), ago(days=1), 4, 0.7, 0.35, 0.6),
+        ("r-naive", "sqlite default stamp", "active", (now - timedelta(days=2)).strftime("%Y-%m-%d %H:%M:%S"),
+         None, 2, None, None, None),
+        ("r-bad", "unparseable stamp", "active", "garbage", "garbage", 3, 1.0, 0.15, 0.5),
+        ("r-prov", "provisional stays untouched", "provisional", ago(days=1), None, 0, 0.5, 0.5, 0.5),
+    ]
+
+
+def test_1_vectorized_matches_scalar():
+    now = datetime.now(timezone.utc)
+    rows = sample_rows(now)
+    orig_random = scorer.random
+    scorer.random = _NoNoise
+    try:
+        expected = [scorer.compute_activation(now, *r[3:]) for r in rows]
+    finally:
+        scorer.random = orig_random
+
+    np = scorer.np
+    conn = sqlite3.connect(":memory:")
+    epochs = [
+        conn.execute(f"SELECT {scorer.EPOCH_SQL.format(col='?')}, {scorer.EPOCH_SQL.format(col='?')}",
+                     (r[3], r[4])).fetchone()
+        for r in rows
+    ]
+    conn.close()
+    got = scorer.score_arrays(
+        now.timestamp(),
+        scorer._column([e[0] for e in epochs], np.nan),
+        scorer._column([e[1] for e in epochs], np.nan),
+        scorer._column([r[5] for r in rows], 0.0),
+        scorer._column([r[6] for r in rows], 0.5),
+        scorer._column([r[7] for r in rows], 0.5),
+        scorer._column([r[8] for r in rows], 0.5),
+        noise_sd=0.0,
+    )
+    worst = max(abs(a - b) for a, b in zip(expected, got))
+    rec("T1", worst < 1e-4, f"max |vectorized - scalar| = {worst:.2e}")
+
+
+def test_2_score_table_writes_active_rows_only():
+    conn, path = make_db()
+    try:
+        now = datetime.now(timezone.utc)
+        conn.executemany(
+            "INSERT INTO beliefs VALUES (?,?,?,?,?,?,?,?,?,NULL,NULL)", sample_rows(now)
+        )
+        conn.commit()
+        scored = scorer.score_table(conn, "beliefs", "id")
+        written = conn.execute(
+            "SELECT COUNT(*) FROM beliefs WHERE activation_score IS NOT NULL AND last_activation_calc IS NOT NULL"
+        ).fetchone()[0]
+        prov = conn.execute("SELECT activation_score FROM beliefs WHERE id='r-prov'").fetchone()[0]
+        ordered = all(scored[i][2] >= scored[i + 1][2] for i in range(len(scored) - 1))
+        ok = len(scored) == 6 and written == 6 and prov is None and ordered
+        rec("T2", ok, f"scored={len(scored)} written={written} provisional={prov} sorted={ordered}")
+    finally:
+        conn.close()
+        path.unlink(missing_ok=True)
+
+
+def test_3_chunked_write_back():
+    conn, path = make_db()
+    try:
+        now = datetime.now(timezone.utc)
+        rows = [
+            (f"m{i}", f"memory {i}", "active", (now - timedelta(hours=i + 1)).isoformat(),
+             None, i % 5, 0.5, 0.5, 0.5)
+            for i in range(2_345)
+        ]
+        conn.executemany("INSERT INTO memory_entries VALUES (?,?,?,?,?,?,?,?,?,NULL,NULL)", rows)
+        conn.commit()
+        orig_chunk = scorer.WRITE_CHUNK
+        scorer.WRITE_CHUNK = 500
+        try:
+            scored = scorer.score_table(conn, "memory_entries", "id")
+        finally:
+            scorer.WRITE_CHUNK = orig_chunk
+        missing = conn.execute(
+            "SELECT COUNT(*) FROM memory_entries WHERE activation_score IS NULL"
+        ).fetchone()[0]
+        rec("T3", len(scored) == 2_345 and missing == 0, f"scored={len(scored)} unscored={missing}")
+    finally:
+        conn.close()
+        path.unlink(missing_ok=True)
+
+
+def test_4_hybrid_tracks_exact_sum():
+    """The Petrov hybrid must stay well inside the NOISE_SD jitter of the exact sum."""
+    now = datetime.now(timezone.utc)
+    worst, where = 0.0, None
+    for n in (0, 1, 2, 3, 4, 10, 37, 200, 1_000):
+        for d in (0.01, 0.1, 0.3, 0.5, 1.0, 1.5, 2.0):
+            for span_h, last_h in ((1, 0.001), (24, 0.1), (960, 0.08), (4320, 720), (2, 1)):
+                created = (now - timedelta(hours=span_h + last_h)).isoformat()
+                last = (now - timedelta(hours=last_h)).isoformat()
+                exact = scorer.exact_base_level(now, created, last, n, d)
+                hybrid = scorer.hybrid_base_level(now, created, last, n, d)
+                if abs(exact - hybrid) > worst:
+                    worst, where = abs(exact - hybrid), (n, d, span_h, last_h)
+    rec("T4", worst < 0.01, f"max |hybrid - exact| base level = {worst:.2e} at (n, d, span_h, last_h)={where}")
+
+
+def test_5_vectorized_exact_and_hybrid():
+    np = scorer.np
+    rng = np.random.default_rng(3)
+    now_ts = datetime.now(timezone.utc).timestamp()
+    n = 5_000
+    created = now_ts - rng.uniform(3600, 365 * 86400, n)
+    last = created + (now_ts - created) * rng.uniform(0, 1, n)
+    cols = (created, last, rng.integers(0, 300, n).astype(np.float64), rng.uniform(0.05, 1.5, n),
+            np.full(n, 0.5), np.full(n, 0.5))
+    exact = scorer.score_arrays(now_ts, *cols, noise_sd=0.0, exact=True)
+    hybrid = scorer.score_arrays(now_ts, *cols, noise_sd=0.0)
+    worst = float(np.max(np.abs(exact - hybrid)))
+    rec("T5", worst < 0.01, f"max |hybrid - exact| over {n} rows = {worst:.2e}")
+
+
+def test_6_incremental_rescoring():
+    conn, path = make_db()
+    try:
+        now = datetime.now(timezone.utc)
+        stamp = lambda dt: dt.strftime("%Y-%m-%d %H:%M:%S")
+        ago = lambda **kw: stamp(now - timedelta(**kw))
+        rows = [
+            # id, content, status, created, last_accessed, n, d, imp, conf
+            ("b-cold", "old, untouched", "active", ago(days=200), ago(days=100), 3, 0.5, 0.5, 0.5),
+            ("b-touched", "accessed after calc", "active", ago(days=30), ago(days=20), 2, 0.5, 0.5, 0.5),
+            ("b-hot", "fast decay, recent", "active", ago(days=2), ago(minutes=10), 5, 1.0, 0.5, 0.5),
+            ("b-new", "never scored", "active", ago(days=1), None, 0, 0.5, 0.5, 0.5),
+            ("b-prov", "provisional", "provisional", ago(days=1), None, 0, 0.5, 0.5, 0.5),
+        ]
+        conn.executemany("INSERT INTO beliefs VALUES (?,?,?,?,?,?,?,?,?,NULL,NULL)", rows)
+        conn.commit()
+
+        first = {r[0] for r in scorer.score_table(conn, "beliefs", "id", incremental=True)}
+        again = scorer.score_table(conn, "beliefs", "id", incremental=True)
+
+        # Simulate the passage of time: last calc an hour ago for everyone,
+        # and one row accessed since then.
+        conn.execute("UPDATE beliefs SET last_activation_calc=? WHERE status='active'", (ago(hours=1),))
+        conn.execute("UPDATE beliefs SET last_accessed=?, access_count=3 WHERE id='b-touched'", (ago(minutes=1),))
+        conn.execute("UPDATE beliefs SET last_accessed=? WHERE id='b-hot'", (ago(minutes=70),))
+        conn.commit()
+        dirty = {r[0] for r in scorer.score_table(conn, "beliefs", "id", incremental=True)}
+        # The report after an incremental pass ranks every active row, not just the rescored ones.
+        ranked = scorer.stored_ranking(conn, "beliefs", "id")
+        scores = [r[2] for r in ranked]
+
+        ok = (first == {"b-cold", "b-touched", "b-hot", "b-new"} and not again
+              and dirty == {"b-touched", "b-hot"}
+              and {r[0] for r in ranked} == first and scores == sorted(scores, reverse=True))
+        rec("T6", ok, f"first={sorted(first)} rerun={len(again)} after 1h={sorted(dirty)} "
+                      f"report ranks {len(ranked)} rows")
+    finally:
+        conn.close()
+        path.unlink(missing_ok=True)
+
+
+def main():
+    if scorer.np is None:
+        print("numpy not installed — vectorized engine unavailable, skipping")
+        return 0
+    test_1_vectorized_matches_scalar()
+    test_2_score_table_writes_active_rows_only()
+    test_3_chunked_write_back()
+    test_4_hybrid_tracks_exact_sum()
+    test_5_vectorized_exact_and_hybrid()
+    test_6_incremental_rescoring()
+
+    total = PASS + FAIL
+    print(f"\nTOTAL: {total}/6 | PASS={PASS} | FAIL={FAIL}")
+    return 1 if FAIL else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -130,7 +130,7 @@ def test_7_spawn_pm_end_to_end_contains_memories_section():
 def test_8_attack_expand_returns_empty_spawn_fallback_proceeds():
     original = spawn_pm.expand_keywords
     try:
-        spawn_pm.expand_keywords = lambda agent, task: []
+        spawn_pm.expand_keywords = lambda agent, task, **kw: []
         ctx = spawn_pm.build_cognitive_context('forge', 'fix jwt auth bearer token', 'COG-013-T8', DB_PATH)
         ok = '<cognitive-context' in ctx and '<memories>' in ctx
         rec('T8', ok, 'spawn_pm proceeds when expansion is empty list')
@@ -0,0 +1,843 @@
+#!/usr/bin/env python3
+"""Tests for the in-process retrieval API (retrieve_memories.retrieve) and its callers.
+
+Runs against a throwaway SQLite DB — never touches vector.db.
+"""
+
+import json
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+SCRIPTS = Path(__file__).parent
+sys.path.insert(0, str(SCRIPTS))
+
+import ann_index
+import build_pm_cognition_block
+import context_packer
+import expand_retrieval_query
+import local_keywords
+import migrate_schema
+import prewarm_contexts
+import retrieval_cache
+import retrieve_memories
+import semantic_index
+import shared_sections
+import spawn_pm
+import system2_think
+
+PASS = 0
+FAIL = 0
+
+
+def rec(test, ok, detail):
+    global PASS, FAIL
+    if ok:
+        PASS += 1
+        print(f"✅ [{test}] PASS - {detail}")
+    else:
+        FAIL += 1
+        print(f"❌ [{test}] FAIL - {detail}")
+
+
+def make_db() -> Path:
+    path = Path(tempfile.gettempdir()) / f"retrieval_{uuid.uuid4().hex[:10]}.db"
+    conn = sqlite3.connect(str(path))
+    conn.execute(
+        """CREATE TABLE memories (
+             id TEXT PRIMARY KEY, agent_id TEXT NOT NULL, content TEXT NOT NULL,
+             importance REAL DEFAULT 0.5, decay_rate REAL DEFAULT 0.1, access_count INTEGER DEFAULT 0,
+             last_accessed TEXT, activation_score REAL DEFAULT 0.0, embedding BLOB,
+             source TEXT, created_at TEXT, scope TEXT)"""
+    )
+    now = datetime.now(timezone.utc)
+    ago = lambda days: (now - timedelta(days=days)).isoformat()
+    conn.executemany(
+        "INSERT INTO memories (id, agent_id, content, importance, decay_rate, access_count, last_accessed) "
+        "VALUES (?,?,?,?,?,?,?)",
+        [
+            ("m1", "forge", "JWT RS256 keys rotate every 90 days", 0.9, 0.1, 5, ago(1)),
+            ("m2", "forge", "Use TypeScript strict mode for all new plugins", 0.7, 0.1, 2, ago(3)),
+            ("m3", "forge", "Old note about auth cookies", 0.3, 0.1, 1, ago(60)),
+            ("m4", "__shared__", "Shared: every API needs bearer auth", 0.8, 0.1, 3, ago(2)),
+            ("m5", "ghost", "ghost private: auth_secret=xyz", 0.99, 0.1, 9, ago(0)),
+        ],
+    )
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_1_structured_results_and_isolation(db):
+    res = retrieve_memories.retrieve("forge", limit=10, db_path=db)
+    ids = [r["id"] for r in res]
+    ordered = all(res[i]["score"] >= res[i + 1]["score"] for i in range(len(res) - 1))
+    ok = (set(ids) == {"m1", "m2", "m3", "m4"} and ordered
+          and all(set(r) == {"id", "content", "score"} for r in res))
+    rec("T1", ok, f"ids={ids} sorted={ordered} (ghost excluded)")
+
+
+def test_2_strict_and_lenient_filters(db):
+    strict = retrieve_memories.retrieve("forge", ["zzzz_nomatch"], 5, db_path=db)
+    hits = [r["id"] for r in retrieve_memories.retrieve("forge", ["jwt", "bearer"], 5, db_path=db)]
+    lenient = retrieve_memories.retrieve("forge", None, 5, query="zzzz_nomatch", db_path=db)
+    ok = strict == [] and set(hits) == {"m1", "m4"} and len(lenient) == 4
+    rec("T2", ok, f"strict-miss={len(strict)} hits={hits} lenient-miss={len(lenient)}")
+
+
+def test_3_cli_wraps_retrieve(db):
+    r = subprocess.run(
+        [sys.executable, str(SCRIPTS / "retrieve_memories.py"), "--agent", "forge",
+         "--queries", "jwt", "auth", "--limit", "3", "--db", str(db)],
+        capture_output=True, text=True, timeout=30,
+    )
+    expected = retrieve_memories.format_results(
+        retrieve_memories.retrieve("forge", ["jwt", "auth"], 3, db_path=db)
+    )
+    rec("T3", r.returncode == 0 and r.stdout.strip() == expected,
+        f"rc={r.returncode} lines={len(r.stdout.strip().splitlines())}")
+
+
+def test_4_shared_connection_left_open(db):
+    conn = sqlite3.connect(str(db))
+    conn.row_factory = sqlite3.Row
+    try:
+        first = retrieve_memories.retrieve("forge", ["typescript"], 5, conn=conn)
+        still_open = conn.execute("SELECT COUNT(*) FROM memories").fetchone()[0] == 5
+        rec("T4", [r["id"] for r in first] == ["m2"] and still_open,
+            f"row_factory conn ok, left open={still_open}")
+    finally:
+        conn.close()
+
+
+def test_5_spawn_pm_runs_in_process(db):
+    orig_expand, orig_run = spawn_pm.expand_keywords, spawn_pm.subprocess.run
+    calls = []
+    spawn_pm.expand_keywords = lambda agent, task, **kw: ["rs256"]
+    spawn_pm.subprocess.run = lambda *a, **kw: calls.append(a) or orig_run(*a, **kw)
+    try:
+        conn = sqlite3.connect(str(db))
+        try:
+            out = spawn_pm.get_memories("forge", "rotate signing keys", conn=conn)
+            fallback = spawn_pm.get_memories("forge", "nothing matches zzzz", conn=conn)
+        finally:
+            conn.close()
+    finally:
+        spawn_pm.expand_keywords, spawn_pm.subprocess.run = orig_expand, orig_run
+    ok = "RS256" in out and "[" in fallback and not calls
+    rec("T5", ok, f"subprocess calls={len(calls)} first={out.splitlines()[:1]}")
+
+
+def test_6_fts_migration_and_triggers(db):
+    conn = sqlite3.connect(str(db))
+    try:
+        scan = retrieve_memories.retrieve("forge", ["jwt", "bearer", "typescript"], 10, conn=conn)
+        first = migrate_schema.migrate_fts(conn)
+        again = migrate_schema.migrate_fts(conn)
+        fts = retrieve_memories.retrieve("forge", ["jwt", "bearer", "typescript"], 10, conn=conn)
+        same = [r["id"] for r in fts] == [r["id"] for r in scan]
+
+        conn.execute("INSERT INTO memories (id, agent_id, content) VALUES ('m6', 'forge', 'Kafka consumer lag alert')")
+        conn.execute("UPDATE memories SET content='Postgres vacuum schedule' WHERE id='m2'")
+        conn.execute("DELETE FROM memories WHERE id='m3'")
+        conn.commit()
+        hit = lambda term: [r["id"] for r in retrieve_memories.retrieve("forge", [term], 5, conn=conn)]
+        synced = (hit("kafka") == ["m6"] and hit("typescript") == [] and hit("postgres") == ["m2"]
+                  and hit("cookies") == [])
+        prefix = hit("vacu") == ["m2"]
+        ok = first == ["memories_fts"] and again == [] and same and synced and prefix
+        rec("T6", ok, f"created={first} rerun={again} fts==scan={same} triggers={synced} prefix={prefix}")
+    finally:
+        conn.close()
+
+
+class _NoMathConnection(sqlite3.Connection):
+    def execute(self, sql, *args):
+        if "exp(" in sql or "ln(" in sql:
+            raise sqlite3.OperationalError("no such function: exp")
+        return super().execute(sql, *args)
+
+
+def test_7_sql_scores_match_python(db):
+    conn = sqlite3.connect(str(db))
+    try:
+        conn.execute("INSERT INTO memories (id, agent_id, content, importance, decay_rate, access_count, last_accessed) "
+                     "VALUES ('m7', 'forge', 'unparseable stamp', 0.6, 0.3, 4, 'garbage')")
+        rows = {r[0]: r[1:] for r in conn.execute(
+            "SELECT id, importance, decay_rate, access_count, last_accessed FROM memories "
+            "WHERE agent_id IN ('forge', '__shared__')")}
+        got = retrieve_memories.retrieve("forge", limit=50, conn=conn)
+        now = datetime.now(timezone.utc)
+        worst = max(abs(r["score"] - retrieve_memories.act_r_score(*rows[r["id"]], now=now)) for r in got)
+
+        # A fresh connection that reports no exp()/ln(), as on SQLite builds without math functions.
+        conn.commit()
+        bare = sqlite3.connect(str(db), factory=_NoMathConnection)
+        try:
+            udf = retrieve_memories.retrieve("forge", limit=50, conn=bare, use_cache=False)
+        finally:
+            bare.close()
+        now = datetime.now(timezone.utc)
+        worst_udf = max(abs(r["score"] - retrieve_memories.act_r_score(*rows[r["id"]], now=now)) for r in udf)
+        ok = len(got) == len(rows) and len(udf) == len(rows) and worst < 1e-6 and worst_udf < 1e-6
+        rec("T7", ok, f"rows={len(got)} max |sql - python| = {worst:.1e}, udf = {worst_udf:.1e}")
+    finally:
+        conn.execute("DELETE FROM memories WHERE id='m7'")
+        conn.commit()
+        conn.close()
+
+
+def test_8_local_semantic_index(db):
+    if semantic_index.np is None:
+        rec("T8", True, "numpy not installed — semantic index skipped")
+        return
+    with tempfile.TemporaryDirectory() as root:
+        conn = sqlite3.connect(str(db))
+        try:
+            top = semantic_index.semantic_retrieve("forge", "rotate jwt keys", 3, conn=conn, root=root)
+            idx = semantic_index.SemanticIndex(root, "forge")
+            built = idx.count
+            conn.execute("INSERT INTO memories (id, agent_id, content) "
+                         "VALUES ('m8', 'forge', 'Grafana dashboard for consumer lag')")
+            conn.commit()
+            again = semantic_index.semantic_retrieve("forge", "grafana consumer lag dashboard", 1, conn=conn, root=root)
+            appended = semantic_index.SemanticIndex(root, "forge").count
+            shared = [r["id"] for r in semantic_index.semantic_retrieve("forge", "bearer auth api", 1,
+                                                                       conn=conn, root=root)]
+            # Same length, same rowid: only the change stamp and the row CRC can tell.
+            conn.execute("UPDATE memories SET content='Grafana dashboard for producer lag' WHERE id='m8'")
+            conn.commit()
+            edited = semantic_index.semantic_retrieve("forge", "producer lag", 1, conn=conn, root=root)
+
+            # Opt-in consumers, on a copy so the index sits next to its own database.
+            wired = Path(root) / "wired" / "vector.db"
+            wired.parent.mkdir()
+            copy = sqlite3.connect(str(wired))
+            conn.backup(copy)
+            timings = {}
+            spawned = spawn_pm.get_memories("forge", "producer lag dashboard", conn=copy, db_path=wired,
+                                            timings=timings, semantic=True)
+            orig_s2_db = system2_think.DB_PATH
+            system2_think.DB_PATH = wired
+            try:
+                s2_context = system2_think._build_rich_context("forge", "producer lag dashboard", semantic=True)
+            finally:
+                system2_think.DB_PATH = orig_s2_db
+            copy.close()
+        finally:
+            conn.execute("UPDATE memories SET content='Grafana dashboard for consumer lag' WHERE id='m8'")
+            conn.commit()
+            conn.close()
+    ok = (top and top[0]["id"] == "m1" and again and again[0]["id"] == "m8"
+          and appended == built + 1 and shared == ["m4"] and edited and "producer" in edited[0]["content"]
+          and "producer lag" in spawned.split("\n")[0] and "semantic" in timings and "expand" not in timings
+          and "producer lag" in s2_context)
+    rec("T8", ok, f"top={[r['id'] for r in top]} rows {built}→{appended} after insert, shared={shared}, "
+                  f"same-length edit→{edited and edited[0]['content']}, spawn_pm/system2 wired="
+                  f"{'producer lag' in spawned}/{'producer lag' in s2_context}")
+
+
+def test_9_ann_index_tracks_beliefs():
+    np = ann_index.np
+    if np is None:
+        rec("T9", True, "numpy not installed — ANN index skipped")
+        return
+    rng = np.random.default_rng(2)
+    vecs = rng.standard_normal((1_500, 32)).astype(np.float32)
+    with tempfile.TemporaryDirectory() as root:
+        conn = sqlite3.connect(":memory:")
+        conn.execute("CREATE TABLE beliefs (id TEXT PRIMARY KEY, agent_id TEXT, status TEXT, content TEXT, embedding BLOB)")
+        conn.executemany("INSERT INTO beliefs VALUES (?,?,?,?,?)",
+                         [(f"b{i}", "forge", "active", f"belief {i}", vecs[i].tobytes()) for i in range(1_400)]
+                         + [("g0", "ghost", "active", "other agent", vecs[0].tobytes())])
+        index = ann_index.sync_agent(conn, "forge", root)
+        exact = index.search(vecs[7], 5, nprobe=index.meta["nlist"])
+        approx = index.search(vecs[7], 5, nprobe=8)
+
+        conn.executemany("INSERT INTO beliefs VALUES (?,?,?,?,?)",
+                         [(f"b{i}", "forge", "active", f"belief {i}", vecs[i].tobytes()) for i in range(1_400, 1_450)])
+        conn.execute("UPDATE beliefs SET status='archived' WHERE id='b7'")
+        index = ann_index.sync_agent(conn, "forge", root)
+        after_insert = index.search(vecs[1_420], 1)
+        after_archive = [rid for rid, _ in index.search(vecs[7], 5, nprobe=index.meta["nlist"])]
+        # Re-embedding keeps count, rowids and BLOB length; the stamp and the row CRC catch it.
+        conn.execute("UPDATE beliefs SET embedding=? WHERE id='b5'", (vecs[1_499].tobytes(),))
+        index = ann_index.sync_agent(conn, "forge", root)
+        reembedded = index.search(vecs[1_499], 1, nprobe=index.meta["nlist"])[0][0]
+        old_vector = [rid for rid, _ in index.search(vecs[5], 3, nprobe=index.meta["nlist"])]
+        conn.close()
+
+        # Without an explicit root the index sits next to the connection's own database.
+        db = Path(root) / "other" / "vector.db"
+        db.parent.mkdir()
+        other = sqlite3.connect(str(db))
+        other.execute("CREATE TABLE beliefs (id TEXT PRIMARY KEY, agent_id TEXT, status TEXT, content TEXT, embedding BLOB)")
+        other.executemany("INSERT INTO beliefs VALUES (?,?,?,?,?)",
+                          [(f"o{i}", "forge", "active", f"other {i}", vecs[i].tobytes()) for i in range(20)])
+        found = ann_index.search_beliefs(other, "forge", vecs[3], 1)
+        other.close()
+        beside = (db.parent / "ann" / "forge" / "meta.json").exists()
+    ok = (index.meta["nlist"] > 1 and exact[0][0] == "b7" and approx[0][0] == "b7"
+          and index.count - index.meta["built"] == 51 and after_insert[0][0] == "b1420"
+          and "b7" not in after_archive and "g0" not in after_archive
+          and reembedded == "b5" and "b5" not in old_vector and found[0][0] == "o3" and beside)
+    rec("T9", ok, f"nlist={index.meta['nlist']} tail={index.count - index.meta['built']} "
+                  f"dead={index.meta['dead']} insert→{after_insert[0][0]} re-embedded→{reembedded} "
+                  f"root beside db={beside}")
+
+
+def test_10_bm25_activation_fusion():
+    path = make_db()
+    conn = sqlite3.connect(str(path))
+    try:
+        now = datetime.now(timezone.utc).isoformat()
+        conn.execute("DELETE FROM memories")
+        conn.executemany(
+            "INSERT INTO memories (id, agent_id, content, importance, decay_rate, access_count, last_accessed) "
+            "VALUES (?,?,?,?,?,?,?)",
+            [("all", "forge", "kafka consumer lag alert threshold tuned to 30s", 0.4, 0.1, 1, now),
+             ("one", "forge", "kafka cluster upgrade notes", 0.95, 0.1, 9, now),
+             ("off", "forge", "postgres vacuum schedule", 0.99, 0.1, 9, now)]
+            + [(f"pad{i}", "forge", f"filler note {i} about deploys", 0.5, 0.1, 1, now) for i in range(20)],
+        )
+        conn.commit()
+        terms = ["kafka", "consumer", "lag", "threshold"]
+        ids = lambda **kw: [r["id"] for r in retrieve_memories.retrieve("forge", terms, 5, conn=conn, **kw)]
+        scan = {f: ids(fusion=f) for f in ("linear", "rrf", "none")}
+        migrate_schema.migrate_fts(conn)
+        fts = {f: ids(fusion=f) for f in ("linear", "rrf", "none")}
+        orig_floor = retrieve_memories.MIN_RELEVANCE
+        retrieve_memories.MIN_RELEVANCE = 0.5
+        try:
+            pruned = ids(fusion="linear", use_cache=False)
+        finally:
+            retrieve_memories.MIN_RELEVANCE = orig_floor
+        ok = (all(r[0] == "all" for r in (scan["linear"], scan["rrf"], fts["linear"], fts["rrf"]))
+              and scan["none"][0] == "one" == fts["none"][0]
+              and "off" not in scan["none"] + fts["linear"] and pruned == ["all"])
+        rec("T10", ok, f"scan={scan} fts={fts} pruned={pruned}")
+    finally:
+        conn.close()
+        path.unlink(missing_ok=True)
+
+
+def test_11_result_cache_versions():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "vector.db"
+        make_db().replace(path)
+        conn = sqlite3.connect(str(path))
+        try:
+            migrate_schema.migrate_change_counters(conn)
+            cache = retrieval_cache.ResultCache(Path(tmp) / "retrieval_cache.db")
+            calls = []
+            lookup = lambda: cache.cached(conn, cache.make_key("t", "forge"), ("memories",),
+                                          lambda: calls.append(1) or len(calls))
+            first, second = lookup(), lookup()
+            conn.execute("UPDATE memories SET activation_score = 1.0")  # not a tracked column
+            third = lookup()
+            conn.execute("INSERT INTO memories (id, agent_id, content) VALUES ('m9', 'forge', 'new')")
+            conn.commit()
+            fourth = lookup()
+            fresh = retrieval_cache.ResultCache(Path(tmp) / "retrieval_cache.db")
+            from_disk = fresh.cached(conn, cache.make_key("t", "forge"), ("memories",), lambda: -1)
+            ok = ((first, second, third, fourth, from_disk) == (1, 1, 1, 2, 2)
+                  and cache.counts["hits"] == 2 and cache.counts["misses"] == 2
+                  and fresh.counts["disk_hits"] == 1)
+
+            # Hits are counted in memory only; the sidecar totals catch up on close().
+            side = sqlite3.connect(str(Path(tmp) / "retrieval_cache.db"))
+            disk_hits = lambda: dict(side.execute("SELECT name, n FROM cache_stats")).get("hits", 0)
+            before = disk_hits()
+            lookup()
+            unflushed = disk_hits() == before
+            cache.close()
+            flushed = disk_hits() == before + 1
+            side.close()
+
+            # A caller mutating its result does not change what the next hit returns.
+            rows = lambda: fresh.cached(conn, fresh.make_key("rows", "forge"), ("memories",),
+                                        lambda: [{"id": "m1", "score": 1.0}])
+            mine = rows()
+            mine[0]["score"] = -1.0
+            mine.append({"id": "junk"})
+            isolated = rows() == [{"id": "m1", "score": 1.0}]
+            fresh.close()
+            ok = ok and unflushed and flushed and isolated
+            rec("T11", ok, f"values={[first, second, third, fourth, from_disk]} "
+                           f"stats={cache.stats()} disk={fresh.counts['disk_hits']} "
+                           f"hit write deferred={unflushed} flushed on close={flushed} copies={isolated}")
+        finally:
+            conn.close()
+
+
+def test_12_expansion_cache_near_duplicates():
+    erq = expand_retrieval_query
+    path = make_db()
+    conn = sqlite3.connect(str(path))
+    conn.execute("CREATE TABLE audit_log (id INTEGER PRIMARY KEY, ts TEXT, agent TEXT, action TEXT, detail TEXT)")
+    conn.commit()
+    calls = []
+
+    def fake_run(cmd, **kw):
+        calls.append(cmd)
+        text = json.dumps([f"kw{len(calls)}", "jwt"])
+        return subprocess.CompletedProcess(cmd, 0, json.dumps({"result": {"payloads": [{"text": text}]}}), "")
+
+    orig_db, orig_run = erq.DB_PATH, erq.subprocess.run
+    erq.DB_PATH, erq.subprocess.run = path, fake_run
+    try:
+        task = "fix JWT authentication bug in gateway login flow for forge api"
+        first = erq.expand_retrieval_query(task, "forge")
+        exact = erq.expand_retrieval_query("Fix JWT authentication bug in gateway login flow for forge API!", "forge")
+        near = erq.expand_retrieval_query(task.replace("in gateway", "in the gateway"), "forge")
+        other_agent = erq.expand_retrieval_query(task, "ghost")
+        different = erq.expand_retrieval_query("rotate kafka consumer credentials", "forge")
+        modes = [r[0].split()[1] for r in conn.execute(
+            "SELECT detail FROM audit_log WHERE action='query_expansion' ORDER BY id")]
+        ok = (first == exact == near == ["kw1", "jwt"] and other_agent == ["kw2", "jwt"]
+              and different == ["kw3", "jwt"] and len(calls) == 3
+              and modes.count("mode=cache_hit") == 2 and modes.count("mode=cache_miss") == 3)
+        rec("T12", ok, f"llm calls={len(calls)} near={near} audit={modes}")
+    finally:
+        erq.DB_PATH, erq.subprocess.run = orig_db, orig_run
+        conn.close()
+        path.unlink(missing_ok=True)
+
+
+def test_13_local_keyword_tier_and_budget():
+    erq = expand_retrieval_query
+    path = make_db()
+    conn = sqlite3.connect(str(path))
+    conn.execute("CREATE TABLE audit_log (id INTEGER PRIMARY KEY, ts TEXT, agent TEXT, action TEXT, detail TEXT)")
+    conn.commit()
+    child = lambda code: (lambda task, agent: subprocess.Popen(
+        [sys.executable, "-c", code], stdout=subprocess.PIPE, text=True))
+    orig_db, orig_start, orig_ask, orig_popen = erq.DB_PATH, erq._start_refresh, erq._ask_agent, erq.subprocess.Popen
+    popens = []
+    erq.DB_PATH = path
+    try:
+        task = "Fix the JWT signing key rotation issue for the gateway"
+        local = local_keywords.extract_keywords(conn, "forge", task)
+        conn.execute("INSERT INTO memories (id, agent_id, content) VALUES ('m9', 'forge', 'gateway signing gateway')")
+        conn.commit()
+        appended = local_keywords.refresh_stats(conn, "forge")
+        gateway_df = conn.execute("SELECT df FROM keyword_df WHERE agent_id='forge' AND term='gateway'").fetchone()
+
+        # In process: the LLM is asked on a thread, never from a child interpreter.
+        erq.subprocess.Popen = lambda *a, **kw: popens.append(a) or orig_popen(*a, **kw)
+        erq._ask_agent = lambda prompt: time.sleep(1) or '["late"]'
+        t0 = time.perf_counter()
+        slow = erq.expand_retrieval_query(task, "forge", use_cache=False, budget_s=0.3)
+        slow_s = time.perf_counter() - t0
+        erq._ask_agent = lambda prompt: '["from-llm"]'
+        fast = erq.expand_retrieval_query(task, "forge", use_cache=False, budget_s=5)
+        erq.subprocess.Popen = orig_popen
+        # A long-lived caller joins the over-budget thread, so its answer reaches the cache.
+        running = erq.join_refreshes(5)
+        cache = erq._cache_conn()
+        late = erq.cache_lookup(cache, task, "forge")
+        cache.close()
+
+        erq._start_refresh = child("import time; time.sleep(3)")
+        t0 = time.perf_counter()
+        slow_child = erq.expand_retrieval_query(task, "forge", use_cache=False, budget_s=0.3, isolate=True)
+        slow_child_s = time.perf_counter() - t0
+        erq._start_refresh = child("print('[\"from-child\"]')")
+        fast_child = erq.expand_retrieval_query(task, "forge", use_cache=False, budget_s=5, isolate=True)
+        # A single spawn is short-lived: its expansion goes to the detached child.
+        detached = spawn_pm.expand_keywords("forge", "Audit the webhook retry queue", detach=True)
+        logged = conn.execute("SELECT COUNT(*) FROM audit_log WHERE detail LIKE '%mode=budget_local%'").fetchone()[0]
+        ok = (local[0] == "jwt" and "fix" not in local and "issue" not in local
+              and appended == 4 and gateway_df == (1,)
+              and slow[0] == "jwt signing" and slow_s < 1.5 and fast == ["from-llm"] and not popens
+              and running == 0 and late is not None and late[0] == ["late"]
+              and slow_child[0] == "jwt signing" and slow_child_s < 1.5 and fast_child == ["from-child"]
+              and detached == ["from-child"] and logged == 2)
+        rec("T13", ok, f"local={local} budgeted={slow[:2]} in {slow_s:.2f}s fast={fast} child popens={len(popens)} "
+                       f"joined late={late and late[0]} isolated={slow_child[:1]}/{fast_child} detached={detached} "
+                       f"df(gateway)={gateway_df}")
+    finally:
+        erq.DB_PATH, erq._start_refresh, erq._ask_agent, erq.subprocess.Popen = \
+            orig_db, orig_start, orig_ask, orig_popen
+        conn.close()
+        path.unlink(missing_ok=True)
+
+
+def test_14_spawn_pm_stages_run_concurrently(db):
+    orig_expand, orig_block = spawn_pm.expand_keywords, spawn_pm.get_cognition_block
+    spawn_pm.expand_keywords = lambda agent, task, **kw: time.sleep(0.4) or ["rs256"]
+    try:
+        used = {}
+        spawn_pm.get_cognition_block = lambda agent, path, **kw: (used.setdefault("cognition", kw["conn"]),
+                                                                  time.sleep(0.4))[-1] or \
+            "<pm-cognition>slow</pm-cognition>"
+        timings = {}
+        t0 = time.perf_counter()
+        ctx = spawn_pm.build_cognitive_context("forge", "rotate keys", "T-14", db, timings=timings)
+        overlapped = time.perf_counter() - t0
+        spawn_pm.get_cognition_block = lambda agent, path, **kw: time.sleep(1.3) or "<pm-cognition>late</pm-cognition>"
+        late_timings = {}
+        t0 = time.perf_counter()
+        late = spawn_pm.build_cognitive_context("forge", "rotate keys", "T-14", db, deadline_s=1.0,
+                                                timings=late_timings)
+        bounded = time.perf_counter() - t0
+        reported = dict(late_timings)
+        time.sleep(0.6)  # the abandoned stage finishes now; the report must not change
+        memories_conn = spawn_pm.stage_connection(db, "memories")[0]
+        ok = (overlapped < 0.75 and "JWT RS256" in ctx and "slow" in ctx
+              and {"expand", "memories", "cognition", "format", "total"} <= set(timings)
+              and bounded < 1.5 and late_timings["cognition"] == "timeout" and late_timings == reported
+              and used["cognition"] is spawn_pm.stage_connection(db, "cognition")[0]
+              and used["cognition"] is not memories_conn
+              and "timed out" in late and "JWT RS256" in late)
+        rec("T14", ok, f"overlapped={overlapped:.2f}s bounded={bounded:.2f}s timings={timings} "
+                       f"late={late_timings} own connections={used['cognition'] is not memories_conn}")
+    finally:
+        spawn_pm.expand_keywords, spawn_pm.get_cognition_block = orig_expand, orig_block
+
+
+def test_15_spawn_pm_in_process_pipeline():
+    path = make_db()
+    conn = sqlite3.connect(str(path))
+    conn.execute("""CREATE TABLE beliefs (id TEXT PRIMARY KEY, agent_id TEXT, content TEXT, category TEXT,
+                      confidence REAL, action_implication TEXT, importance REAL, created_at TEXT,
+                      status TEXT, activation_score REAL)""")
+    conn.executemany("INSERT INTO beliefs VALUES (?,?,?,?,?,?,?,?,?,?)",
+                     [(f"b{i}", "forge", f"belief {i} about key rotation", "fact", 0.8, "", 5, None, "active", i)
+                      for i in range(50)])
+    conn.commit()
+    orig_expand, orig_run = spawn_pm.expand_keywords, spawn_pm.subprocess.run
+    calls = []
+    spawn_pm.expand_keywords = lambda agent, task, **kw: ["rs256"]
+    spawn_pm.subprocess.run = lambda *a, **kw: calls.append(a[0][1]) or orig_run(*a, **kw)
+    try:
+        spawn_pm.build_cognitive_context("forge", "rotate keys", "T-15", path)
+        conn.execute("INSERT INTO memories (id, agent_id, content) VALUES ('m9', 'forge', 'rs256 rotation runbook')")
+        conn.commit()  # invalidates the cached results: the warm run below does the real work
+        timings = {}
+        ctx = spawn_pm.build_cognitive_context("forge", "rotate keys", "T-15", path, timings=timings)
+        in_process_calls = len(calls)
+        spawn_pm.build_cognitive_context("forge", "rotate keys", "T-15", path, isolate=True)
+        isolated = sorted({Path(c).name for c in calls})
+        ok = (in_process_calls == 0 and timings["total"] < 20 and "rs256 rotation runbook" in ctx
+              and "belief 49 about key rotation" in ctx
+              and isolated == ["build_pm_cognition_block.py", "expand_retrieval_query.py", "retrieve_memories.py"])
+        rec("T15", ok, f"warm total={timings['total']}ms in-process subprocesses={in_process_calls} "
+                       f"isolated={isolated}")
+    finally:
+        spawn_pm.expand_keywords, spawn_pm.subprocess.run = orig_expand, orig_run
+        conn.close()
+        path.unlink(missing_ok=True)
+
+
+def test_16_prewarmed_contexts_for_queued_tickets():
+    path = make_db()
+    conn = sqlite3.connect(str(path))
+    conn.execute("CREATE TABLE beliefs (id TEXT PRIMARY KEY, agent_id TEXT, content TEXT, category TEXT, "
+                 "confidence REAL, action_implication TEXT, importance REAL, created_at TEXT, status TEXT, "
+                 "activation_score REAL)")
+    conn.execute("CREATE TABLE tickets (id TEXT PRIMARY KEY, title TEXT, priority TEXT, status TEXT, "
+                 "assignee TEXT, updated_at TEXT)")
+    conn.executemany("INSERT INTO tickets VALUES (?,?,?,?,?,?)", [
+        ("T-1", "Rotate RS256 signing keys", "P0", "TODO", "FORGE", "2026-01-02"),
+        ("T-2", "Approve launch", "P0", "TODO", "CHIEF", "2026-01-02"),
+        ("T-3", "Ship it", "P1", "DONE", "FORGE", "2026-01-01"),
+    ])
+    conn.commit()
+    migrate_schema.migrate_change_counters(conn)
+    orig_expand, orig_stage = prewarm_contexts._expand, spawn_pm.get_memories
+    prewarm_contexts._expand = lambda agent, task: ["rs256"]
+    try:
+        first = prewarm_contexts.prewarm(conn, path)
+        again = prewarm_contexts.prewarm(conn, path)
+        spawn_pm.get_memories = lambda *a, **kw: "(rebuilt)"
+        timings = {}
+        served = spawn_pm.build_cognitive_context("forge", "Rotate RS256 signing keys", "T-1", path, timings=timings)
+        # A real spawn task is the chief's free text around the ticket, not its title.
+        spawn_task = ("Pick up T-1 now: rotate RS256 signing keys before Friday's release and "
+                      "confirm the gateway accepts the new kid.")
+        realistic, isolated = {}, {}
+        spawn_pm.build_cognitive_context("forge", spawn_task, "T-1", path, timings=realistic)
+        spawn_pm.build_cognitive_context("forge", spawn_task, "T-1", path, timings=isolated, isolate=True)
+        unrelated = prewarm_contexts.lookup(conn, "forge", "T-1", "Audit the webhook retry queue")
+        conn.execute("INSERT INTO memories (id, agent_id, content) VALUES ('g9', 'ghost', 'ghost only')")
+        conn.commit()
+        other_agent = prewarm_contexts.lookup(conn, "forge", "T-1", "Rotate RS256 signing keys")
+        conn.execute("INSERT INTO memories (id, agent_id, content) VALUES ('m9', 'forge', 'rs256 rotation runbook')")
+        conn.commit()
+        stale = spawn_pm.build_cognitive_context("forge", "Rotate RS256 signing keys", "T-1", path)
+        # Scores decay with time: a block older than BLOCK_TTL_S is a miss even if nothing was written.
+        spawn_pm.get_memories = orig_stage
+        rebuilt = prewarm_contexts.prewarm(conn, path)
+        conn.execute("UPDATE context_blocks SET built_at = built_at - ?", (prewarm_contexts.BLOCK_TTL_S + 1,))
+        conn.commit()
+        aged = prewarm_contexts.lookup(conn, "forge", "T-1", "Rotate RS256 signing keys")
+        aged_pass = prewarm_contexts.prewarm(conn, path)
+        ok = (first == {"built": 1, "fresh": 0, "dropped": 0} and again["fresh"] == 1
+              and "prewarmed" in timings and "JWT RS256" in served and other_agent is not None
+              and "prewarmed" in realistic and "prewarmed" in isolated and unrelated is None
+              and "(rebuilt)" in stale and rebuilt["built"] == 1 and aged is None and aged_pass["built"] == 1)
+        rec("T16", ok, f"passes={first},{again} served in {timings.get('prewarmed')}ms, "
+                       f"free-text spawn served={'prewarmed' in realistic} isolated={'prewarmed' in isolated}, "
+                       f"stale after forge write={'(rebuilt)' in stale}, aged out={aged is None}")
+    finally:
+        prewarm_contexts._expand, spawn_pm.get_memories = orig_expand, orig_stage
+        conn.close()
+        path.unlink(missing_ok=True)
+
+
+def test_17_spawn_pm_batch_mode():
+    import io
+    erq = expand_retrieval_query
+    path = make_db()
+    conn = sqlite3.connect(str(path))
+    conn.execute("CREATE TABLE audit_log (id INTEGER PRIMARY KEY, ts TEXT, agent TEXT, action TEXT, detail TEXT)")
+    conn.execute("CREATE TABLE beliefs (id TEXT PRIMARY KEY, agent_id TEXT, content TEXT, category TEXT, "
+                 "confidence REAL, action_implication TEXT, importance REAL, created_at TEXT, status TEXT, "
+                 "activation_score REAL)")
+    conn.commit()
+    prompts = []
+
+    def fake_run(cmd, **kw):
+        prompts.append(cmd[-1])
+        text = json.dumps({"1": ["rs256"], "2": ["typescript"]})
+        return subprocess.CompletedProcess(cmd, 0, json.dumps({"result": {"payloads": [{"text": text}]}}), "")
+
+    lines = [json.dumps({"agent": "forge", "task": "rotate signing keys", "ticket": "B-1"}),
+             "not json",
+             json.dumps({"agent": "forge", "task": "harden the plugin compiler flags", "ticket": "B-2"}),
+             json.dumps({"agent": "forge", "task": "rotate signing keys", "ticket": "B-3"})]
+    orig_db, orig_run = erq.DB_PATH, erq.subprocess.run
+    erq.DB_PATH, erq.subprocess.run = path, fake_run
+    try:
+        out = io.StringIO()
+        built = spawn_pm.run_batch(lines, path, out, budget_s=None)
+        errors, *results = [json.loads(x) for x in out.getvalue().splitlines()]  # bad lines report first
+        cached = io.StringIO()
+        spawn_pm.run_batch(lines[:1], path, cached, budget_s=None)
+        local = io.StringIO()
+        spawn_pm.run_batch([json.dumps({"agent": "forge", "task": "kafka consumer lag"})], path, local,
+                           local_only=True)
+        ok = (built == 3 and len(prompts) == 1 and "Below are 2 tasks" in prompts[0]
+              and errors["line"] == 2 and [r["ticket"] for r in results] == ["B-1", "B-2", "B-3"]
+              and results[0]["keywords"] == results[2]["keywords"] == ["rs256"]
+              and "JWT RS256" in results[0]["context"] and "TypeScript strict" in results[1]["context"]
+              and json.loads(cached.getvalue())["keywords"] == ["rs256"]
+              and "kafka" in json.loads(local.getvalue())["keywords"] and len(prompts) == 1)
+        rec("T17", ok, f"built={built} llm requests={len(prompts)} tickets={[r['ticket'] for r in results]}")
+    finally:
+        erq.DB_PATH, erq.subprocess.run = orig_db, orig_run
+        conn.close()
+        path.unlink(missing_ok=True)
+
+
+def test_18_context_packer_budget():
+    cp = context_packer
+    short = [{"text": f"short note {i}", "value": 3.0, "group": "a"} for i in range(6)]
+    long_item = {"text": "critical " + "detail " * 24, "value": 20.0, "group": "b"}
+    kept = cp.pack(short + [long_item], 30)
+    used = sum(k["tokens"] for k in kept)
+    best_single = any(k["group"] == "b" for k in kept)
+    capped = cp.pack(short, 100, caps={"a": 2})
+    cut = cp.truncate_to_tokens("word " * 50, 10)
+    lines = cp.pack_sections([("H1:", short[:2], "  (none)"), ("H2:", [], "  (none)"),
+                              ("H3:", [long_item], "  (none)")], 12)
+    ok = (used <= 30 and best_single and len(capped) == 2
+          and [k["text"] for k in capped] == ["short note 0", "short note 1"]
+          and cut.endswith("…") and cp.estimate_tokens(cut) <= 10
+          and lines[:2] == ["H1:", "short note 0"] and "  (none)" in lines
+          and lines[-1] == "  (1 omitted over token budget)")
+    rec("T18", ok, f"used={used}/30 best_single={best_single} capped={len(capped)} lines={lines}")
+
+
+def _baseline_sections(conn, agent_id):
+    """Section lines as the three-query builder produced them (4x overfetch, Python re-sort)."""
+    bpc = build_pm_cognition_block
+    select = ("SELECT content, category, confidence, action_implication, importance, created_at FROM beliefs "
+              "WHERE agent_id = ? AND status = 'active' ORDER BY {} LIMIT ?")
+    queries = (("private", agent_id, "activation_score DESC, importance DESC", bpc.MAX_PRIVATE * 4),
+               ("shared", "__shared__", "activation_score DESC, importance DESC", bpc.MAX_SHARED * 4),
+               ("chief", "chief", "importance DESC, activation_score DESC", bpc.MAX_CHIEF))
+    candidates = []
+    for group, owner, order, limit in queries:
+        for content, category, confidence, implication, importance, created_at in conn.execute(
+                select.format(order), (owner, limit)):
+            value = (importance if importance is not None else 5.0) * bpc.recency_weight(created_at)
+            belief = {"content": content, "category": category,
+                      "confidence": float(confidence if confidence is not None else 0.5),
+                      "action_implication": implication}
+            candidates.append({"text": bpc._format_belief(belief), "value": value, "group": group})
+    candidates.sort(key=lambda c: -c["value"])
+    kept = context_packer.pack(candidates, bpc.TOKEN_BUDGET, caps={"private": bpc.MAX_PRIVATE,
+                                                                   "shared": bpc.MAX_SHARED,
+                                                                   "chief": bpc.MAX_CHIEF})
+    return {group: [k["text"] for k in kept if k["group"] == group] for group in ("private", "shared", "chief")}
+
+
+def _block_sections(block):
+    lines = {"private": [], "shared": [], "chief": []}
+    group = None
+    for line in block.splitlines():
+        if line.startswith("## "):
+            group = "private" if "private" in line else "shared" if "Shared" in line else "chief"
+        elif group and line.startswith("- "):
+            lines[group].append(line)
+    return lines
+
+
+def test_19_cognition_block_single_query():
+    bpc = build_pm_cognition_block
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE beliefs (id TEXT, agent_id TEXT, content TEXT, category TEXT, confidence REAL, "
+                 "action_implication TEXT, importance REAL, created_at TEXT, status TEXT, activation_score REAL)")
+    now = datetime.now(timezone.utc)
+    rows = [(f"c{i}", "chief", f"chief imp-{i + 1}", "pref", 0.9, None, i + 1, now.isoformat(), "active", 0.5)
+            for i in range(8)]
+    rows += [(f"p{i}", "forge", f"private {i}", "fact", 0.7, None, 5.0,
+              (now - timedelta(days=10 - i)).isoformat(), "active", 0.1 * i) for i in range(7)]
+    rows += [("s1", "__shared__", "shared undated", "fact", None, None, None, "garbage", "active", 1.0),
+             ("x1", "ghost", "other agent", "fact", 0.9, None, 9.0, now.isoformat(), "active", 1.0)]
+    conn.executemany("INSERT INTO beliefs VALUES (?,?,?,?,?,?,?,?,?,?)", rows)
+    before = bpc._build_block(conn, "forge")  # unmigrated: epoch parsed from created_at
+    created = migrate_schema.migrate_belief_rank(conn)
+    after = bpc._build_block(conn, "forge")
+    conn.execute("INSERT INTO beliefs (id, agent_id, content, importance, created_at, status) "
+                 "VALUES ('p9', 'forge', 'fresh insight', 9.0, ?, 'active')", (now.isoformat(),))
+    synced = conn.execute("SELECT created_epoch FROM beliefs WHERE id='p9'").fetchone()[0]
+    private = after.split("## Your beliefs (private)\n")[1].split("\n\n")[0].splitlines()
+    plan = " ".join(r[3] for r in conn.execute("EXPLAIN QUERY PLAN " + bpc._block_sql(conn, bpc._EPOCH), {
+        "agent": "forge", "shared": "__shared__", "chief": "chief", "decay": 0.1, "now": now.timestamp(), "max_private": 5, "max_shared": 3, "max_chief": 5,
+        "overfetch": bpc.OVERFETCH}))
+    chief = [line for line in after.splitlines() if "chief imp-" in line]
+    ok = (before == after and created == ["created_epoch", "idx_beliefs_agent_rank"]
+          and abs(synced - now.timestamp()) < 2
+          and private == [f"- [fact, 0.70] private {i}" for i in (6, 5, 4, 3, 2)]
+          and [c.split("imp-")[1] for c in chief] == ["8", "7", "6", "5", "4"]
+          and "shared undated" in after and "other agent" not in after
+          and plan.count("USING COVERING INDEX idx_beliefs_agent_rank") == 3 and "SCAN beliefs" not in plan
+          and "fresh insight" in bpc._build_block(conn, "forge"))
+
+    # Candidates are still picked by activation first: a high-importance, fresh belief
+    # outside the top OVERFETCH × MAX_PRIVATE by activation_score stays out of the block.
+    conn.close()
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE beliefs (id TEXT, agent_id TEXT, content TEXT, category TEXT, confidence REAL, "
+                 "action_implication TEXT, importance REAL, created_at TEXT, status TEXT, activation_score REAL)")
+    migrate_schema.migrate_belief_rank(conn)
+    rows = [(f"q{i}", "forge", f"forge {i}", "fact", 0.7, None, 1.0 + (i * 7) % 10 + i / 100,
+             (now - timedelta(days=i % 13)).isoformat(), "active", (i * 37) % 41) for i in range(40)]
+    rows += [("q-late", "forge", "forge buried", "fact", 0.7, None, 10.0, now.isoformat(), "active", -1.0)]
+    rows += [(f"t{i}", "__shared__", f"shared {i}", "fact", 0.6, None, 1.0 + (i * 3) % 7 + i / 100,
+              (now - timedelta(days=i % 5)).isoformat(), "active", (i * 11) % 17) for i in range(20)]
+    rows += [(f"h{i}", "chief", f"chief {i}", "pref", 0.9, None, 1.0 + i, (now - timedelta(days=3 * i)).isoformat(),
+              "active", 1.0 - i / 10) for i in range(8)]
+    conn.executemany("INSERT INTO beliefs (id, agent_id, content, category, confidence, action_implication, "
+                     "importance, created_at, status, activation_score) VALUES (?,?,?,?,?,?,?,?,?,?)", rows)
+    conn.commit()
+    got = _block_sections(bpc._build_block(conn, "forge"))
+    want = _baseline_sections(conn, "forge")
+    same_as_baseline = got == want and all(got.values()) and "forge buried" not in str(got)
+    rec("T19", ok and same_as_baseline, f"same before/after migration={before == after} private={len(private)} "
+                                        f"matches baseline builder={same_as_baseline} plan={plan}")
+    conn.close()
+
+
+def test_20_shared_sections_cache():
+    import review_pending
+    bpc = build_pm_cognition_block
+    path = make_db()
+    conn = sqlite3.connect(str(path))
+    conn.executescript("""
+        CREATE TABLE audit_log (id INTEGER PRIMARY KEY, ts TEXT, agent TEXT, action TEXT, detail TEXT);
+        CREATE TABLE beliefs (id TEXT PRIMARY KEY, agent_id TEXT, content TEXT, category TEXT, confidence REAL,
+            action_implication TEXT, importance REAL, created_at TEXT, updated_at TEXT, status TEXT,
+            activation_score REAL, source TEXT, scope TEXT);
+        CREATE TABLE pending_shared (id TEXT PRIMARY KEY, source_agent TEXT, scope TEXT, content TEXT,
+            status TEXT, created_at TEXT, reviewed_by TEXT, reviewed_at TEXT);
+    """)
+    now = datetime.now(timezone.utc).isoformat()
+    conn.executemany("INSERT INTO beliefs (id, agent_id, content, category, confidence, importance, created_at, "
+                     "status, activation_score, source) VALUES (?,?,?,'fact',0.8,?,?,'active',0.5,'agent')", [
+                         ("f1", "forge", "forge private", 6.0, now), ("g1", "ghost", "ghost private", 6.0, now),
+                         ("s1", "__shared__", "shared baseline", 7.0, now), ("g2", "ghost", "worth sharing", 8.0, now)])
+    conn.execute("INSERT INTO pending_shared VALUES ('ps-1', 'oracle', 'shared', 'approved insight', "
+                 "'pending', ?, NULL, NULL)", (now,))
+    conn.commit()
+    migrate_schema.migrate_change_counters(conn)
+    migrate_schema.migrate_belief_rank(conn)
+    shared_sections._counts.update(hits=0, misses=0, stale=0, max_age_s=0.0)
+    shared_sections._flush_db["path"] = str(path)
+    try:
+        forge = bpc.build_pm_cognition_block(path, "forge", use_cache=False, conn=conn)
+        ghost = bpc.build_pm_cognition_block(path, "ghost", use_cache=False, conn=conn)
+        hits_after_two = dict(shared_sections._counts)
+        # A write outside the approve/promote paths moves the stamp: a logged stale miss, then rebuilt.
+        conn.execute("INSERT INTO beliefs (id, agent_id, content, importance, created_at, status) "
+                     "VALUES ('s2', '__shared__', 'side door', 9.0, ?, 'active')", (now,))
+        conn.commit()
+        stale = bpc.build_pm_cognition_block(path, "forge", use_cache=False, conn=conn)
+        review_pending.cmd_approve(review_pending.connect(path), "ps-1")
+        approved = bpc.build_pm_cognition_block(path, "forge", use_cache=False, conn=conn)
+        r = subprocess.run([sys.executable, str(SCRIPTS / "promote_to_shared.py"), "--belief-id", "g2",
+                            "--db", str(path)], capture_output=True, text=True, timeout=30)
+        promoted = bpc.build_pm_cognition_block(path, "forge", use_cache=False, conn=conn)
+        counts = dict(shared_sections._counts)
+        shared_sections.flush()
+        audit = [(a, json.loads(d)) for a, d in conn.execute(
+            "SELECT action, detail FROM audit_log WHERE action LIKE 'shared_sections%' ORDER BY id")]
+        flushed = [d for a, d in audit if a == "shared_sections_cache"]
+        ok = ("shared baseline" in forge and "shared baseline" in ghost and "ghost private" not in forge
+              and "forge private" not in ghost and hits_after_two["misses"] == 1 and hits_after_two["hits"] == 1
+              and "side door" in stale and counts["stale"] == 1
+              and "approved insight" in approved and "side door" in approved
+              and r.returncode == 0 and "worth sharing" in promoted
+              and [d["reason"] for a, d in audit if a == "shared_sections_invalidated"] == ["approve:ps-1",
+                                                                                             "promote:g2"]
+              and [a for a, _ in audit].count("shared_sections_stale") == 1
+              and flushed and flushed[-1]["lookups"] == 5 and flushed[-1]["hits"] == 1
+              and flushed[-1]["stale"] == counts["stale"] == 1)
+        rec("T20", ok, f"counts={counts} audit={[a for a, _ in audit]} promote rc={r.returncode} {r.stderr[-200:]}")
+    finally:
+        shared_sections._flush_db["path"] = None
+        conn.close()
+        path.unlink(missing_ok=True)
+
+
+def main():
+    db = make_db()
+    try:
+        test_1_structured_results_and_isolation(db)
+        test_2_strict_and_lenient_filters(db)
+        test_3_cli_wraps_retrieve(db)
+        test_4_shared_connection_left_open(db)
+        test_5_spawn_pm_runs_in_process(db)
+        test_6_fts_migration_and_triggers(db)
+        test_7_sql_scores_match_python(db)
+        test_8_local_semantic_index(db)
+        test_9_ann_index_tracks_beliefs()
+        test_10_bm25_activation_fusion()
+        test_11_result_cache_versions()
+        test_12_expansion_cache_near_duplicates()
+        test_13_local_keyword_tier_and_budget()
+        test_14_spawn_pm_stages_run_concurrently(db)
+        test_15_spawn_pm_in_process_pipeline()
+        test_16_prewarmed_contexts_for_queued_tickets()
+        test_17_spawn_pm_batch_mode()
+        test_18_context_packer_budget()
+        test_19_cognition_block_single_query()
+        test_20_shared_sections_cache()
+    finally:
+        db.unlink(missing_ok=True)
+
+    total = PASS + FAIL
+    print(f"\nTOTAL: {total}/20 | PASS={PASS} | FAIL={FAIL}")
+    return 1 if FAIL else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
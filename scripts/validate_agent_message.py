@@ -7,19 +7,38 @@ TIER 1: HARD BLOCK — reject, log to security_audit
 TIER 2: SANITIZE — strip patterns, allow through, log
 TIER 3: FLAG — allow, set requires_review=1, log
 
+Hardened against ReDoS: the Tier 2/3 rules are compiled strict (a rule that can
+backtrack super-linearly fails the import, see rule_compiler.py) and every call
+runs within VALIDATION_CPU_BUDGET_S of CPU — over budget is a Tier 1 block.
+
 Importable: from validate_agent_message import validate_message
+Backlogs:   validate_messages(iterable) — streamed across a process pool
 """
 
 import base64
+import hashlib
 import html
+import itertools
 import json
+import os
 import re
+import signal
 import sqlite3
 import sys
+import threading
+import time
 import unicodedata
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timezone
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent))
+import aho_corasick
+import rule_compiler
+
 DB_PATH = Path("/Users/acevashisth/.openclaw/workspace/state/vector.db")
 
 # ── TIER 1: Hard Block Patterns (case-insensitive substring match) ─────────────
@@ -70,7 +89,9 @@ TIER2_PATTERNS = [
     (
         # Strip '--' SQL comments that are NOT inside code blocks (```...```)
         # Strategy: only strip '--' that appear outside triple-backtick sections
-        re.compile(r'--(?=[^\n]*$)', re.MULTILINE),
+        # (No trailing (?=[^\n]*$): under MULTILINE it always held, and rescanning
+        # the rest of the line from every '--' was quadratic on a line of dashes.)
+        re.compile(r'--'),
         '[SQL_COMMENT_STRIPPED]',
         "SQL comment operator '--'",
     ),
@@ -99,6 +120,20 @@ PROTECTED_AGENT_IDS = {"vector", "__shared__"}
 # Max content length for validation (not for post_proposal — that has its own)
 MAX_CONTENT_LENGTH = 10_000
 
+# Hardened mode: CPU seconds of its own thread one validate_message call may
+# spend matching. Over budget the message is treated as a Tier 1 block (fails
+# closed) that is not stored as a verdict, so a pathological input cannot
+# stall the send/read path and is retried later. 0 disables.
+VALIDATION_CPU_BUDGET_S = 0.25
+
+
+class ValidationBudgetExceeded(Exception):
+    """Raised inside validate_message when VALIDATION_CPU_BUDGET_S runs out."""
+
+# Bump whenever normalize_content() or the Tier 1 views change behaviour:
+# stored verdicts carry the ruleset fingerprint, which includes this.
+NORMALIZATION_VERSION = 2
+
 
 def _now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
@@ -110,6 +145,13 @@ def _get_db() -> sqlite3.Connection:
     return conn
 
 
+def _ensure_verdict_column(conn: sqlite3.Connection, table: str = "agent_messages") -> None:
+    """<table>.validator_fingerprint (also added by migrate_schema.py 'verdicts'); no-op without the table."""
+    columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    if columns and "validator_fingerprint" not in columns:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN validator_fingerprint TEXT")
+
+
 def _log_security_audit(
     conn: sqlite3.Connection,
     agent: str,
@@ -129,6 +171,19 @@ def _log_security_audit(
     conn.commit()
 
 
+def _log_security_audits(conn: sqlite3.Connection, events: list[tuple[str, str, str, str, str]]) -> None:
+    """Write many (agent, violation_type, detail, severity, response_taken) events in one commit."""
+    now = _now_iso()
+    conn.executemany(
+        """
+        INSERT INTO security_audit (ts, agent, violation_type, detail, severity, response_taken)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        [(now, *event) for event in events],
+    )
+    conn.commit()
+
+
 # ── Homoglyph / confusable character map ─────────────────────────────────────
 # Maps visually confusable non-ASCII characters to their ASCII equivalents.
 # Covers the most common Cyrillic and Greek lookalikes used in prompt injection.
@@ -178,6 +233,106 @@ _CONFUSABLE_MAP: dict[str, str] = {
 # Leet-speak translation table: digit → typical letter substitution
 _LEET_TABLE = str.maketrans('013457@$', 'oieasts$')
 
+# Zero-width / invisible characters, replaced with a SPACE (not deleted) so
+# word boundaries survive: 'ignore\u200bprevious' → 'ignore previous'.
+# ZWSP, ZWNJ, ZWJ, BOM, LRM, RLM, LRE, RLE, PDF, LRO, RLO, WJ, FAP, IT, IS,
+# IP, IAA, IAS, IAT — plus the null byte.
+_INVISIBLE_CHARS = (
+    '\u200b\u200c\u200d\ufeff\u200e\u200f'
+    + ''.join(map(chr, range(0x202A, 0x202F)))
+    + ''.join(map(chr, range(0x2060, 0x2065)))
+    + '\ufff9\ufffa\ufffb\x00'
+)
+
+# Confusables and invisibles in one precompiled table: a single translate()
+# pass instead of a per-character dict lookup plus two substitutions. Exact,
+# because the keys are disjoint and every replacement is plain ASCII.
+_NORMALIZE_TABLE = str.maketrans({**_CONFUSABLE_MAP, **dict.fromkeys(_INVISIBLE_CHARS, ' ')})
+
+# Base64 candidates: ≥32 base64 chars (≥24 bytes decoded) — high enough to avoid
+# false positives on normal text, low enough to catch short encoded payloads.
+# No word-boundary anchors — '=' is not a word char so \b fails at padded ends.
+_BASE64_RE = re.compile(r'[A-Za-z0-9+/]{32,}={0,2}')
+_BASE64_MARKER = ' __BASE64_DECODED__: '
+
+# Decoding budget per message: distinct blobs, and base64 characters in total.
+# Repeats of a blob are decoded once. A message over budget is not decoded
+# further and is flagged for review instead (validate_message).
+MAX_BASE64_BLOBS = 64
+MAX_BASE64_CHARS = MAX_CONTENT_LENGTH
+
+# Tier 1 automaton over the space-stripped, lowercased patterns, compiled once.
+# A pattern occurring in a view also occurs, space-stripped, in that view
+# space-stripped — so matching the stripped forms against the no-space views
+# covers all four Tier 1 views in validate_message.
+_TIER1_AUTOMATON = aho_corasick.Automaton(["".join(p.lower().split()) for p in TIER1_PATTERNS])
+_TIER1_MAX_KEY = max(len(key) for key in _TIER1_AUTOMATON.keys)
+
+
+def _tier1_hits(nospace_lower: str, start: int = 0) -> frozenset[int]:
+    """
+    Indices into TIER1_PATTERNS at the first hit in the lowercased no-space
+    view, or else in its leet-denormalized form; empty if neither hits.
+    Matching stops at the first hit: the verdict is certain from there.
+    """
+    view = nospace_lower[start:] if start else nospace_lower
+    hits = _TIER1_AUTOMATON.first_match(view)
+    if not hits:
+        leet = view.translate(_LEET_TABLE)
+        if leet != view:  # no leet characters → same view, skip the second pass
+            hits = _TIER1_AUTOMATON.first_match(leet)
+    return hits
+
+
+def _tier1_all_hits(nospace_lower: str) -> frozenset[int]:
+    """Indices into TIER1_PATTERNS of every pattern in the no-space view or its leet form."""
+    leet = nospace_lower.translate(_LEET_TABLE)
+    return frozenset(_TIER1_AUTOMATON.matches(nospace_lower) | _TIER1_AUTOMATON.matches(leet))
+
+
+def _normalize_views(text: str) -> tuple[str, str]:
+    """
+    (normalized text, its whitespace-free form) — steps 1–6 of
+    normalize_content. Both views come from one split() of the translated text.
+    """
+    # 1. HTML/XML entity decode: &#105; → 'i', &lt; → '<', &amp; → '&', etc.
+    text = html.unescape(text)
+    # 2. NFKC normalization — collapses compatibility forms (fullwidth, fractions, etc.)
+    text = unicodedata.normalize('NFKC', text)
+    # 3–5. Homoglyph/confusable map (after NFKC, so decomposed forms are not
+    #      double-processed), zero-width/invisible chars and null bytes → SPACE.
+    # 6. Collapse whitespace runs to a single space, strip leading/trailing.
+    #    Catches tab-separated and newline-split tricks. (split() and re's \s
+    #    agree on what whitespace is.)
+    words = text.translate(_NORMALIZE_TABLE).split()
+    return ' '.join(words), ''.join(words)
+
+
+def _base64_payloads(text: str) -> tuple[list[str], bool]:
+    """
+    (decoded base64 blobs in text, in order and without repeats; whether the
+    decoding budget ran out before the last candidate).
+    """
+    payloads: list[str] = []
+    seen: set[str] = set()
+    budget = MAX_BASE64_CHARS
+    for match in _BASE64_RE.finditer(text):
+        raw = match.group(0).rstrip('=')
+        if raw in seen:
+            continue
+        if len(seen) >= MAX_BASE64_BLOBS or len(raw) > budget:
+            return payloads, True
+        seen.add(raw)
+        budget -= len(raw)
+        try:
+            padded = raw + '=' * ((4 - len(raw) % 4) % 4)
+            decoded = base64.b64decode(padded).decode('utf-8', errors='ignore')
+        except ValueError:  # binascii.Error; never a bare except: see _cpu_budget
+            continue
+        if decoded.strip():
+            payloads.append(decoded)
+    return payloads, False
+
 
 def normalize_content(text: str) -> str:
     """
@@ -190,83 +345,204 @@ def normalize_content(text: str) -> str:
       4. Null bytes                — replaced with SPACE
       5. Whitespace normalization  — collapses newline/tab splits into single space
       6. Base64 encoded payloads   — decoded and appended for Tier1 matching
+         (distinct blobs only, within MAX_BASE64_BLOBS / MAX_BASE64_CHARS)
       (Leet-speak is handled in the Tier1 check via _LEET_TABLE, not here)
 
+    Linear in len(text): one translate() and one split() for 2–5, one regex
+    scan plus bounded decoding for 6.
+
     Security: called on ALL content, from_agent, and to_agent fields BEFORE Tier1/2/3 checks.
     """
-    # 1. HTML/XML entity decode: &#105; → 'i', &lt; → '<', &amp; → '&', etc.
-    text = html.unescape(text)
+    text, _ = _normalize_views(text)
+    payloads, _ = _base64_payloads(text)
+    return text + ''.join(_BASE64_MARKER + decoded for decoded in payloads)
 
-    # 2. NFKC normalization — collapses compatibility forms (fullwidth, fractions, etc.)
-    text = unicodedata.normalize('NFKC', text)
 
-    # 3. Apply homoglyph/confusable map (Cyrillic, Greek → Latin ASCII)
-    #    This runs AFTER NFKC so we don't double-process decomposed forms.
-    text = ''.join(_CONFUSABLE_MAP.get(c, c) for c in text)
-
-    # 4. Replace zero-width / invisible characters with a SPACE
-    #    Using SPACE (not empty string) preserves word boundaries so that
-    #    'ignore\u200bprevious' → 'ignore previous' and matches Tier1.
-    #    Covers: ZWSP, ZWNJ, ZWJ, BOM, LRM, RLM, LRE, RLE, PDF, LRO, RLO,
-    #    WJ, FAP, IT, IS, IP, IAA, IAS, IAT
-    text = re.sub(
-        r'[\u200b\u200c\u200d\ufeff\u200e\u200f\u202a-\u202e\u2060-\u2064\uFFF9-\uFFFB]',
-        ' ',
-        text,
-    )
-
-    # 5. Replace null bytes with SPACE
-    text = text.replace('\x00', ' ')
-
-    # 6. Normalize whitespace: collapse runs of whitespace to single space,
-    #    strip leading/trailing. Catches tab-separated and newline-split tricks.
-    text = re.sub(r'\s+', ' ', text).strip()
+def _tier1_screen(text: str) -> tuple[str, frozenset[int], bool]:
+    """
+    (normalize_content(text), Tier 1 hits, base64 budget exceeded) with an
+    early exit: when the text itself hits Tier 1, base64 is never decoded and
+    the normalized text is returned without the decoded payloads. Otherwise
+    only the appended payloads (plus the overlap a pattern could span) are
+    scanned a second time. The hits only decide the block; see
+    _tier1_report for the full set.
+    """
+    head, nospace = _normalize_views(text)
+    nospace = nospace.lower()
+    hits = _tier1_hits(nospace)
+    if hits:
+        return head, hits, False
+    payloads, over_budget = _base64_payloads(head)
+    if not payloads:
+        return head, hits, over_budget
+    tail = ''.join(_BASE64_MARKER + decoded for decoded in payloads)
+    start = max(0, len(nospace) - (_TIER1_MAX_KEY - 1))
+    hits = _tier1_hits(nospace + ''.join(tail.split()).lower(), start)
+    return head + tail, hits, over_budget
+
+
+def _tier1_report(text: str) -> tuple[str, frozenset[int]]:
+    """
+    (normalize_content(text), every Tier 1 pattern in it) for a message the
+    screen has already blocked, so the audit trail lists all of them.
+    """
+    content = normalize_content(text)
+    return content, _tier1_all_hits(''.join(content.split()).lower())
 
-    # 7. Detect and append decoded base64 blobs so Tier1 matches on decoded payload.
-    #    Threshold: ≥32 base64 chars (≥24 bytes decoded) — high enough to avoid false
-    #    positives on normal text, low enough to catch short encoded payloads.
-    #    No word-boundary anchors — '=' is not a word char so \b fails at padded ends.
-    b64_pattern = re.compile(r'[A-Za-z0-9+/]{32,}={0,2}')
-    for match in b64_pattern.finditer(text):
-        try:
-            raw = match.group(0).rstrip('=')
-            padded = raw + '=' * ((4 - len(raw) % 4) % 4)
-            decoded = base64.b64decode(padded).decode('utf-8', errors='ignore')
-            if decoded.strip():
-                text += ' __BASE64_DECODED__: ' + decoded
-        except Exception:
-            pass
 
-    return text
+def ruleset_fingerprint() -> str:
+    """
+    Hash of everything a verdict depends on: the three tier tables, the
+    normalization maps and NORMALIZATION_VERSION. A verdict stored with the
+    current fingerprint is what validate_message would return today.
+    """
+    ruleset = {
+        "normalization": NORMALIZATION_VERSION,
+        "confusables": sorted(_CONFUSABLE_MAP.items()),
+        "leet": sorted(_LEET_TABLE.items()),
+        "base64": [MAX_BASE64_BLOBS, MAX_BASE64_CHARS],
+        "cpu_budget_s": VALIDATION_CPU_BUDGET_S,
+        "tier1": TIER1_PATTERNS,
+        "tier2": [(r.pattern, r.flags, repl, d) for r, repl, d in TIER2_PATTERNS],
+        "tier2_outside_code": sorted(_TIER2_OUTSIDE_CODE),
+        "tier3": [(r.pattern, r.flags, d) for r, d in TIER3_PATTERNS],
+    }
+    return hashlib.sha256(json.dumps(ruleset).encode()).hexdigest()[:16]
+
+
+# ── TIER 2 + 3: one compiled alternation ─────────────────────────────────────
+# Tier 2 rules that must not touch text inside ```code blocks```.
+_TIER2_OUTSIDE_CODE = {"SQL comment operator '--'"}
+_CODE_BLOCK_RE = re.compile(r'```.*?```', re.DOTALL)
+
+# Tier 3 rules are probes (zero-width), so they never hide a Tier 2 hit.
+_TIER3_RULES = [(f"t3_{i}", regex, True) for i, (regex, _) in enumerate(TIER3_PATTERNS)]
+# Outside code blocks: every Tier 3 and Tier 2 rule; a code block is consumed
+# whole and rescanned with _CODE_RULES_RE.
+# strict: a rule that can backtrack super-linearly fails the import (rule_compiler.py).
+_RULES_RE = rule_compiler.compile_rules(
+    _TIER3_RULES
+    + [("code", _CODE_BLOCK_RE, False)]
+    + [(f"t2_{i}", regex, False) for i, (regex, _, _) in enumerate(TIER2_PATTERNS)],
+    strict=True,
+)
+_CODE_RULES_RE = rule_compiler.compile_rules(
+    _TIER3_RULES
+    + [(f"t2_{i}", regex, False) for i, (regex, _, description) in enumerate(TIER2_PATTERNS)
+       if description not in _TIER2_OUTSIDE_CODE],
+    strict=True,
+)
+_TIER3_RE = rule_compiler.compile_rules(_TIER3_RULES, strict=True)
+
+RULESET_FINGERPRINT = ruleset_fingerprint()
+
+
+def _scan_rules(rules_re: re.Pattern, text: str, start: int, end: int,
+                counts: list[int], flags: set[int], edits: list[tuple[int, int, str]]) -> None:
+    """Collect Tier 2 counts/edits and Tier 3 flags for text[start:end] in one finditer pass."""
+    for m in rules_re.finditer(text, start, end):
+        _budget_checkpoint()
+        name = m.lastgroup
+        if name == "code":
+            _scan_rules(_CODE_RULES_RE, text, m.start(), m.end(), counts, flags, edits)
+        elif name.startswith("t3_"):
+            flags.add(int(name[3:]))
+            # Only the first probe that fires at a position is reported; check the rest here.
+            for i, (regex, _) in enumerate(TIER3_PATTERNS):
+                if i not in flags and regex.match(text, m.start(), end):
+                    flags.add(i)
+        else:
+            index = int(name[3:])
+            counts[index] += 1
+            edits.append((m.start(), m.end(), TIER2_PATTERNS[index][1]))
 
 
-def _strip_code_blocks(text: str) -> tuple[str, list[tuple[int, int, str]]]:
+def _apply_tier2_tier3(content: str) -> tuple[str, list[int], set[int]]:
     """
-    Remove code blocks from text for Tier 2 '--' stripping.
-    Returns (text_without_code_blocks, [(start, end, original_block), ...])
-    so we can put them back after sanitization.
+    (sanitized, per-rule Tier 2 counts, Tier 3 rule indices) — the same
+    result as substituting each Tier 2 rule in turn (skipping code blocks
+    where required) and then searching each Tier 3 rule in the output.
     """
-    blocks = []
-    pattern = re.compile(r'```.*?```', re.DOTALL)
-    result = text
-    for m in reversed(list(pattern.finditer(text))):
-        placeholder = f"\x00CODEBLOCK{len(blocks)}\x00"
-        blocks.append((m.start(), m.end(), m.group(0)))
-        result = result[: m.start()] + placeholder + result[m.end() :]
-    return result, blocks
+    counts, flags, edits = [0] * len(TIER2_PATTERNS), set(), []
+    _scan_rules(_RULES_RE, content, 0, len(content), counts, flags, edits)
+    if not edits:
+        return content, counts, flags
+    pieces, last = [], 0
+    for start, end, replacement in edits:
+        pieces += [content[last:start], replacement]
+        last = end
+    sanitized = "".join(pieces) + content[last:]
+    # Substitutions can create or break Tier 3 hits; flag on the text that is stored.
+    flags = set()
+    _scan_rules(_TIER3_RE, sanitized, 0, len(sanitized), [], flags, [])
+    return sanitized, counts, flags
+
+
+_budget_state = threading.local()
+
 
+def _budget_checkpoint() -> None:
+    """Raise ValidationBudgetExceeded if this thread's _cpu_budget has run out."""
+    deadline = getattr(_budget_state, "deadline", None)
+    if deadline is not None and time.thread_time() > deadline:
+        raise ValidationBudgetExceeded()
 
-def _restore_code_blocks(text: str, blocks: list[tuple[int, int, str]]) -> str:
-    """Put code blocks back after Tier 2 sanitization."""
-    for i, (_, _, original) in enumerate(blocks):
-        placeholder = f"\x00CODEBLOCK{i}\x00"
-        text = text.replace(placeholder, original)
-    return text
+
+def _vtalrm_free() -> bool:
+    """True when SIGVTALRM has no handler of someone else's and no virtual timer is running."""
+    return (signal.getsignal(signal.SIGVTALRM) in (signal.SIG_DFL, signal.SIG_IGN, None)
+            and signal.getitimer(signal.ITIMER_VIRTUAL)[0] == 0)
+
+
+@contextmanager
+def _cpu_budget(seconds: float):
+    """
+    Raise ValidationBudgetExceeded once the block has used `seconds` of this
+    thread's CPU time.
+
+    Any thread: _budget_checkpoint() is called between validator stages and
+    at every rule match, so the overrun is at most one regex call — linear,
+    as the rules are compiled strict. Main thread only: a SIGVTALRM timer
+    also interrupts a long regex call (the regex engine checks for signals).
+    ITIMER_VIRTUAL counts the CPU of the whole process, so when it fires the
+    handler compares this thread's CPU time and re-arms for the remainder if
+    other threads spent it. The timer is left alone when another SIGVTALRM
+    handler or virtual timer is in place.
+    """
+    started = time.thread_time()
+    preempt = (seconds > 0 and hasattr(signal, "setitimer")
+               and threading.current_thread() is threading.main_thread() and _vtalrm_free())
+    armed = [preempt]
+
+    def on_timer(signum, frame):
+        if not armed[0]:
+            return
+        remaining = seconds - (time.thread_time() - started)
+        if remaining > 0:
+            signal.setitimer(signal.ITIMER_VIRTUAL, max(remaining, 0.001))
+            return
+        raise ValidationBudgetExceeded()
+
+    if preempt:
+        previous = signal.signal(signal.SIGVTALRM, on_timer)
+        signal.setitimer(signal.ITIMER_VIRTUAL, seconds)
+    _budget_state.deadline = started + seconds if seconds > 0 else None
+    try:
+        yield
+    finally:
+        _budget_state.deadline = None
+        armed[0] = False  # a signal already in flight must not fire after this point
+        if preempt:
+            signal.setitimer(signal.ITIMER_VIRTUAL, 0)
+            signal.signal(signal.SIGVTALRM, previous if previous is not None else signal.SIG_DFL)
+    if seconds > 0 and time.thread_time() - started > seconds:
+        raise ValidationBudgetExceeded()
 
 
 def validate_message(content: str, from_agent: str, to_agent: str) -> dict:
     """
-    Three-tier validation of an inter-agent message.
+    Three-tier validation of an inter-agent message, within
+    VALIDATION_CPU_BUDGET_S of CPU time (over budget → Tier 1 block).
 
     Returns:
         {
@@ -276,8 +552,124 @@ def validate_message(content: str, from_agent: str, to_agent: str) -> dict:
             requires_review: bool,
             violations: list[str],
             log: list[str],
+            budget_exceeded: bool,   # blocked only because the CPU budget ran out
         }
+
+    A budget_exceeded block says nothing about the content: callers that
+    store verdicts leave it unstored so the message is validated again.
     """
+    result, audit = _validate_budgeted(content, from_agent, to_agent)
+    _write_block_audits([(result, audit)])
+    return result
+
+
+def _validate_budgeted(content: str, from_agent: str, to_agent: str) -> tuple[dict, tuple | None]:
+    """_evaluate() within VALIDATION_CPU_BUDGET_S; over budget → a Tier 1 block. No I/O."""
+    try:
+        with _cpu_budget(VALIDATION_CPU_BUDGET_S):
+            return _evaluate(content, from_agent, to_agent)
+    except ValidationBudgetExceeded:
+        violation = f"TIER1_BLOCK: validation exceeded CPU budget ({VALIDATION_CPU_BUDGET_S}s)"
+        result = {
+            "allowed": False,
+            "blocked": True,
+            "sanitized_content": "",
+            "requires_review": False,
+            "violations": [violation],
+            "log": [f"[TIER1] BLOCKED — {violation}"],
+            "budget_exceeded": True,
+        }
+        return result, ("TIER1_VALIDATION_BUDGET", from_agent, {
+            "from": from_agent,
+            "to": to_agent,
+            "violations": result["violations"],
+            "content_length": len(content),
+            "content_preview": content[:200],
+        })
+
+
+def _write_block_audits(verdicts: list[tuple[dict, tuple | None]],
+                        conn: sqlite3.Connection | None = None) -> None:
+    """
+    security_audit rows for the Tier 1 blocks among (result, audit) verdicts,
+    in one commit — written outside the budget, so the timer never interrupts
+    the write. Through `conn` if given, else a connection of its own.
+    """
+    events = []
+    for _, audit in verdicts:
+        if audit is not None:
+            violation_type, agent, detail = audit
+            events.append((agent, violation_type, json.dumps(detail), "CRITICAL", "BLOCKED_NOT_STORED"))
+    if not events:
+        return
+    try:
+        own = conn is None
+        conn = _get_db() if own else conn
+        try:
+            _log_security_audits(conn, events)
+        finally:
+            if own:
+                conn.close()
+    except Exception as e:
+        for result, audit in verdicts:
+            if audit is not None:
+                result["log"].append(f"[TIER1] WARNING: could not write to security_audit: {e}")
+
+
+# ── Batch validation ─────────────────────────────────────────────────────────
+BATCH_CHUNK_SIZE = 64
+
+
+def _validate_chunk(items: list[tuple[str, str, str]]) -> list[tuple[dict, tuple | None]]:
+    """Pool worker: budgeted verdicts for a chunk of (content, from_agent, to_agent). No I/O."""
+    return [_validate_budgeted(*item) for item in items]
+
+
+def validate_messages(
+    items: Iterable[tuple[str, str, str]],
+    workers: int | None = None,
+    chunk_size: int = BATCH_CHUNK_SIZE,
+    conn: sqlite3.Connection | None = None,
+) -> Iterator[dict]:
+    """
+    validate_message over (content, from_agent, to_agent) items, yielding
+    results in input order as they complete.
+
+    Items are read lazily in chunks of `chunk_size` and fanned out to a
+    ProcessPoolExecutor of `workers` processes (default: one per CPU), with
+    at most two chunks per worker in flight — a backlog is never held in
+    memory. workers=1 validates in this process. Each worker call keeps the
+    per-message CPU budget. Tier 1 blocks are audited once per chunk, through
+    `conn` when the caller holds uncommitted writes on it.
+    """
+    workers = workers or os.cpu_count() or 1
+    source = iter(items)
+    chunks = iter(lambda: list(itertools.islice(source, chunk_size)), [])
+
+    def results(verdicts: list[tuple[dict, tuple | None]]) -> list[dict]:
+        _write_block_audits(verdicts, conn)
+        return [result for result, _ in verdicts]
+
+    if workers == 1:
+        for chunk in chunks:
+            yield from results(_validate_chunk(chunk))
+        return
+
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        in_flight: deque = deque()
+        for chunk in chunks:
+            in_flight.append(pool.submit(_validate_chunk, chunk))
+            if len(in_flight) >= 2 * workers:
+                yield from results(in_flight.popleft().result())
+        while in_flight:
+            yield from results(in_flight.popleft().result())
+    finally:
+        pool.shutdown(cancel_futures=True)  # also when the caller stops early
+
+
+def _evaluate(content: str, from_agent: str, to_agent: str) -> tuple[dict, tuple | None]:
+    """(validate_message result, (violation_type, agent, detail) to audit or None). No I/O."""
     log: list[str] = []
     violations: list[str] = []
     blocked = False
@@ -286,7 +678,13 @@ def validate_message(content: str, from_agent: str, to_agent: str) -> dict:
 
     # ── PRE-PROCESSING: Normalize ALL fields before any checks ────────────────
     # This defeats homoglyph, zero-width, null-byte, split-line, and base64 tricks.
-    content = normalize_content(content)
+    # Content is normalized and screened for Tier 1 together (_tier1_screen).
+    raw = content
+    content, hits, base64_over_budget = _tier1_screen(raw)
+    _budget_checkpoint()
+    if hits:
+        content, hits = _tier1_report(raw)  # blocked either way; now collect every pattern
+        _budget_checkpoint()
     from_agent = normalize_content(from_agent)
     to_agent = normalize_content(to_agent)
     log.append("[PRE] normalize_content() applied to content, from_agent, to_agent")
@@ -297,20 +695,11 @@ def validate_message(content: str, from_agent: str, to_agent: str) -> dict:
     #  (b) leet-denormalized text       — catches '1gn0r3' → 'ignore'
     #  (c) whitespace-stripped text     — catches word-split across lines/chars
     #  (d) leet-denorm + no-space       — catches combined leet + split attacks
-    content_lower = content.lower()
-    content_leet = content_lower.translate(_LEET_TABLE)
-    content_nospace = re.sub(r'\s+', '', content_lower)
-    content_leet_nospace = re.sub(r'\s+', '', content_leet)
-
-    for pattern in TIER1_PATTERNS:
-        pattern_lower = pattern.lower()
-        pattern_nospace = re.sub(r'\s+', '', pattern_lower)
-        if (
-            pattern_lower in content_lower
-            or pattern_lower in content_leet
-            or pattern_nospace in content_nospace
-            or pattern_nospace in content_leet_nospace
-        ):
+    #  All four are covered by one automaton pass over each no-space view.
+    #  The screen stops at the first hit; a blocked message is then rescanned
+    #  in full (_tier1_report) so every pattern it contains is reported.
+    for index, pattern in enumerate(TIER1_PATTERNS):
+        if index in hits:
             blocked = True
             violation = f"TIER1_BLOCK: matched pattern '{pattern}'"
             violations.append(violation)
@@ -319,27 +708,13 @@ def validate_message(content: str, from_agent: str, to_agent: str) -> dict:
                 blocked_reason = f"Tier 1 pattern: '{pattern}'"
 
     if blocked:
-        # Write ALL violations to security_audit
-        try:
-            conn = _get_db()
-            detail = json.dumps({
-                "from": from_agent,
-                "to": to_agent,
-                "violations": violations,
-                "content_preview": content[:200],
-            })
-            _log_security_audit(
-                conn,
-                agent=from_agent,
-                violation_type="TIER1_AGENT_MESSAGE_BLOCK",
-                detail=detail,
-                severity="CRITICAL",
-                response_taken="BLOCKED_NOT_STORED",
-            )
-            conn.close()
-        except Exception as e:
-            log.append(f"[TIER1] WARNING: could not write to security_audit: {e}")
-
+        # ALL violations go to security_audit (written by validate_message)
+        detail = {
+            "from": from_agent,
+            "to": to_agent,
+            "violations": violations,
+            "content_preview": content[:200],
+        }
         return {
             "allowed": False,
             "blocked": True,
@@ -347,51 +722,29 @@ def validate_message(content: str, from_agent: str, to_agent: str) -> dict:
             "requires_review": False,
             "violations": violations,
             "log": log,
-        }
-
-    # ── TIER 2: Sanitize ──────────────────────────────────────────────────────
-    sanitized = content
-    # For '--' stripping: protect code blocks first
-    sanitized_no_code, code_blocks = _strip_code_blocks(sanitized)
-
-    for (regex, replacement, description) in TIER2_PATTERNS:
-        if description == "SQL comment operator '--'":
-            # Only strip from non-code-block regions
-            new_text, n = regex.subn(replacement, sanitized_no_code)
-            if n > 0:
-                sanitized_no_code = new_text
-                log.append(f"[TIER2] SANITIZED {n}x — {description}")
-                violations.append(f"TIER2_SANITIZED: {description}")
-        else:
-            new_text, n = regex.subn(replacement, sanitized)
-            if n > 0:
-                sanitized = new_text
-                log.append(f"[TIER2] SANITIZED {n}x — {description}")
-                violations.append(f"TIER2_SANITIZED: {description}")
-
-    # Restore code blocks after '--' stripping
-    sanitized_no_code = _restore_code_blocks(sanitized_no_code, code_blocks)
-
-    # Merge: the sanitized_no_code has '--' stripped, sanitized has other T2 applied
-    # We need to apply '--' result back to sanitized
-    # Strategy: apply the non-code '--' strip to the current sanitized value
-    sanitized_no_code2, code_blocks2 = _strip_code_blocks(sanitized)
-    sql_comment_re = re.compile(r'--(?=[^\n]*$)', re.MULTILINE)
-    sanitized_no_code2_result, n2 = sql_comment_re.subn('[SQL_COMMENT_STRIPPED]', sanitized_no_code2)
-    if n2 > 0:
-        sanitized_no_code2_result = _restore_code_blocks(sanitized_no_code2_result, code_blocks2)
-        sanitized = sanitized_no_code2_result
-        # Remove duplicate log entry (already added above if n > 0)
-    else:
-        sanitized = _restore_code_blocks(sanitized_no_code2, code_blocks2)
-
-    # ── TIER 3: Flag for Review ───────────────────────────────────────────────
-    for (regex, description) in TIER3_PATTERNS:
-        if regex.search(sanitized):
+            "budget_exceeded": False,
+        }, ("TIER1_AGENT_MESSAGE_BLOCK", from_agent, detail)
+
+    # ── TIER 2: Sanitize / TIER 3: Flag for Review ───────────────────────────
+    # One pass of the compiled alternation finds every Tier 2 and Tier 3 hit.
+    sanitized, counts, flags = _apply_tier2_tier3(content)
+    for (_, _, description), n in zip(TIER2_PATTERNS, counts):
+        if n > 0:
+            log.append(f"[TIER2] SANITIZED {n}x — {description}")
+            violations.append(f"TIER2_SANITIZED: {description}")
+
+    for i, (_, description) in enumerate(TIER3_PATTERNS):
+        if i in flags:
             requires_review = True
             log.append(f"[TIER3] FLAG — {description}")
             violations.append(f"TIER3_FLAG: {description}")
 
+    # Undecoded base64 could hide a Tier 1 payload: a human looks instead.
+    if base64_over_budget:
+        requires_review = True
+        log.append("[TIER3] FLAG — base64 decode budget exceeded")
+        violations.append("TIER3_FLAG: base64 decode budget exceeded")
+
     return {
         "allowed": True,
         "blocked": False,
@@ -399,7 +752,8 @@ def validate_message(content: str, from_agent: str, to_agent: str) -> dict:
         "requires_review": requires_review,
         "violations": violations,
         "log": log,
-    }
+        "budget_exceeded": False,
+    }, None
 
 
 # ── CLI entrypoint ─────────────────────────────────────────────────────────────